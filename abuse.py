@@ -0,0 +1,140 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Running abuse counters per IP address and per registered user.
+
+Auto-block checks and the admin flag alerts used to count flagged questions
+with a GROUP BY over the question table on every request. Instead,
+:func:`record` bumps an :class:`~models.AbuseStats` row for the sender's IP and
+user in the same session as the submission, flag or report it describes, so
+the counters commit or roll back together with it. Reads are then single
+indexed lookups.
+
+:func:`rebuild_abuse_stats` (``flask rebuild-abuse-stats``) recomputes every
+row from questions and reports, should the counters ever drift.
+"""
+
+from collections import defaultdict
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import AbuseStats, Answer, AnswerReport, Question, utcnow
+
+COUNTERS = ('submitted', 'flagged', 'hidden', 'reported')
+
+
+def _counter(name):
+    return getattr(AbuseStats, f'{name}_count')
+
+
+def _bump(key_col, key, deltas, now):
+    values = {_counter(name): _counter(name) + delta for name, delta in deltas.items()}
+    values[AbuseStats.last_seen_at] = now
+    query = AbuseStats.query.filter(key_col == key)
+    if query.update(values, synchronize_session=False):
+        return
+    row = AbuseStats(last_seen_at=now, **{key_col.key: key})
+    for name in COUNTERS:
+        setattr(row, _counter(name).key, deltas.get(name, 0))
+    try:
+        with db.session.begin_nested():
+            db.session.add(row)
+    except IntegrityError:
+        # Another request created the row first.
+        query.update(values, synchronize_session=False)
+
+
+def record(user_id=None, ip_address=None, **deltas):
+    """Add ``deltas`` (e.g. ``flagged=1``) to the counters of ``user_id`` and ``ip_address``.
+
+    Nothing is committed; the caller's commit makes the change visible.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    unknown = set(deltas) - set(COUNTERS)
+    if unknown:
+        raise ValueError(f'Unknown abuse counters: {", ".join(sorted(unknown))}')
+    if not deltas:
+        return
+    now = utcnow()
+    if user_id is not None:
+        _bump(AbuseStats.user_id, user_id, deltas, now)
+    if ip_address:
+        _bump(AbuseStats.ip_address, ip_address, deltas, now)
+
+
+def ips_over_threshold(ip_addresses, threshold):
+    """Those of ``ip_addresses`` with at least ``threshold`` flagged questions."""
+    if not ip_addresses:
+        return []
+    return [
+        ip for ip, in
+        db.session.query(AbuseStats.ip_address)
+        .filter(AbuseStats.ip_address.in_(ip_addresses), AbuseStats.flagged_count >= threshold)
+    ]
+
+
+def flag_alerts(threshold):
+    """Rows with at least ``threshold`` flagged questions, most flagged first."""
+    return (
+        AbuseStats.query
+        .filter(AbuseStats.flagged_count >= threshold)
+        .order_by(AbuseStats.flagged_count.desc())
+        .all()
+    )
+
+
+def rebuild_abuse_stats():
+    """Recompute every counter from the question and report tables."""
+    flagged = db.func.sum(db.case((Question.is_flagged == db.true(), 1), else_=0))
+    hidden = db.func.sum(db.case((Question.is_hidden == db.true(), 1), else_=0))
+    rows = defaultdict(dict)
+    for kind, key_col in (('user_id', Question.sender_id), ('ip_address', Question.ip_address)):
+        sent = (
+            db.session.query(key_col, db.func.count(Question.id), flagged, hidden, db.func.max(Question.created_at))
+            .filter(key_col.isnot(None))
+            .group_by(key_col)
+        )
+        for key, submitted, flagged_n, hidden_n, last_seen in sent:
+            rows[kind, key].update(submitted_count=submitted, flagged_count=flagged_n or 0,
+                                   hidden_count=hidden_n or 0, last_seen_at=last_seen)
+    reported = (
+        db.session.query(Answer.author_id, db.func.count(AnswerReport.id), db.func.max(AnswerReport.created_at))
+        .join(AnswerReport, AnswerReport.answer_id == Answer.id)
+        .group_by(Answer.author_id)
+    )
+    for author_id, count, last_report in reported:
+        row = rows['user_id', author_id]
+        row['reported_count'] = count
+        if last_report and (row.get('last_seen_at') is None or last_report > row['last_seen_at']):
+            row['last_seen_at'] = last_report
+
+    db.session.execute(db.delete(AbuseStats))
+    if rows:
+        db.session.execute(db.insert(AbuseStats), [
+            {'user_id': None, 'ip_address': None, 'submitted_count': 0, 'flagged_count': 0,
+             'hidden_count': 0, 'reported_count': 0, 'last_seen_at': None, kind: key, **values}
+            for (kind, key), values in rows.items()
+        ])
+    db.session.commit()
+    return len(rows)
+
+
+def init_app(app):
+    @app.cli.command('rebuild-abuse-stats')
+    def rebuild_abuse_stats_command():
+        """Recompute the per-IP and per-user abuse counters."""
+        print(f'Abuse counters rebuilt for {rebuild_abuse_stats()} users and IP addresses.')
@@ -0,0 +1,198 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Read-only JSON API, version 1, mounted at ``/api/v1``.
+
+List endpoints select plain column rows (answer, question and author in one
+join) and turn them into dicts directly, without building ORM objects or
+rendering templates. ``?fields=`` picks a subset of :data:`ANSWER_FIELDS`,
+``?limit=`` sets the page size and ``?after=`` continues from the
+``next_cursor`` of a previous page. Responses carry an ETag from a cheap
+validator query, so an unchanged resource is answered with 304 before its
+rows are read.
+"""
+
+from flask import Blueprint, abort, jsonify, redirect, request, url_for
+
+from avatars import avatar_src
+from extensions import db
+from models import Answer, Question, User, iso_utc, newest_answer
+from pagination import InvalidCursor, decode_cursor, encode_cursor
+from response_cache import cache_anonymous_get, user_token
+
+bp = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+_ROW_COLUMNS = (
+    Answer.id,
+    Answer.public_id,
+    Answer.answer_text,
+    Answer.created_at,
+    Question.question_text,
+    Question.created_at.label('asked_at'),
+    User.username,
+    User.avatar_url,
+    User.avatar_status,
+    User.avatar_mirror,
+)
+
+
+# Field name -> function of one row from _ROW_COLUMNS.
+ANSWER_FIELDS = {
+    'id': lambda row: row.public_id,
+    'question': lambda row: row.question_text,
+    'asked_at': lambda row: iso_utc(row.asked_at),
+    'answer': lambda row: row.answer_text,
+    'answered_at': lambda row: iso_utc(row.created_at),
+    'author': lambda row: row.username,
+    'author_avatar': lambda row: avatar_src(row, external=True),
+    'url': lambda row: url_for('answer_permalink', username=row.username, public_id=row.public_id, _external=True),
+}
+
+
+def _selected_fields():
+    """Serializers for the ``fields`` query argument, in the order given."""
+    names = request.args.get('fields')
+    if not names:
+        return list(ANSWER_FIELDS.items())
+    selected = []
+    for name in names.split(','):
+        name = name.strip()
+        if name not in ANSWER_FIELDS:
+            abort(400, f'Unknown field {name!r}; choose from {", ".join(ANSWER_FIELDS)}.')
+        selected.append((name, ANSWER_FIELDS[name]))
+    return selected
+
+
+def _limit():
+    limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= MAX_LIMIT:
+        abort(400, f'limit must be between 1 and {MAX_LIMIT}.')
+    return limit
+
+
+def _answer_select():
+    return (
+        db.select(*_ROW_COLUMNS)
+        .join(Question, Question.id == Answer.question_id)
+        .join(User, User.id == Answer.author_id)
+    )
+
+
+def _serialize(rows, fields):
+    return [{name: serialize(row) for name, serialize in fields} for row in rows]
+
+
+def _answer_page(stmt):
+    """JSON page of ``stmt``'s answers, newest first, continuing from ``?after=``."""
+    fields = _selected_fields()
+    limit = _limit()
+    after = request.args.get('after')
+    if after:
+        try:
+            created_at, answer_id = decode_cursor(after)
+        except InvalidCursor:
+            abort(400, 'Invalid cursor.')
+        stmt = stmt.where(db.or_(
+            Answer.created_at < created_at,
+            db.and_(Answer.created_at == created_at, Answer.id < answer_id),
+        ))
+    rows = db.session.execute(
+        stmt.order_by(Answer.created_at.desc(), Answer.id.desc()).limit(limit + 1)
+    ).all()
+    next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return jsonify(answers=_serialize(rows[:limit], fields), next_cursor=next_cursor)
+
+
+def _feed_validator():
+    newest = newest_answer()
+    return (newest.created_at, newest.id) if newest else (None, 'empty')
+
+
+def _user_validator(username):
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        return None
+    newest = newest_answer(Answer.author_id == user.id)
+    if newest is None:
+        return user.created_at, user_token(user)
+    return newest.created_at, f'{user_token(user)}:{newest.id}'
+
+
+def _answer_validator(public_id):
+    row = db.session.execute(
+        db.select(Answer.created_at, Answer.id, User)
+        .join(User, User.id == Answer.author_id)
+        .where(Answer.public_id == public_id)
+    ).first()
+    if row is None:
+        return None
+    return row.created_at, f'{user_token(row.User)}:{row.id}'
+
+
+@bp.errorhandler(400)
+@bp.errorhandler(404)
+def json_error(e):
+    return jsonify(error=e.description), e.code
+
+
+@bp.route('/feed')
+@cache_anonymous_get(_feed_validator, per_visitor=False)
+def feed():
+    """Every answer, newest first."""
+    return _answer_page(_answer_select())
+
+
+@bp.route('/users/<username>')
+@cache_anonymous_get(_user_validator, per_visitor=False)
+def user(username):
+    """Public profile of one user."""
+    user = User.query.filter_by(username=username).first_or_404()
+    return jsonify(
+        username=user.username,
+        bio=user.bio,
+        avatar=avatar_src(user, external=True),
+        joined_at=iso_utc(user.created_at),
+        answer_count=db.session.scalar(db.select(db.func.count(Answer.id)).where(Answer.author_id == user.id)),
+        url=url_for('profile', username=user.username, _external=True),
+        answers_url=url_for('api_v1.user_answers', username=user.username, _external=True),
+    )
+
+
+@bp.route('/users/<username>/answers')
+@cache_anonymous_get(_user_validator, per_visitor=False)
+def user_answers(username):
+    """One user's answers, newest first."""
+    user_id = db.session.scalar(db.select(User.id).where(User.username == username))
+    if user_id is None:
+        abort(404, 'No such user.')
+    return _answer_page(_answer_select().where(Answer.author_id == user_id))
+
+
+@bp.route('/answers/<public_id>')
+@cache_anonymous_get(_answer_validator, per_visitor=False)
+def answer(public_id):
+    """A single answer by its public id."""
+    row = db.session.execute(_answer_select().where(Answer.public_id == public_id)).first()
+    if row is None:
+        current_id = db.session.scalar(db.select(Answer.public_id).where(Answer.legacy_public_id == public_id))
+        if current_id is None:
+            abort(404, 'No such answer.')
+        query = f'?{request.query_string.decode()}' if request.query_string else ''
+        return redirect(url_for('api_v1.answer', public_id=current_id) + query, code=301)
+    return jsonify(_serialize([row], _selected_fields())[0])
@@ -14,15 +14,36 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from flask import Flask, render_template, url_for, flash, redirect, request, abort
+from flask import Flask, Response, render_template, url_for, flash, redirect, request, abort, jsonify, send_from_directory
 from markupsafe import Markup, escape
 from extensions import db, migrate
-from forms import RegistrationForm, LoginForm, QuestionForm, AnswerForm, UpdateAccountForm, ModerateQuestionForm, AnswerReportForm, BlockForm
-from models import User, Question, Answer, AnswerReport, Block, utcnow
+from forms import RegistrationForm, LoginForm, QuestionForm, AnswerForm, UpdateAccountForm, ModerateQuestionForm, BulkModerateForm, BulkSelectionForm, AnswerReportForm, BlockForm
+from models import User, Question, Answer, AnswerReport, Block, newest_answer, utcnow
+from pagination import InvalidCursor, keyset_paginate
+import abuse
+import api
+import avatars
+import blocks
+import export
+import feeds
+import fragments
+import instrumentation
+import metrics
+import response_cache
+import search
+from avatars import AVATAR_OK, AVATAR_PENDING, avatar_checks, get_avatar_mirror, schedule_avatar_check
+from blocks import block_index
+from instrumentation import get_endpoint_stats
+from ratelimit import rate_limited
+from response_cache import cache_anonymous_get, invalidate_responses, user_token
+from search import SearchUnavailable, search_answers
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.middleware.proxy_fix import ProxyFix
-from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from collections import defaultdict
+from datetime import timedelta, timezone
 from dotenv import load_dotenv
 import os
 import secrets
@@ -41,6 +62,29 @@ if not secret_key:
 app.config['SECRET_KEY'] = secret_key
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///qbox.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Counting every answer for "N answers" is the only part of a feed page whose
+# cost grows with the table, so it is skipped unless explicitly enabled.
+app.config['FEED_SKIP_TOTAL'] = os.getenv('FEED_SKIP_TOTAL', '1') != '0'
+# Where rate-limit counters live: memory://, sqlite:///path or redis://host:port/db.
+app.config['RATE_LIMIT_STORAGE'] = os.getenv('RATE_LIMIT_STORAGE', 'memory://')
+# Optional shared store for rendered answer cards, e.g. redis://host:6379/0.
+app.config['FRAGMENT_CACHE_URL'] = os.getenv('FRAGMENT_CACHE_URL')
+if os.getenv('FRAGMENT_CACHE_VERSION'):
+    app.config['FRAGMENT_CACHE_VERSION'] = os.getenv('FRAGMENT_CACHE_VERSION')
+# Whole-page caching and 304s for logged-out visitors; TTL bounds cross-worker staleness.
+app.config['RESPONSE_CACHE_ENABLED'] = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL', '60'))
+# Per-request SQL/template timing in a Server-Timing header and /admin/performance.
+app.config['SQL_INSTRUMENTATION'] = os.getenv('SQL_INSTRUMENTATION', '0').lower() in ('1', 'true', 'yes')
+# Shared directory for merging Prometheus metrics across worker processes.
+app.config['METRICS_MULTIPROC_DIR'] = os.getenv('METRICS_MULTIPROC_DIR')
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+# Serve verified avatars from a local mirror rather than third-party hosts.
+app.config['AVATAR_MIRROR_ENABLED'] = os.getenv('AVATAR_MIRROR_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+if os.getenv('AVATAR_MIRROR_DIR'):
+    app.config['AVATAR_MIRROR_DIR'] = os.getenv('AVATAR_MIRROR_DIR')
+# Seconds between background passes that mark expired blocks inactive (0 disables).
+app.config['BLOCK_SWEEP_INTERVAL'] = int(os.getenv('BLOCK_SWEEP_INTERVAL', '300'))
 if os.getenv('FLASK_ENV') == 'production':
     # Lock down host/canonical scheme in production.
     app.config['SERVER_NAME'] = os.getenv('SERVER_NAME', None)
@@ -48,6 +92,17 @@ if os.getenv('FLASK_ENV') == 'production':
 
 db.init_app(app)
 migrate.init_app(app, db)
+instrumentation.init_app(app)
+metrics.init_app(app)
+abuse.init_app(app)
+avatars.init_app(app)
+blocks.init_app(app)
+fragments.init_app(app)
+response_cache.init_app(app)
+search.init_app(app)
+app.register_blueprint(api.bp)
+feeds.init_app(app)
+export.init_app(app)
 
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
@@ -62,15 +117,8 @@ def load_user(user_id):
 
 @app.context_processor
 def inject_now():
-    unanswered_count = 0
-    if current_user.is_authenticated:
-        unanswered_count = (
-            Question.query
-            .filter_by(receiver_id=current_user.id)
-            .filter(~Question.answers.any())
-            .filter_by(is_hidden=False)
-            .count()
-        )
+    # Read the denormalized badge count so rendering costs no extra query.
+    unanswered_count = current_user.unanswered_count if current_user.is_authenticated else 0
     return {'now': utcnow, 'unanswered_count': unanswered_count}
 
 @app.template_filter('time_since')
@@ -106,64 +154,195 @@ def nl2br(value):
     return Markup(escaped.replace('\n', Markup('<br>')))
 
 
+def _client_ip():
+    return (request.access_route[0] if request.access_route else request.remote_addr) or '0.0.0.0'
+
+
 def _active_block_for(user_id, ip_address):
-    now = utcnow()
-    blocks = Block.query.filter_by(active=True).all()
-    matched = None
-    for block in blocks:
-        if block.expires_at and block.expires_at <= now:
-            block.active = False
-            continue
-        if block.user_id and user_id and block.user_id == user_id:
-            matched = block
-            break
-        if block.ip_address and ip_address and block.ip_address == ip_address:
-            matched = block
-            break
+    return block_index.lookup(user_id, ip_address)
+
+FEED_PAGE_SIZE = 20
+NEW_USERS_PAGE_SIZE = 10
+PROFILE_PAGE_SIZE = 20
+AVATAR_FILE_MAX_AGE = 365 * 24 * 3600
+ADMIN_PAGE_SIZE = 25
+REPORT_DETAIL_LIMIT = 200
+# Flagged questions from one sender or IP before admins are alerted (and
+# anonymous IPs auto-blocked).
+FLAG_ALERT_THRESHOLD = 5
+
+def _adjust_unanswered_count(user_id, delta):
+    """Shift a receiver's denormalized unanswered-question count by ``delta``."""
+    User.query.filter_by(id=user_id).update({User.unanswered_count: User.unanswered_count + delta})
+
+
+def recount_unanswered(user_id=None):
+    """Recompute ``User.unanswered_count`` from the question table."""
+    unanswered = (
+        db.select(db.func.count(Question.id))
+        .where(Question.receiver_id == User.id)
+        .where(Question.answered_at.is_(None))
+        .where(Question.is_hidden == db.false())
+        .scalar_subquery()
+    )
+    stmt = db.update(User).values(unanswered_count=unanswered)
+    if user_id is not None:
+        stmt = stmt.where(User.id == user_id)
+    db.session.execute(stmt)
+
+
+@app.cli.command('recount-unanswered')
+def recount_unanswered_command():
+    """Repair every user's unanswered-question badge count."""
+    recount_unanswered()
     db.session.commit()
-    return matched
+    print('Unanswered question counts recomputed.')
+
+def _feed_validator():
+    """Newest answer and user: any new row moves the feed's first page."""
+    newest_answer_id, newest_answer_at, newest_user_id = db.session.execute(db.select(
+        db.select(db.func.max(Answer.id)).scalar_subquery(),
+        db.select(db.func.max(Answer.created_at)).scalar_subquery(),
+        db.select(db.func.max(User.id)).scalar_subquery(),
+    )).one()
+    return newest_answer_at, f'{newest_answer_id}:{newest_user_id}'
+
+def _profile_validator(username):
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        return None
+    newest = newest_answer(Answer.author_id == user.id)
+    if newest is None:
+        return user.created_at, user_token(user)
+    return newest.created_at, f'{user_token(user)}:{newest.id}'
+
+def _permalink_validator(username, public_id):
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        return None
+    answer = db.session.execute(
+        db.select(Answer.id, Answer.created_at).filter_by(public_id=public_id, author_id=user.id)
+    ).first()
+    if answer is None:
+        return None
+    return answer.created_at, f'{user_token(user)}:{answer.id}'
 
 @app.route('/')
 def home():
     return render_template('index.html', current_user=current_user)
 
 @app.route('/feed')
+@cache_anonymous_get(_feed_validator)
 def feed():
-    """Public feed showing recent answers."""
-    page = request.args.get('page', 1, type=int)
-    user_page = request.args.get('users', 1, type=int)
-    answers = (
-        Answer.query
-        .order_by(Answer.created_at.desc())
-        .paginate(page=page, per_page=20, error_out=False)
-    )
-    new_users = (
-        User.query
-        .order_by(User.created_at.desc())
-        .paginate(page=user_page, per_page=10, error_out=False)
-    )
+    """Public feed showing recent answers, paginated by opaque cursors."""
+    answer_args = {k: request.args[k] for k in ('after', 'before') if request.args.get(k)}
+    user_args = {k: request.args[k] for k in ('users_after', 'users_before') if request.args.get(k)}
+    with_total = not app.config['FEED_SKIP_TOTAL']
+    try:
+        answers = keyset_paginate(
+            Answer.query.options(joinedload(Answer.author), joinedload(Answer.question)),
+            Answer.created_at, Answer.id,
+            per_page=FEED_PAGE_SIZE,
+            after=answer_args.get('after'),
+            before=answer_args.get('before'),
+            with_total=with_total,
+        )
+        new_users = keyset_paginate(
+            User.query, User.created_at, User.id,
+            per_page=NEW_USERS_PAGE_SIZE,
+            after=user_args.get('users_after'),
+            before=user_args.get('users_before'),
+            with_total=with_total,
+        )
+    except InvalidCursor:
+        abort(400)
     report_form = AnswerReportForm()
-    return render_template('feed.html', answers=answers, new_users=new_users, report_form=report_form)
+    return render_template('feed.html', answers=answers, new_users=new_users, report_form=report_form,
+                           answer_args=answer_args, user_args=user_args)
 
 @app.route('/user/<username>/a/<public_id>')
+@cache_anonymous_get(_permalink_validator)
 def answer_permalink(username, public_id):
     """Show a single answer permalinked by its public ID."""
     user = User.query.filter_by(username=username).first_or_404()
-    answer = Answer.query.filter_by(public_id=public_id, author_id=user.id).first_or_404()
+    answer = (
+        Answer.query
+        .options(joinedload(Answer.question))
+        .filter_by(public_id=public_id, author_id=user.id)
+        .first()
+    )
+    if answer is None:
+        current_id = db.session.scalar(
+            db.select(Answer.public_id).filter_by(legacy_public_id=public_id, author_id=user.id)
+        )
+        if current_id is None:
+            abort(404)
+        return redirect(url_for('answer_permalink', username=user.username, public_id=current_id), code=301)
     report_form = AnswerReportForm()
     return render_template('answer.html', user=user, answer=answer, report_form=report_form)
 
+def _search_page(user=None):
+    """Render search results for ``?q=``, optionally limited to ``user``'s answers."""
+    query = request.args.get('q', '').strip()
+    results = None
+    if query:
+        try:
+            results = search_answers(
+                query, app.config['SEARCH_PAGE_SIZE'],
+                after=request.args.get('after'),
+                author_id=user.id if user else None,
+                options=(joinedload(Answer.author), joinedload(Answer.question)),
+            )
+        except InvalidCursor:
+            abort(400)
+        except SearchUnavailable:
+            flash('Search is not available on this server.', 'danger')
+    return render_template('search.html', query=query, results=results, user=user,
+                           report_form=AnswerReportForm())
+
+@app.route('/search')
+def site_search():
+    """Full-text search over every answered question."""
+    return _search_page()
+
+@app.route('/user/<username>/search')
+def profile_search(username):
+    """Full-text search over one user's answers."""
+    user = User.query.filter_by(username=username).first_or_404()
+    return _search_page(user)
+
 @app.route('/faq')
 def faq():
     return render_template('faq.html')
 
+@app.route('/avatars/<name>')
+def avatar_file(name):
+    """Serve a mirrored avatar. Names are content hashes, so they can be cached forever."""
+    mirror = get_avatar_mirror()
+    if not mirror.exists(name):
+        # Evicted since the page was rendered.
+        return redirect(url_for('static', filename='images/default-avatar.png'))
+    resp = send_from_directory(mirror.directory, name, max_age=AVATAR_FILE_MAX_AGE)
+    resp.cache_control.immutable = True
+    resp.headers['X-Content-Type-Options'] = 'nosniff'
+    return resp
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape target."""
+    return Response(metrics.scrape(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/answers/<int:answer_id>/report', methods=['POST'])
 def report_answer(answer_id):
     form = AnswerReportForm()
     if not form.validate_on_submit() or int(form.answer_id.data) != answer_id:
         abort(400)
     answer = Answer.query.get_or_404(answer_id)
-    reporter_ip = (request.access_route[0] if request.access_route else request.remote_addr) or '0.0.0.0'
+    reporter_ip = _client_ip()
+    back = request.referrer or url_for('answer_permalink', username=answer.author.username, public_id=answer.public_id)
+    if rate_limited('report_answer', reporter_ip):
+        flash('You are sending reports too quickly. Please wait a moment and try again.', 'danger')
+        return redirect(back)
     report = AnswerReport(
         answer_id=answer.id,
         reporter_user_id=current_user.id if current_user.is_authenticated else None,
@@ -171,9 +350,11 @@ def report_answer(answer_id):
         reason=form.reason_text.data or form.reason_choice.data,
     )
     db.session.add(report)
+    abuse.record(user_id=answer.author_id, reported=1)
     db.session.commit()
+    metrics.REPORTS_FILED.inc()
     flash('Answer reported for review.', 'success')
-    return redirect(request.referrer or url_for('answer_permalink', username=answer.author.username, public_id=answer.public_id))
+    return redirect(back)
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -181,6 +362,9 @@ def register():
         return redirect(url_for('profile', username=current_user.username))
     form = RegistrationForm()
     if form.validate_on_submit():
+        if rate_limited('register', _client_ip()):
+            flash('Too many sign-ups from your network. Please try again later.', 'danger')
+            return render_template('register.html', form=form), 429
         try:
             hashed_password = generate_password_hash(form.password.data)
             user = User(
@@ -188,10 +372,13 @@ def register():
                 email=form.email.data,
                 password_hash=hashed_password,
                 bio=form.bio.data,
-                avatar_url=form.avatar_url.data,
+                avatar_url=form.avatar_url.data or None,
+                avatar_status=AVATAR_PENDING if form.avatar_url.data else None,
             )
             db.session.add(user)
             db.session.commit()
+            if user.avatar_url:
+                schedule_avatar_check(user)
             flash('Your account has been created!', 'success')
             return redirect(url_for('home'))
         except Exception as e:
@@ -206,6 +393,9 @@ def login():
         return redirect(url_for('profile', username=current_user.username))
     form = LoginForm()
     if form.validate_on_submit():
+        if rate_limited('login', _client_ip()):
+            flash('Too many login attempts. Please wait a moment and try again.', 'danger')
+            return render_template('login.html', form=form), 429
         user = User.query.filter_by(email=form.email.data).first()
         if user and check_password_hash(user.password_hash, form.password.data):
             login_user(user, remember=form.remember.data)
@@ -223,30 +413,21 @@ def logout():
     return redirect(url_for('home'))
 
 @app.route('/user/<username>', methods=['GET', 'POST'])
+@cache_anonymous_get(_profile_validator)
 def profile(username):
     user = User.query.filter_by(username=username).first_or_404()
     question_form = QuestionForm()
     answer_form = AnswerForm()
     report_form = AnswerReportForm()
     if question_form.validate_on_submit():
-        # Simple per-IP rate limit: max 5 questions per minute per receiver.
-        ip_address = (
-            request.access_route[0]
-            if request.access_route
-            else request.remote_addr
-        ) or '0.0.0.0'
+        ip_address = _client_ip()
         block = _active_block_for(current_user.id if current_user.is_authenticated else None, ip_address)
         if block:
+            metrics.BLOCK_HITS.inc()
             flash('You are blocked from submitting questions at this time.', 'danger')
             return redirect(url_for('profile', username=username))
-        recent_window = utcnow() - timedelta(minutes=1)
-        recent_count = (
-            Question.query
-            .filter_by(receiver_id=user.id, ip_address=ip_address)
-            .filter(Question.created_at >= recent_window)
-            .count()
-        )
-        if recent_count >= 5:
+        # Per-IP, per-receiver limit (RATE_LIMITS['profile'], 5 a minute by default).
+        if rate_limited('profile', f'{user.id}:{ip_address}'):
             flash('You are sending questions too quickly. Please wait a moment and try again.', 'danger')
             return redirect(url_for('profile', username=username))
         if current_user.is_authenticated:
@@ -263,7 +444,10 @@ def profile(username):
             ip_address=ip_address,
         )
         db.session.add(question)
+        _adjust_unanswered_count(user.id, 1)
+        abuse.record(user_id=sender_id, ip_address=ip_address, submitted=1)
         db.session.commit()
+        metrics.QUESTIONS_SUBMITTED.inc()
         flash('Your question has been submitted!', 'success')
         return redirect(url_for('profile', username=username))
     if answer_form.validate_on_submit():
@@ -273,14 +457,47 @@ def profile(username):
         question = Question.query.filter_by(id=question_id, receiver_id=user.id).first()
         if not question:
             abort(404)
-        if not question.answers:
+        # Claim the question first: only one request can flip answered_at, and
+        # the unique constraint on Answer.question_id backs that up.
+        claimed = (
+            Question.query
+            .filter(Question.id == question.id, Question.answered_at.is_(None))
+            .update({Question.answered_at: utcnow()}, synchronize_session=False)
+        )
+        if claimed:
             answer = Answer(question_id=question.id, author_id=current_user.id, answer_text=answer_form.answer_text.data)
-            db.session.add(answer)
-            db.session.commit()
-            flash('Your answer has been submitted!', 'success')
-            return redirect(url_for('profile', username=username))
-    answers = Answer.query.filter_by(author_id=user.id).order_by(Answer.created_at.desc()).all()
-    return render_template('profile.html', user=user, question_form=question_form, answer_form=answer_form, answers=answers, report_form=report_form)
+            if not question.is_hidden:
+                _adjust_unanswered_count(user.id, -1)
+            try:
+                answer.insert()
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+            else:
+                flash('Your answer has been submitted!', 'success')
+                return redirect(url_for('profile', username=username))
+        flash('That question has already been answered.', 'danger')
+    answers = _profile_answers_page(user)
+    return render_template('profile.html', user=user, question_form=question_form, answer_form=answer_form,
+                           answers=answers.items, answers_page=answers, report_form=report_form)
+
+def _profile_answers_page(user):
+    """Return one page of ``user``'s answers, continuing after ``?after=``."""
+    # The author is ``user`` itself; only the questions need loading alongside.
+    query = Answer.query.options(joinedload(Answer.question)).filter_by(author_id=user.id)
+    try:
+        return keyset_paginate(query, Answer.created_at, Answer.id, per_page=PROFILE_PAGE_SIZE,
+                               after=request.args.get('after'))
+    except InvalidCursor:
+        abort(400)
+
+@app.route('/user/<username>/answers')
+def profile_answers(username):
+    """Return the next batch of rendered answer cards for "load more"."""
+    user = User.query.filter_by(username=username).first_or_404()
+    answers = _profile_answers_page(user)
+    html = render_template('profile_answers.html', user=user, answers=answers.items)
+    return jsonify(html=html, next=answers.next_cursor)
 
 @app.route('/profile/<username>')
 def legacy_profile(username):
@@ -296,15 +513,16 @@ def dashboard():
     unanswered_questions = (
         Question.query
         .filter_by(receiver_id=current_user.id)
-        .filter(~Question.answers.any())
+        .filter(Question.answered_at.is_(None))
         .filter_by(is_hidden=False)
         .order_by(Question.created_at.desc())
         .all()
     )
     answer_form = AnswerForm()
     moderate_form = ModerateQuestionForm()
+    bulk_form = BulkModerateForm()
     return render_template('dashboard.html', unanswered_questions=unanswered_questions,
-                           answer_form=answer_form, moderate_form=moderate_form)
+                           answer_form=answer_form, moderate_form=moderate_form, bulk_form=bulk_form)
 
 
 @app.route('/settings', methods=['GET', 'POST'])
@@ -315,10 +533,23 @@ def settings():
         current_user.username = update_form.username.data
         current_user.email = update_form.email.data
         current_user.bio = update_form.bio.data
-        current_user.avatar_url = update_form.avatar_url.data
+        new_avatar = update_form.avatar_url.data or None
+        avatar_changed = new_avatar != current_user.avatar_url
+        # Saving an avatar that is not verified yet retries the check, bypassing
+        # a cached failure that may have been a temporary host error.
+        recheck = new_avatar is not None and (avatar_changed or current_user.avatar_status != AVATAR_OK)
+        if recheck and not avatar_changed:
+            avatar_checks.discard(new_avatar)
+        if avatar_changed or recheck:
+            current_user.avatar_url = new_avatar
+            current_user.avatar_status = AVATAR_PENDING if new_avatar else None
+            current_user.avatar_mirror = None
         if update_form.password.data:
             current_user.password_hash = generate_password_hash(update_form.password.data)
         db.session.commit()
+        invalidate_responses()
+        if recheck:
+            schedule_avatar_check(current_user)
         flash('Your account has been updated!', 'success')
         return redirect(url_for('settings'))
 
@@ -331,6 +562,62 @@ def settings():
     return render_template('settings.html', update_form=update_form)
 
 
+def _moderate_questions(criteria, action):
+    """Hide, or flag and hide, every question matching ``criteria`` in one transaction.
+
+    The badge and abuse counters are adjusted from one grouped read of the
+    affected rows, the rows change in a single UPDATE, and the anonymous
+    auto-block is evaluated once for the whole batch. Returns how many
+    questions matched.
+    """
+    flagging = action == 'flag'
+    visible = Question.is_hidden == db.false()
+    groups = (
+        db.session.query(
+            Question.receiver_id, Question.sender_id, Question.ip_address,
+            db.func.count(Question.id),
+            db.func.sum(db.case((visible, 1), else_=0)),
+            db.func.sum(db.case((visible & Question.answered_at.is_(None), 1), else_=0)),
+            db.func.sum(db.case((Question.is_flagged == db.false(), 1), else_=0)),
+        )
+        .filter(*criteria)
+        .group_by(Question.receiver_id, Question.sender_id, Question.ip_address)
+        .all()
+    )
+    if not groups:
+        return 0
+    unanswered = defaultdict(int)
+    anonymous_ips = set()
+    for receiver_id, sender_id, ip_address, count, newly_hidden, waiting, unflagged in groups:
+        unanswered[receiver_id] += waiting
+        abuse.record(user_id=sender_id, ip_address=ip_address,
+                     hidden=newly_hidden, flagged=unflagged if flagging else 0)
+        if flagging and sender_id is None:
+            anonymous_ips.add(ip_address)
+    for receiver_id, waiting in unanswered.items():
+        if waiting:
+            _adjust_unanswered_count(receiver_id, -waiting)
+    values = {Question.is_hidden: True}
+    if flagging:
+        values[Question.is_flagged] = True
+    Question.query.filter(*criteria).update(values, synchronize_session=False)
+
+    # Auto-block anonymous IPs that have now been flagged repeatedly.
+    auto_blocked = False
+    for ip_address in abuse.ips_over_threshold(anonymous_ips, FLAG_ALERT_THRESHOLD):
+        if not _active_block_for(None, ip_address):
+            db.session.add(Block(
+                ip_address=ip_address,
+                reason='Auto-blocked after repeated flags',
+                expires_at=utcnow() + timedelta(days=30),
+                active=True,
+            ))
+            auto_blocked = True
+    db.session.commit()
+    if auto_blocked:
+        block_index.invalidate()
+    return sum(group[3] for group in groups)
+
 @app.route('/questions/<int:question_id>/moderate', methods=['POST'])
 @login_required
 def moderate_question(question_id):
@@ -341,98 +628,184 @@ def moderate_question(question_id):
     if question.receiver_id != current_user.id:
         abort(403)
     action = form.action.data
-    if action == 'hide':
-        question.is_hidden = True
-        flash('Question hidden.', 'success')
-    elif action == 'flag':
-        question.is_flagged = True
-        question.is_hidden = True
-        flash('Question flagged and hidden.', 'success')
-        # Auto-block anonymous IP if repeatedly flagged.
-        if not question.sender_id:
-            flagged_count = Question.query.filter_by(ip_address=question.ip_address, is_flagged=True).count()
-            if flagged_count >= 5 and not _active_block_for(None, question.ip_address):
-                auto_block = Block(
-                    ip_address=question.ip_address,
-                    reason='Auto-blocked after repeated flags',
-                    expires_at=utcnow() + timedelta(days=30),
-                    active=True,
-                )
-                db.session.add(auto_block)
-    else:
+    if action not in ('hide', 'flag'):
         abort(400)
-    db.session.commit()
+    _moderate_questions([Question.id == question.id], action)
+    flash('Question hidden.' if action == 'hide' else 'Question flagged and hidden.', 'success')
     return redirect(url_for('dashboard'))
 
+def _bulk_question_criteria(form):
+    """Selection criteria for a bulk moderation form: checked ids, or one question's IP."""
+    if form.same_ip_as.data:
+        try:
+            source = db.session.get(Question, int(form.same_ip_as.data))
+        except ValueError:
+            abort(400)
+        return source, [Question.ip_address == source.ip_address] if source else None
+    question_ids = request.form.getlist('question_ids', type=int)
+    return None, [Question.id.in_(question_ids)] if question_ids else None
+
+@app.route('/dashboard/moderate', methods=['POST'])
+@login_required
+def bulk_moderate_questions():
+    """Hide or flag several inbox questions, or all of them from one sender's IP."""
+    form = BulkModerateForm()
+    if not form.validate_on_submit() or form.action.data not in ('hide', 'flag'):
+        abort(400)
+    source, criteria = _bulk_question_criteria(form)
+    if source is not None and source.receiver_id != current_user.id:
+        abort(403)
+    if not criteria:
+        flash('Select at least one question.', 'danger')
+        return redirect(url_for('dashboard'))
+    criteria += [Question.receiver_id == current_user.id, Question.answered_at.is_(None)]
+    count = _moderate_questions(criteria, form.action.data)
+    verb = 'hidden' if form.action.data == 'hide' else 'flagged and hidden'
+    flash(f'{count} question(s) {verb}.', 'success')
+    return redirect(url_for('dashboard'))
 
 def _admin_required():
     if not current_user.is_authenticated or not current_user.is_admin:
         abort(403)
 
+def _admin_page(query, created_col, id_col, prefix):
+    """Keyset-paginate one admin list using its ``<prefix>_after/_before`` args."""
+    try:
+        return keyset_paginate(query, created_col, id_col, per_page=ADMIN_PAGE_SIZE,
+                               after=request.args.get(f'{prefix}_after'),
+                               before=request.args.get(f'{prefix}_before'))
+    except InvalidCursor:
+        abort(400)
+
+def _admin_pager(page, prefix):
+    """Previous/next links for one list, keeping the other lists where they are."""
+    args = {k: v for k, v in request.args.items() if not k.startswith(f'{prefix}_')}
+    return {
+        'prev': url_for('admin_panel', **args, **{f'{prefix}_before': page.prev_cursor}) if page.has_prev else None,
+        'next': url_for('admin_panel', **args, **{f'{prefix}_after': page.next_cursor}) if page.has_next else None,
+    }
+
 @app.route('/admin/moderation', methods=['GET'])
 def admin_panel():
     _admin_required()
     block_form = BlockForm()
-    alerts = []
-    flagged_user_counts = (
-        db.session.query(Question.sender_id, db.func.count(Question.id))
-        .filter(Question.is_flagged.is_(True), Question.sender_id.isnot(None))
-        .group_by(Question.sender_id)
-        .all()
-    )
-    flagged_ip_counts = (
-        db.session.query(Question.ip_address, db.func.count(Question.id))
-        .filter(Question.is_flagged.is_(True))
-        .group_by(Question.ip_address)
-        .all()
+    alerts = [
+        f'User ID {row.user_id} has {row.flagged_count} flagged questions.' if row.user_id is not None
+        else f'IP {row.ip_address} has {row.flagged_count} flagged questions.'
+        for row in abuse.flag_alerts(FLAG_ALERT_THRESHOLD)
+    ]
+
+    flagged_questions = _admin_page(
+        Question.query.options(joinedload(Question.receiver), joinedload(Question.sender)).filter_by(is_flagged=True),
+        Question.created_at, Question.id, 'flagged',
     )
-    for uid, count in flagged_user_counts:
-        if uid and count >= 5:
-            alerts.append(f'User ID {uid} has {count} flagged questions.')
-    for ip, count in flagged_ip_counts:
-        if ip and count >= 5:
-            alerts.append(f'IP {ip} has {count} flagged questions.')
-
-    flagged_questions = Question.query.filter_by(is_flagged=True).order_by(Question.created_at.desc()).all()
-    answer_reports_raw = (
+    # One row per reported answer, newest report first; reasons are fetched
+    # per answer from answer_report_details when an admin opens them.
+    report_groups = (
         db.session.query(
             AnswerReport.answer_id,
-            AnswerReport.reason,
-            AnswerReport.created_at,
-            AnswerReport.reporter_user_id,
-            AnswerReport.reporter_ip,
-            User.username
+            db.func.count(AnswerReport.id).label('report_count'),
+            db.func.max(AnswerReport.created_at).label('latest_report'),
+            db.func.max(AnswerReport.id).label('latest_report_id'),
         )
+        .filter(AnswerReport.resolved == db.false())
+        .group_by(AnswerReport.answer_id)
+        .subquery()
+    )
+    answer_reports = _admin_page(
+        db.session.query(report_groups), report_groups.c.latest_report, report_groups.c.latest_report_id, 'reports',
+    )
+    answer_ids = [r.answer_id for r in answer_reports.items]
+    answers_by_id = {
+        a.id: a for a in
+        Answer.query.options(joinedload(Answer.author), joinedload(Answer.question))
+        .filter(Answer.id.in_(answer_ids)).all()
+    } if answer_ids else {}
+    blocks = _admin_page(Block.query.options(joinedload(Block.user)), Block.created_at, Block.id, 'blocks')
+
+    pagers = {
+        'flagged': _admin_pager(flagged_questions, 'flagged'),
+        'reports': _admin_pager(answer_reports, 'reports'),
+        'blocks': _admin_pager(blocks, 'blocks'),
+    }
+    return render_template('admin.html', flagged_questions=flagged_questions.items,
+                           answer_reports=answer_reports.items, answers_by_id=answers_by_id,
+                           blocks=blocks.items, alerts=alerts, block_form=block_form, pagers=pagers,
+                           bulk_form=BulkModerateForm(), selection_form=BulkSelectionForm())
+
+@app.route('/admin/reports/answers/<int:answer_id>')
+def answer_report_details(answer_id):
+    """Open reports on one answer, for the report-reasons modal."""
+    _admin_required()
+    reports = (
+        db.session.query(AnswerReport.reason, AnswerReport.created_at, AnswerReport.reporter_ip, User.username)
         .join(User, User.id == AnswerReport.reporter_user_id, isouter=True)
-        .filter(AnswerReport.resolved.is_(False))
+        .filter(AnswerReport.answer_id == answer_id, AnswerReport.resolved == db.false())
         .order_by(AnswerReport.created_at.desc())
+        .limit(REPORT_DETAIL_LIMIT)
         .all()
     )
-    grouped = {}
-    for r in answer_reports_raw:
-        reporter = r.username or r.reporter_ip or 'Unknown'
-        grouped.setdefault(r.answer_id, []).append({
+    return jsonify(reports=[
+        {
             'reason': r.reason,
             'created_at': r.created_at.isoformat() if r.created_at else '',
             'created_human': time_since(r.created_at) if r.created_at else 'unknown',
-            'reporter': reporter,
-        })
-    answer_reports = []
-    for aid, reports in grouped.items():
-        answer_reports.append({
-            'answer_id': aid,
-            'report_count': len(reports),
-            'latest_report': reports[0]['created_at'],
-            'reasons_json': reports,
-        })
-    blocks = Block.query.order_by(Block.created_at.desc()).all()
-
-    # Fetch answer objects for grouped reports
-    answers_by_id = {a.id: a for a in Answer.query.filter(Answer.id.in_([r['answer_id'] for r in answer_reports])).all()}
-
-    return render_template('admin.html', flagged_questions=flagged_questions,
-                           answer_reports=answer_reports, answers_by_id=answers_by_id,
-                           blocks=blocks, alerts=alerts, block_form=block_form)
+            'reporter': r.username or r.reporter_ip or 'Unknown',
+        }
+        for r in reports
+    ])
+
+@app.route('/admin/reports/answers/<int:answer_id>/resolve', methods=['POST'])
+def resolve_answer_reports(answer_id):
+    """Resolve every open report on one answer."""
+    _admin_required()
+    (
+        AnswerReport.query
+        .filter(AnswerReport.answer_id == answer_id, AnswerReport.resolved == db.false())
+        .update({AnswerReport.resolved: True}, synchronize_session=False)
+    )
+    db.session.commit()
+    flash('Reports resolved.', 'success')
+    return redirect(url_for('admin_panel'))
+
+@app.route('/admin/questions/moderate', methods=['POST'])
+def admin_moderate_questions():
+    """Hide or flag selected questions, or every question sent from one IP, site-wide."""
+    _admin_required()
+    form = BulkModerateForm()
+    if not form.validate_on_submit() or form.action.data not in ('hide', 'flag'):
+        abort(400)
+    _, criteria = _bulk_question_criteria(form)
+    if not criteria:
+        flash('Select at least one question.', 'danger')
+        return redirect(url_for('admin_panel'))
+    count = _moderate_questions(criteria, form.action.data)
+    verb = 'hidden' if form.action.data == 'hide' else 'flagged and hidden'
+    flash(f'{count} question(s) {verb}.', 'success')
+    return redirect(url_for('admin_panel'))
+
+@app.route('/admin/reports/resolve', methods=['POST'])
+def resolve_selected_reports():
+    """Resolve every open report on the selected answers."""
+    _admin_required()
+    if not BulkSelectionForm().validate_on_submit():
+        abort(400)
+    answer_ids = request.form.getlist('answer_ids', type=int)
+    if answer_ids:
+        (
+            AnswerReport.query
+            .filter(AnswerReport.answer_id.in_(answer_ids), AnswerReport.resolved == db.false())
+            .update({AnswerReport.resolved: True}, synchronize_session=False)
+        )
+        db.session.commit()
+    flash(f'Reports on {len(answer_ids)} answer(s) resolved.', 'success')
+    return redirect(url_for('admin_panel'))
+
+@app.route('/admin/performance', methods=['GET'])
+def admin_performance():
+    _admin_required()
+    return render_template('admin_performance.html', endpoints=get_endpoint_stats().summary(),
+                           enabled=app.config['SQL_INSTRUMENTATION'])
 
 @app.route('/admin/reports/<int:report_id>/resolve', methods=['POST'])
 def resolve_report(report_id):
@@ -475,15 +848,35 @@ def create_block():
     )
     db.session.add(block)
     db.session.commit()
+    block_index.invalidate()
     flash('Block created.', 'success')
     return redirect(url_for('admin_panel'))
 
+@app.route('/admin/blocks/deactivate', methods=['POST'])
+def deactivate_blocks():
+    """Deactivate the selected blocks."""
+    _admin_required()
+    if not BulkSelectionForm().validate_on_submit():
+        abort(400)
+    block_ids = request.form.getlist('block_ids', type=int)
+    if block_ids:
+        (
+            Block.query
+            .filter(Block.id.in_(block_ids))
+            .update({Block.active: False}, synchronize_session=False)
+        )
+        db.session.commit()
+        block_index.invalidate()
+    flash(f'{len(block_ids)} block(s) deactivated.', 'success')
+    return redirect(url_for('admin_panel'))
+
 @app.route('/admin/blocks/<int:block_id>/deactivate', methods=['POST'])
 def deactivate_block(block_id):
     _admin_required()
     block = Block.query.get_or_404(block_id)
     block.active = False
     db.session.commit()
+    block_index.invalidate()
     flash('Block deactivated.', 'success')
     return redirect(url_for('admin_panel'))
 
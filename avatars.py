@@ -0,0 +1,392 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Avatar URL verification.
+
+Forms only run the cheap syntactic checks; whether the URL is reachable, stays
+on an allowed host and points at a small enough image is checked afterwards on
+a thread pool, so a slow avatar host never holds up a form submission. While
+a check is outstanding the user's ``avatar_status`` is ``'pending'`` and pages
+show the default avatar; see :func:`avatar_src`.
+
+Verified avatars are then fetched once and mirrored: a normalized
+``AVATAR_RENDER_SIZE_PX`` PNG is stored under a content-hashed name in a
+size-bounded directory and served by the app with far-future cache headers,
+so page views never hit third-party hosts. Third-party bytes are never served
+as they are: without Pillow, mirroring is turned off and verified avatars are
+linked directly.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.parse import urlparse
+from urllib.request import HTTPRedirectHandler, Request, URLError, build_opener
+
+from flask import current_app, url_for
+
+from extensions import db
+from fragments import LRUCache
+from imageprobe import image_size
+from metrics import AVATAR_VERIFICATIONS
+from models import User
+from response_cache import invalidate_responses
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Without Pillow avatars cannot be normalized, so they are not mirrored.
+    Image = ImageOps = None
+
+CONFIG_DIR = Path(__file__).resolve().parent / "config"
+
+def _load_allowed_hosts():
+    path = CONFIG_DIR / "avatar_hosts.txt"
+    if path.exists():
+        with path.open() as f:
+            return [line.strip() for line in f if line.strip()]
+    return []
+
+ALLOWED_AVATAR_HOSTS = _load_allowed_hosts()
+ALLOWED_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+AVATAR_RENDER_SIZE_PX = 100
+MAX_AVATAR_DIMENSION = AVATAR_RENDER_SIZE_PX * 3
+# Headers are parsed incrementally, so this only bounds pathological files
+# (e.g. JPEGs with huge EXIF blocks ahead of the frame header).
+IMAGE_PROBE_MAX_BYTES = 256 * 1024
+MIRROR_FETCH_MAX_BYTES = 2 * 1024 * 1024
+
+AVATAR_PENDING = 'pending'
+AVATAR_OK = 'ok'
+AVATAR_FAILED = 'failed'
+
+AvatarCheck = namedtuple('AvatarCheck', 'ok width height checked_at')
+
+
+class _OneRedirectHandler(HTTPRedirectHandler):
+    """Follow at most one redirect, as avatar hosts only ever need one."""
+    max_redirections = 1
+
+
+def _host_allowed(url):
+    host = (urlparse(url).hostname or '').lower()
+    return any(host.endswith(h) for h in ALLOWED_AVATAR_HOSTS)
+
+
+def probe_avatar(url, max_dimension=MAX_AVATAR_DIMENSION):
+    """Check ``url`` with a single GET and return an :class:`AvatarCheck`.
+
+    The request may follow one redirect, which must stay on an allowed host;
+    the body is read only as far as the image header.
+    """
+    width = height = None
+    ok = False
+    try:
+        with build_opener(_OneRedirectHandler).open(Request(url, method="GET"), timeout=5) as resp:
+            if _host_allowed(resp.geturl()) and 200 <= resp.status < 300:
+                size = image_size(resp, IMAGE_PROBE_MAX_BYTES)
+                if size:
+                    width, height = size
+                    ok = width <= max_dimension and height <= max_dimension
+    except (HTTPError, URLError, OSError, ValueError):
+        pass
+    return AvatarCheck(ok, width, height, time.time())
+
+
+class AvatarCheckCache:
+    """URL -> :class:`AvatarCheck`, with separate TTLs for passes and failures.
+
+    Failures expire sooner so that a briefly unreachable host, or an image
+    that has since been resized, can be retried without waiting a day.
+    """
+
+    def __init__(self, maxsize=10000, ttl=86400, negative_ttl=300):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._results = LRUCache(maxsize)
+
+    def get(self, url, now=None):
+        check = self._results.get(url)
+        if check is None:
+            return None
+        ttl = self.ttl if check.ok else self.negative_ttl
+        if (time.time() if now is None else now) - check.checked_at > ttl:
+            self._results.delete(url)
+            return None
+        return check
+
+    def check(self, url):
+        """Return the cached result for ``url``, probing it on a miss."""
+        result = self.get(url)
+        if result is None:
+            result = probe_avatar(url)
+            self._results.set(url, result)
+        return result
+
+    def discard(self, url):
+        self._results.delete(url)
+
+    def clear(self):
+        self._results.clear()
+
+
+avatar_checks = AvatarCheckCache()
+
+
+def fetch_avatar(url, max_bytes=MIRROR_FETCH_MAX_BYTES):
+    """Download ``url`` in full (under the probe's rules), or None."""
+    try:
+        with build_opener(_OneRedirectHandler).open(Request(url, method="GET"), timeout=5) as resp:
+            if not _host_allowed(resp.geturl()) or not 200 <= resp.status < 300:
+                return None
+            data = resp.read(max_bytes + 1)
+    except (HTTPError, URLError, OSError, ValueError):
+        return None
+    return data if len(data) <= max_bytes else None
+
+
+def normalize_avatar(data, size=AVATAR_RENDER_SIZE_PX):
+    """Return ``(bytes, extension)`` for the mirrored copy of ``data``, or None."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(BytesIO(data)) as image:
+            thumb = ImageOps.fit(image.convert("RGBA"), (size, size))
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    out = BytesIO()
+    thumb.save(out, "PNG", optimize=True)
+    return out.getvalue(), "png"
+
+
+class AvatarMirror:
+    """Directory of content-addressed avatar files, capped at ``max_bytes``.
+
+    When a new file pushes the total over the cap, the least recently
+    stored files are removed; callers must drop references to them.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def exists(self, name):
+        return os.path.isfile(self.path(name))
+
+    def store(self, data, ext):
+        """Write ``data`` and return ``(name, evicted_names)``."""
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{hashlib.sha256(data).hexdigest()[:32]}.{ext}"
+        path = self.path(name)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return name, self._evict(keep=name)
+
+    def _evict(self, keep):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+                    total += stat.st_size
+        evicted = []
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(self.path(name))
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted.append(name)
+        return evicted
+
+
+def get_avatar_mirror(app=None):
+    """Return the app's :class:`AvatarMirror`, building it from config on first use."""
+    app = app or current_app
+    mirror = app.extensions.get('avatar_mirror')
+    if mirror is None:
+        mirror = AvatarMirror(app.config['AVATAR_MIRROR_DIR'], app.config['AVATAR_MIRROR_MAX_BYTES'])
+        app.extensions['avatar_mirror'] = mirror
+    return mirror
+
+
+def mirror_avatar(url):
+    """Return the mirror file name for verified avatar ``url``, or None."""
+    mirror = get_avatar_mirror()
+    existing = db.session.scalar(
+        db.select(User.avatar_mirror)
+        .where(User.avatar_url == url, User.avatar_mirror.isnot(None))
+        .limit(1)
+    )
+    if existing and mirror.exists(existing):
+        return existing
+    data = fetch_avatar(url)
+    normalized = normalize_avatar(data) if data else None
+    if normalized is None:
+        return None
+    name, evicted = mirror.store(*normalized)
+    if evicted:
+        (
+            User.query
+            .filter(User.avatar_mirror.in_(evicted))
+            .update({User.avatar_mirror: None}, synchronize_session=False)
+        )
+    return name
+
+
+def verify_avatar(user_id, url):
+    """Check ``url`` and record the outcome on the user, if it is still their avatar."""
+    ok = avatar_checks.check(url).ok
+    values = {User.avatar_status: AVATAR_OK if ok else AVATAR_FAILED}
+    AVATAR_VERIFICATIONS.inc(outcome=values[User.avatar_status])
+    if ok and current_app.config['AVATAR_MIRROR_ENABLED']:
+        values[User.avatar_mirror] = mirror_avatar(url)
+    # The user may have changed their avatar again while this ran.
+    changed = (
+        User.query
+        .filter_by(id=user_id, avatar_url=url, avatar_status=AVATAR_PENDING)
+        .update(values, synchronize_session=False)
+    )
+    db.session.commit()
+    if changed:
+        invalidate_responses()
+    return values[User.avatar_status]
+
+
+def _get_executor(app):
+    executor = app.extensions.get('avatar_executor')
+    if executor is None:
+        executor = ThreadPoolExecutor(app.config['AVATAR_VERIFY_WORKERS'], thread_name_prefix='qbox-avatar')
+        app.extensions['avatar_executor'] = executor
+    return executor
+
+
+def _run_verification(app, user_id, url):
+    with app.app_context():
+        try:
+            verify_avatar(user_id, url)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning('Avatar verification for user %s failed: %s', user_id, e)
+
+
+def schedule_avatar_check(user):
+    """Queue verification of ``user``'s avatar on the worker pool.
+
+    Call once the user's new ``avatar_url`` has been committed with
+    ``avatar_status`` set to :data:`AVATAR_PENDING`. URLs with a cached
+    result need no network and are settled inline, as is every check when
+    testing so that results are deterministic.
+    """
+    app = current_app._get_current_object()
+    if app.testing or avatar_checks.get(user.avatar_url) is not None:
+        _run_verification(app, user.id, user.avatar_url)
+    else:
+        _get_executor(app).submit(_run_verification, app, user.id, user.avatar_url)
+
+
+def avatar_src(user, external=False):
+    """URL to show for ``user``'s avatar: the mirrored copy, else the default.
+
+    With mirroring turned off, verified avatars are linked directly.
+    """
+    if user.avatar_mirror:
+        return url_for('avatar_file', name=user.avatar_mirror, _external=external)
+    if (user.avatar_url and user.avatar_status == AVATAR_OK
+            and not current_app.config['AVATAR_MIRROR_ENABLED']):
+        return user.avatar_url
+    return url_for('static', filename='images/default-avatar.png', _external=external)
+
+
+def remirror_avatars():
+    """Mirror verified avatars that have no mirrored copy; return how many were stored."""
+    mirrored = 0
+    users = User.query.filter(User.avatar_status == AVATAR_OK, User.avatar_mirror.is_(None)).all()
+    for user in users:
+        user.avatar_mirror = mirror_avatar(user.avatar_url)
+        db.session.commit()
+        mirrored += user.avatar_mirror is not None
+    if mirrored:
+        invalidate_responses()
+    return mirrored
+
+
+def recheck_avatars():
+    """Verify again every avatar left pending (e.g. by a restart) or failed.
+
+    Checks run inline and skip cached results. Returns ``{status: count}``.
+    """
+    rows = db.session.execute(
+        db.select(User.id, User.avatar_url)
+        .where(User.avatar_url.isnot(None), User.avatar_status.in_((AVATAR_PENDING, AVATAR_FAILED)))
+    ).all()
+    for url in {row.avatar_url for row in rows}:
+        avatar_checks.discard(url)
+    outcomes = {AVATAR_OK: 0, AVATAR_FAILED: 0}
+    for row in rows:
+        (
+            User.query
+            .filter_by(id=row.id, avatar_url=row.avatar_url)
+            .update({User.avatar_status: AVATAR_PENDING}, synchronize_session=False)
+        )
+        db.session.commit()
+        outcomes[verify_avatar(row.id, row.avatar_url)] += 1
+    return outcomes
+
+
+def init_app(app):
+    app.config.setdefault('AVATAR_VERIFY_WORKERS', 4)
+    app.config.setdefault('AVATAR_CHECK_TTL', 86400)
+    app.config.setdefault('AVATAR_CHECK_NEGATIVE_TTL', 300)
+    avatar_checks.ttl = app.config['AVATAR_CHECK_TTL']
+    avatar_checks.negative_ttl = app.config['AVATAR_CHECK_NEGATIVE_TTL']
+    app.config.setdefault('AVATAR_MIRROR_ENABLED', True)
+    if app.config['AVATAR_MIRROR_ENABLED'] and Image is None:
+        app.logger.warning('Pillow is not installed; avatars will be linked directly instead of mirrored.')
+        app.config['AVATAR_MIRROR_ENABLED'] = False
+    app.config.setdefault('AVATAR_MIRROR_DIR', os.path.join(app.instance_path, 'avatars'))
+    app.config.setdefault('AVATAR_MIRROR_MAX_BYTES', 64 * 1024 * 1024)
+    app.add_template_global(avatar_src)
+
+    @app.cli.command('mirror-avatars')
+    def mirror_avatars_command():
+        """Mirror verified avatars that have no local copy (e.g. after eviction)."""
+        print(f'Mirrored {remirror_avatars()} avatar(s).')
+
+    @app.cli.command('recheck-avatars')
+    def recheck_avatars_command():
+        """Verify pending and failed avatars again (e.g. after a restart lost queued checks)."""
+        outcomes = recheck_avatars()
+        print(f'Verified {outcomes[AVATAR_OK]} avatar(s); {outcomes[AVATAR_FAILED]} failed.')
@@ -0,0 +1,52 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Bytes read and time taken by the avatar image-header prober.
+
+Run with ``python -m benchmarks.imageprobe`` from the repository root. For each
+image in the test corpus this prints the file size, how many bytes
+:func:`imageprobe.probe` pulled from the stream, and the mean time per probe.
+"""
+
+import argparse
+import timeit
+from io import BytesIO
+
+from imageprobe import probe
+from tests.image_corpus import corpus
+
+
+def run(number):
+    rows = []
+    for name, (data, expected) in sorted(corpus().items()):
+        result = probe(BytesIO(data))
+        assert (result.width, result.height) == expected, name
+        seconds = timeit.timeit(lambda: probe(BytesIO(data)), number=number) / number
+        rows.append((name, result.format, len(data), result.bytes_read, seconds * 1e6))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=2000, help='probes per image (default 2000)')
+    args = parser.parse_args(argv)
+    print(f"{'image':<22}{'format':<8}{'file bytes':>12}{'bytes read':>12}{'us/probe':>10}")
+    for name, fmt, size, read, micros in run(args.number):
+        print(f'{name:<22}{fmt:<8}{size:>12}{read:>12}{micros:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Route latency and query-count benchmark over a synthetic dataset.
+
+Seeds a fresh SQLite database for each requested size, then requests the
+feed, profiles, answer permalinks, the dashboard, the admin panel and the
+JSON API's feed and user answers through the Flask test client, recording
+latency percentiles and SQL statement counts. Results are written as JSON so runs on different
+branches can be compared, e.g.::
+
+    python -m benchmarks.routes --users 500 5000 50000 --output main.json
+
+With the defaults (20 questions per user, 70% answered) that covers roughly
+7k, 70k and 700k answers. A summary table is printed to stderr.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+
+from app import app
+from benchmarks.seed import DatasetSpec, seed_dataset
+from extensions import db
+from models import Answer, User
+from pagination import encode_cursor
+
+ROUTES = ('feed', 'profile', 'answer_permalink', 'dashboard', 'admin_panel', 'api_feed', 'api_user_answers')
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _percentile(sorted_values, pct):
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, query_counts):
+    ordered = sorted(latencies)
+    summary = {f'p{pct}_ms': round(_percentile(ordered, pct) * 1000, 3) for pct in PERCENTILES}
+    summary.update(
+        mean_ms=round(sum(ordered) / len(ordered) * 1000, 3),
+        max_ms=round(ordered[-1] * 1000, 3),
+        requests=len(ordered),
+        queries_min=min(query_counts),
+        queries_max=max(query_counts),
+        queries_mean=round(sum(query_counts) / len(query_counts), 2),
+    )
+    return summary
+
+
+def _use_database(url):
+    """Point ``db`` at a fresh engine for ``url``, as the test fixtures do."""
+    with app.app_context():
+        db.session.remove()
+        engines = db.engines
+        if None in engines:
+            engines[None].dispose()
+        engines[None] = db.create_engine(url)
+        return engines[None]
+
+
+def _login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+def _targets(sample):
+    """Return ``{route: (client_kind, [urls])}`` drawn from the seeded data."""
+    with app.app_context():
+        users = db.session.execute(
+            db.select(User.id, User.username).order_by(db.func.random()).limit(sample)
+        ).all()
+        answers = db.session.execute(
+            db.select(User.username, Answer.public_id)
+            .join(Answer, Answer.author_id == User.id)
+            .order_by(db.func.random()).limit(sample)
+        ).all()
+        busiest = db.session.scalar(db.select(User.id).order_by(User.unanswered_count.desc()).limit(1))
+        admin = db.session.scalar(db.select(User.id).where(User.is_admin == db.true()).order_by(User.id).limit(1))
+        first_page = db.session.execute(
+            db.select(Answer.created_at, Answer.id).order_by(Answer.created_at.desc(), Answer.id.desc())
+            .offset(100).limit(1)
+        ).first()
+    feed_urls = ['/feed']
+    if first_page:
+        feed_urls.append(f'/feed?after={encode_cursor(first_page.created_at, first_page.id)}')
+    return {
+        'feed': ('anonymous', feed_urls),
+        'profile': ('anonymous', [f'/user/{u.username}' for u in users]),
+        'answer_permalink': ('anonymous', [f'/user/{a.username}/a/{a.public_id}' for a in answers]),
+        'dashboard': (busiest, ['/dashboard']),
+        'admin_panel': (admin, ['/admin/moderation']),
+        'api_feed': ('anonymous', [url.replace('/feed', '/api/v1/feed') for url in feed_urls]),
+        'api_user_answers': ('anonymous', [f'/api/v1/users/{u.username}/answers' for u in users]),
+    }
+
+
+def time_routes(engine, requests, warmup, rng, sample=200, routes=ROUTES):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    results = {}
+    targets = _targets(sample)
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        for route in routes:
+            who, urls = targets[route]
+            latencies, query_counts = [], []
+            with app.test_client() as client:
+                if who != 'anonymous':
+                    _login(client, who)
+                for i in range(warmup + requests):
+                    url = rng.choice(urls)
+                    statements.clear()
+                    started = time.perf_counter()
+                    resp = client.get(url)
+                    elapsed = time.perf_counter() - started
+                    if resp.status_code != 200:
+                        raise RuntimeError(f'{url} returned {resp.status_code}')
+                    if i >= warmup:
+                        latencies.append(elapsed)
+                        query_counts.append(len(statements))
+            results[route] = summarize(latencies, query_counts)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    app.config.update(
+        RESPONSE_CACHE_ENABLED=args.response_cache,
+        BLOCK_SWEEP_INTERVAL=0,
+        WTF_CSRF_ENABLED=False,
+    )
+    rng = random.Random(args.seed)
+    runs = []
+    for users in args.users:
+        spec = DatasetSpec(users, args.questions_per_user, args.answer_ratio,
+                           args.flag_ratio, args.report_ratio, args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = _use_database(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            with app.app_context():
+                started = time.perf_counter()
+                dataset = seed_dataset(spec)
+                seed_seconds = time.perf_counter() - started
+            app.extensions['fragment_cache'].clear()
+            app.extensions['response_cache'].invalidate()
+            routes = time_routes(engine, args.requests, args.warmup, rng)
+            with app.app_context():
+                db.session.remove()
+            engine.dispose()
+        runs.append({'spec': spec._asdict(), 'dataset': dataset,
+                     'seed_seconds': round(seed_seconds, 2), 'routes': routes})
+        _print_table(runs[-1])
+    return {
+        'benchmark': 'routes',
+        'revision': _git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'requests_per_route': args.requests,
+        'response_cache': args.response_cache,
+        'runs': runs,
+    }
+
+
+def _print_table(run_result):
+    dataset = run_result['dataset']
+    print(f"\n{dataset['users']} users, {dataset['questions']} questions, {dataset['answers']} answers, "
+          f"{dataset['reports']} reports (seeded in {run_result['seed_seconds']}s)", file=sys.stderr)
+    print(f"{'route':<18}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'queries':>9}", file=sys.stderr)
+    for route, r in run_result['routes'].items():
+        queries = r['queries_max'] if r['queries_min'] == r['queries_max'] else f"{r['queries_min']}-{r['queries_max']}"
+        print(f"{route:<18}{r['p50_ms']:>9.2f}{r['p90_ms']:>9.2f}{r['p99_ms']:>9.2f}{queries:>9}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, nargs='+', default=[500],
+                        help='dataset sizes to run, in users (default 500)')
+    parser.add_argument('--questions-per-user', type=int, default=20)
+    parser.add_argument('--answer-ratio', type=float, default=0.7)
+    parser.add_argument('--flag-ratio', type=float, default=0.01)
+    parser.add_argument('--report-ratio', type=float, default=0.005)
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per route (default 200)')
+    parser.add_argument('--warmup', type=int, default=20, help='untimed requests per route first (default 20)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--response-cache', action='store_true',
+                        help='leave the anonymous response cache on (off by default to time rendering)')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
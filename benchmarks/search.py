@@ -0,0 +1,168 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Full-text search benchmark over the synthetic dataset.
+
+Seeds a fresh SQLite database per size, then times searches for queries of
+different selectivity (a very common word, a rare word, two words, a
+prefix): the ``/search`` page through the test client, including its second
+page, and :func:`search.search_answers` on its own. As a baseline the first
+term is also timed as a ``LIKE '%term%'`` scan collecting every match over
+question and answer text, which is what ranking results would cost without
+the FTS5 index::
+
+    python -m benchmarks.search --users 500 5000 --output search.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from app import app
+from benchmarks.routes import _git_revision, _use_database, summarize
+from benchmarks.seed import WORDS, DatasetSpec, seed_dataset
+from extensions import db
+from search import fts_query, search_answers
+
+QUERIES = {
+    'common_word': WORDS[3],
+    'rare_word': WORDS[-1],
+    'two_words': f'{WORDS[10]} {WORDS[40]}',
+    'prefix': WORDS[60][:4],
+}
+
+
+def _time(fn, requests, warmup):
+    latencies = []
+    for i in range(warmup + requests):
+        started = time.perf_counter()
+        fn()
+        if i >= warmup:
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def _summary(latencies):
+    return {k: v for k, v in summarize(latencies, [0]).items() if not k.startswith('queries_')}
+
+
+def time_search(requests, warmup, per_page=20):
+    results = {}
+    with app.test_client() as client:
+        for name, text in QUERIES.items():
+            def request(url):
+                resp = client.get(url)
+                if resp.status_code != 200:
+                    raise RuntimeError(f'{url} returned {resp.status_code}')
+            with app.app_context():
+                page = search_answers(text, per_page)
+                matches = db.session.execute(
+                    db.text('SELECT count(*) FROM answer_search WHERE answer_search MATCH :q'),
+                    {'q': fts_query(text)},
+                ).scalar()
+                sql = _summary(_time(lambda: search_answers(text, per_page), requests, warmup))
+            results[name] = {
+                'matches': matches,
+                'route': _summary(_time(lambda: request(f'/search?q={text}'), requests, warmup)),
+                'search_answers': sql,
+            }
+            if page.next_cursor:
+                second = f'/search?q={text}&after={page.next_cursor}'
+                results[name]['route_page_2'] = _summary(_time(lambda: request(second), requests, warmup))
+    return results
+
+
+def time_like_scan(requests, warmup):
+    results = {}
+    stmt = db.text(
+        'SELECT answer.id FROM answer JOIN question ON question.id = answer.question_id'
+        ' WHERE question.is_hidden = 0'
+        ' AND (question.question_text LIKE :term OR answer.answer_text LIKE :term)'
+    )
+    with app.app_context():
+        for name, text in QUERIES.items():
+            term = f'%{text.split()[0]}%'
+            results[name] = _summary(_time(lambda: db.session.execute(stmt, {'term': term}).all(), requests, warmup))
+    return results
+
+
+def run(args):
+    app.config.update(RESPONSE_CACHE_ENABLED=False, BLOCK_SWEEP_INTERVAL=0)
+    runs = []
+    for users in args.users:
+        spec = DatasetSpec(users, args.questions_per_user, seed=args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = _use_database(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            with app.app_context():
+                dataset = seed_dataset(spec)
+            app.extensions['fragment_cache'].clear()
+            search = time_search(args.requests, args.warmup)
+            like = time_like_scan(args.requests, args.warmup)
+            with app.app_context():
+                db.session.remove()
+            engine.dispose()
+        runs.append({'spec': spec._asdict(), 'dataset': dataset, 'search': search, 'like_scan': like})
+        _print_table(runs[-1])
+    return {
+        'benchmark': 'search',
+        'revision': _git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'requests_per_query': args.requests,
+        'queries': QUERIES,
+        'runs': runs,
+    }
+
+
+def _print_table(run_result):
+    dataset = run_result['dataset']
+    print(f"\n{dataset['answers']} answers", file=sys.stderr)
+    print(f"{'query':<14}{'matches':>9}{'page p50':>10}{'page 2':>9}{'search':>9}{'LIKE':>9}  (ms)",
+          file=sys.stderr)
+    for name, r in run_result['search'].items():
+        page_2 = r['route_page_2']['p50_ms'] if 'route_page_2' in r else float('nan')
+        print(f"{name:<14}{r['matches']:>9}{r['route']['p50_ms']:>10.2f}{page_2:>9.2f}"
+              f"{r['search_answers']['p50_ms']:>9.2f}{run_result['like_scan'][name]['p50_ms']:>9.2f}",
+              file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, nargs='+', default=[500],
+                        help='dataset sizes to run, in users (default 500)')
+    parser.add_argument('--questions-per-user', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per query (default 50)')
+    parser.add_argument('--warmup', type=int, default=5, help='untimed requests per query first (default 5)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Synthetic dataset for benchmarks.
+
+Rows are written with bulk Core inserts so that even a million answers seed
+in a reasonable time. Everything is driven by a seeded RNG, so a given
+:class:`DatasetSpec` always produces the same data.
+"""
+
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from abuse import rebuild_abuse_stats
+from app import recount_unanswered
+from extensions import db
+from models import Answer, AnswerReport, Block, Question, User, new_public_id
+
+BATCH_SIZE = 10000
+
+# Question and answer text is drawn from this vocabulary with Zipf-like
+# weights, so that search benchmarks see common, middling and rare terms.
+WORDS = (
+    'the you what your like would think favourite best time people do how why '
+    'music food movie book game day night friend family work school summer winter '
+    'coffee tea pizza travel city dream song album film weekend morning advice '
+    'cat dog garden ocean mountain river forest rain snow sunset breakfast dinner '
+    'guitar piano painting photography running cycling swimming hiking chess poetry '
+    'language history science space planet galaxy robot computer keyboard software '
+    'recipe spice chocolate cheese bread noodle dumpling avocado mango lemon '
+    'lighthouse volcano glacier canyon desert island harbour lantern compass telescope'
+).split()
+WORD_WEIGHTS = [1 / rank for rank in range(1, len(WORDS) + 1)]
+
+DatasetSpec = namedtuple(
+    'DatasetSpec',
+    'users questions_per_user answer_ratio flag_ratio report_ratio seed',
+    defaults=(20, 0.7, 0.01, 0.005, 1),
+)
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + BATCH_SIZE])
+
+
+def _text(rng, low, high):
+    return ' '.join(rng.choices(WORDS, weights=WORD_WEIGHTS, k=rng.randint(low, high)))
+
+
+def seed_dataset(spec):
+    """Create tables and fill them per ``spec``; return row counts by table.
+
+    User 1 is an admin. Questions are spread over the last year, a share of
+    them anonymous; ``answer_ratio`` of them are answered by their receiver,
+    ``flag_ratio`` are flagged (and hidden) and ``report_ratio`` of answers
+    carry an open report.
+    """
+    rng = random.Random(spec.seed)
+    db.create_all()
+    now = datetime.utcnow()
+    span = timedelta(days=365).total_seconds()
+
+    def moment():
+        return now - timedelta(seconds=rng.random() * span)
+
+    _insert(User, [
+        {
+            'id': i,
+            'username': f'user{i}',
+            'email': f'user{i}@example.com',
+            'password_hash': 'x',
+            'bio': f'Benchmark user {i}',
+            'is_admin': i == 1,
+            'unanswered_count': 0,
+            'created_at': moment(),
+        }
+        for i in range(1, spec.users + 1)
+    ])
+
+    questions, answers, reports = [], [], []
+    question_id = answer_id = report_count = 0
+
+    def flush():
+        # Answers reference questions and reports reference answers.
+        for model, rows in ((Question, questions), (Answer, answers), (AnswerReport, reports)):
+            _insert(model, rows)
+            rows.clear()
+
+    for receiver in range(1, spec.users + 1):
+        for _ in range(spec.questions_per_user):
+            question_id += 1
+            created = moment()
+            anonymous = rng.random() < 0.5
+            flagged = rng.random() < spec.flag_ratio
+            answered = not flagged and rng.random() < spec.answer_ratio
+            answered_at = created + timedelta(minutes=rng.randint(1, 600)) if answered else None
+            questions.append({
+                'id': question_id,
+                'sender_id': None if anonymous else rng.randint(1, spec.users),
+                'receiver_id': receiver,
+                'is_anonymous': anonymous,
+                'is_hidden': flagged,
+                'is_flagged': flagged,
+                'question_text': f'{_text(rng, 4, 12).capitalize()}?',
+                'ip_address': f'10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}',
+                'created_at': created,
+                'answered_at': answered_at,
+            })
+            if not answered:
+                continue
+            answer_id += 1
+            answers.append({
+                'id': answer_id,
+                'question_id': question_id,
+                'author_id': receiver,
+                'answer_text': f'{_text(rng, 6, 30).capitalize()}.',
+                'public_id': new_public_id(answered_at),
+                'created_at': answered_at,
+            })
+            if rng.random() < spec.report_ratio:
+                report_count += 1
+                reports.append({
+                    'answer_id': answer_id,
+                    'reporter_user_id': rng.randint(1, spec.users),
+                    'reporter_ip': '10.0.0.1',
+                    'reason': 'Spam',
+                    'resolved': False,
+                    'created_at': answered_at + timedelta(hours=1),
+                })
+        if len(questions) >= BATCH_SIZE:
+            flush()
+    flush()
+    _insert(Block, [
+        {'ip_address': f'10.0.{i}.1', 'reason': 'Benchmark block', 'active': True, 'created_at': moment()}
+        for i in range(min(spec.users, 50))
+    ])
+    recount_unanswered()
+    db.session.commit()
+    rebuild_abuse_stats()
+    return {
+        'users': spec.users,
+        'questions': question_id,
+        'answers': answer_id,
+        'reports': report_count,
+    }
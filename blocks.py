@@ -0,0 +1,161 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Per-process index of active blocks.
+
+Question submission checks for a block on every request, so active blocks are
+held in memory keyed by user id and by IP, with a heap of expiry deadlines.
+Expired entries simply stop matching; flipping ``Block.active`` off in the
+database is left to :func:`sweep_expired_blocks`, which runs periodically
+instead of inside the request path.
+"""
+
+import heapq
+import threading
+import time
+from collections import namedtuple
+from datetime import timezone
+
+from extensions import db
+from models import Block, utcnow
+
+BlockEntry = namedtuple('BlockEntry', 'id user_id ip_address expires_at')
+
+
+def _naive_utc(dt):
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+class BlockIndex:
+    """Hash maps from user id and IP to active blocks, plus an expiry heap.
+
+    The index is loaded lazily and reloaded after ``ttl`` seconds so that
+    blocks created by other worker processes are picked up; changes made in
+    this process should call :meth:`invalidate` once committed.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._by_user = {}
+        self._by_ip = {}
+        self._expiry = []
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _load(self):
+        rows = db.session.execute(
+            db.select(Block.id, Block.user_id, Block.ip_address, Block.expires_at)
+            .where(Block.active.is_(True))
+        ).all()
+        by_user, by_ip, expiry = {}, {}, []
+        for row in rows:
+            entry = BlockEntry(row.id, row.user_id, row.ip_address, _naive_utc(row.expires_at))
+            if entry.user_id:
+                by_user.setdefault(entry.user_id, []).append(entry)
+            if entry.ip_address:
+                by_ip.setdefault(entry.ip_address, []).append(entry)
+            if entry.expires_at:
+                expiry.append((entry.expires_at, entry.id, entry))
+        heapq.heapify(expiry)
+        self._by_user, self._by_ip, self._expiry = by_user, by_ip, expiry
+        self._loaded_at = time.monotonic()
+
+    def _drop_expired(self, now):
+        while self._expiry and self._expiry[0][0] <= now:
+            _, _, entry = heapq.heappop(self._expiry)
+            for mapping, key in ((self._by_user, entry.user_id), (self._by_ip, entry.ip_address)):
+                entries = mapping.get(key)
+                if entries and entry in entries:
+                    entries.remove(entry)
+                    if not entries:
+                        del mapping[key]
+
+    def lookup(self, user_id, ip_address):
+        """Return the :class:`BlockEntry` matching the user or IP, else None."""
+        now = _naive_utc(utcnow())
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+                self._load()
+            self._drop_expired(now)
+            if user_id and user_id in self._by_user:
+                return self._by_user[user_id][0]
+            if ip_address and ip_address in self._by_ip:
+                return self._by_ip[ip_address][0]
+        return None
+
+
+block_index = BlockIndex()
+
+
+def sweep_expired_blocks():
+    """Mark expired blocks inactive and return how many were changed."""
+    now = _naive_utc(utcnow())
+    changed = (
+        Block.query
+        .filter(Block.active.is_(True), Block.expires_at.isnot(None), Block.expires_at <= now)
+        .update({Block.active: False}, synchronize_session=False)
+    )
+    db.session.commit()
+    if changed:
+        block_index.invalidate()
+    return changed
+
+
+def start_block_sweeper(app, interval):
+    """Run :func:`sweep_expired_blocks` every ``interval`` seconds in a daemon thread."""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            with app.app_context():
+                try:
+                    sweep_expired_blocks()
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.warning('Block sweep failed: %s', e)
+
+    thread = threading.Thread(target=run, name='qbox-block-sweeper', daemon=True)
+    thread.start()
+    return stop
+
+
+def init_app(app):
+    """Register the sweep CLI command and start the sweeper on first request."""
+    app.config.setdefault('BLOCK_INDEX_TTL', 30)
+    app.config.setdefault('BLOCK_SWEEP_INTERVAL', 300)
+    block_index.ttl = app.config['BLOCK_INDEX_TTL']
+    started = []
+    start_lock = threading.Lock()
+
+    @app.before_request
+    def ensure_block_sweeper():
+        interval = app.config['BLOCK_SWEEP_INTERVAL']
+        if started or app.testing or not interval:
+            return
+        with start_lock:
+            if not started:
+                started.append(start_block_sweeper(app, interval))
+
+    @app.cli.command('sweep-blocks')
+    def sweep_blocks_command():
+        """Deactivate blocks whose expiry has passed."""
+        print(f'Deactivated {sweep_expired_blocks()} expired block(s).')
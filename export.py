@@ -0,0 +1,152 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Streaming data export of one user's profile, received questions and answers.
+
+Records are produced by :func:`export_records` from server-side cursors
+(``yield_per``) and encoded one at a time by :func:`encode_ndjson` or
+:func:`encode_csv`, so memory use stays flat whatever the account size.
+The same generators back the ``/user/<username>/export`` download, open to
+the user and to admins, and the ``flask export-user`` command.
+
+Senders of anonymous questions are never included, and neither are
+sender IP addresses.
+"""
+
+import csv
+import io
+import json
+
+import click
+from flask import Blueprint, Response, abort, current_app, request, stream_with_context, url_for
+from flask_login import current_user, login_required
+
+from extensions import db
+from models import Answer, Question, User, iso_utc
+
+bp = Blueprint('export', __name__)
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+CSV_COLUMNS = ('type', 'id', 'created_at', 'text', 'from', 'question_id', 'answered_at', 'hidden', 'url')
+
+
+def _stream(stmt):
+    return db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+
+def export_records(user):
+    """Yield dicts for ``user``'s profile, then received questions, then answers, oldest first."""
+    yield {
+        'type': 'profile',
+        'id': user.username,
+        'created_at': iso_utc(user.created_at),
+        'text': user.bio,
+        'url': url_for('profile', username=user.username, _external=True),
+    }
+    sender = db.aliased(User)
+    questions = (
+        db.select(Question.id, Question.question_text, Question.created_at, Question.answered_at,
+                  Question.is_hidden, Question.is_anonymous, sender.username)
+        .outerjoin(sender, sender.id == Question.sender_id)
+        .where(Question.receiver_id == user.id)
+        .order_by(Question.created_at, Question.id)
+    )
+    for row in _stream(questions):
+        yield {
+            'type': 'question',
+            'id': row.id,
+            'created_at': iso_utc(row.created_at),
+            'text': row.question_text,
+            'from': None if row.is_anonymous else row.username,
+            'answered_at': iso_utc(row.answered_at),
+            'hidden': row.is_hidden,
+        }
+    answers = (
+        db.select(Answer.public_id, Answer.answer_text, Answer.created_at, Answer.question_id)
+        .where(Answer.author_id == user.id)
+        .order_by(Answer.created_at, Answer.id)
+    )
+    for row in _stream(answers):
+        yield {
+            'type': 'answer',
+            'id': row.public_id,
+            'created_at': iso_utc(row.created_at),
+            'text': row.answer_text,
+            'question_id': row.question_id,
+            'url': url_for('answer_permalink', username=user.username, public_id=row.public_id, _external=True),
+        }
+
+
+def encode_ndjson(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def encode_csv(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_user(user, fmt='ndjson'):
+    """Encoded export of ``user`` as an iterator of text chunks."""
+    encode = encode_csv if fmt == 'csv' else encode_ndjson
+    return encode(export_records(user))
+
+
+@bp.route('/user/<username>/export')
+@login_required
+def export_download(username):
+    """Download a user's data as NDJSON (default) or ``?format=csv``."""
+    user = User.query.filter_by(username=username).first_or_404()
+    if user.id != current_user.id and not current_user.is_admin:
+        abort(403)
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+    resp = Response(stream_with_context(export_user(user, fmt)), mimetype=EXPORT_FORMATS[fmt])
+    resp.headers['Content-Disposition'] = f'attachment; filename="qbox-{user.username}.{fmt}"'
+    resp.cache_control.private = True
+    resp.cache_control.no_store = True
+    return resp
+
+
+def init_app(app):
+    app.register_blueprint(bp)
+
+    @app.cli.command('export-user')
+    @click.argument('username')
+    @click.option('--format', 'fmt', type=click.Choice(sorted(EXPORT_FORMATS)), default='ndjson')
+    @click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='file to write (default stdout)')
+    def export_user_command(username, fmt, output):
+        """Export a user's profile, received questions and answers."""
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            raise click.ClickException(f'No user named {username!r}.')
+        # URLs in the export are built against SERVER_NAME, if set.
+        with current_app.test_request_context():
+            for chunk in export_user(user, fmt):
+                output.write(chunk)
@@ -0,0 +1,150 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Atom feeds of answers, site-wide and per user.
+
+Feed readers poll often and mostly find nothing new, so each request first
+reads only the newest answer's ``(created_at, id)`` from a covering index
+(plus, for the site feed, the names of the authors it shows) and answers
+``If-None-Match``/``If-Modified-Since`` with 304 from that. Full
+responses stream the newest :data:`ATOM_FEED_SIZE` answers straight from a
+bounded keyset query, one entry at a time, without building ORM objects.
+"""
+
+import hashlib
+from datetime import timezone
+
+from flask import Blueprint, Response, current_app, request, stream_with_context, url_for
+from markupsafe import Markup, escape
+
+from extensions import db
+from models import Answer, Question, User, iso_utc, newest_answer
+from response_cache import user_token
+
+bp = Blueprint('feeds', __name__)
+
+ATOM_FEED_SIZE = 50
+ATOM_TITLE_LENGTH = 100
+ATOM_CONTENT_TYPE = 'application/atom+xml; charset=utf-8'
+
+
+def _html(text):
+    return escape(text).replace('\n', Markup('<br>\n'))
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return since is not None and last_modified is not None and last_modified <= since
+
+
+def _entry(row):
+    permalink = url_for('answer_permalink', username=row.username, public_id=row.public_id, _external=True)
+    title = row.question_text
+    if len(title) > ATOM_TITLE_LENGTH:
+        title = title[:ATOM_TITLE_LENGTH - 1] + '…'
+    content = f'<p><strong>Q:</strong> {_html(row.question_text)}</p>\n<p>{_html(row.answer_text)}</p>'
+    stamp = iso_utc(row.created_at, 'seconds')
+    return (
+        '<entry>'
+        f'<id>{escape(permalink)}</id>'
+        f'<title>{escape(title)}</title>'
+        f'<link rel="alternate" type="text/html" href="{escape(permalink)}"/>'
+        f'<published>{stamp}</published><updated>{stamp}</updated>'
+        f'<author><name>{escape(row.username)}</name>'
+        f'<uri>{escape(url_for("profile", username=row.username, _external=True))}</uri></author>'
+        f'<content type="html">{escape(content)}</content>'
+        '</entry>\n'
+    )
+
+
+def atom_response(title, alternate_url, newest, token, *criteria):
+    """Conditional, streamed Atom response for the newest answers matching ``criteria``.
+
+    ``newest`` is the ``(created_at, id)`` of the newest such answer, or None,
+    and ``token`` covers anything else the feed shows.
+    """
+    updated = newest.created_at.replace(tzinfo=timezone.utc, microsecond=0) if newest else None
+    etag = hashlib.sha1(f'{newest.id if newest else ""}|{token}'.encode()).hexdigest()
+    resp = Response(status=200, content_type=ATOM_CONTENT_TYPE)
+    resp.set_etag(etag)
+    resp.last_modified = updated
+    resp.cache_control.public = True
+    resp.cache_control.max_age = current_app.config['ATOM_FEED_MAX_AGE']
+    if _not_modified(etag, updated):
+        resp.status_code = 304
+        return resp
+
+    stmt = (
+        db.select(Answer.public_id, Answer.answer_text, Answer.created_at, Question.question_text, User.username)
+        .join(Question, Question.id == Answer.question_id)
+        .join(User, User.id == Answer.author_id)
+        .where(*criteria)
+        .order_by(Answer.created_at.desc(), Answer.id.desc())
+        .limit(ATOM_FEED_SIZE)
+        .execution_options(yield_per=10)
+    )
+    self_url = request.base_url
+
+    def generate():
+        yield '<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">\n'
+        yield (
+            f'<id>{escape(self_url)}</id><title>{escape(title)}</title>'
+            f'<updated>{iso_utc(updated, "seconds") if updated else "1970-01-01T00:00:00Z"}</updated>'
+            f'<link rel="self" type="application/atom+xml" href="{escape(self_url)}"/>'
+            f'<link rel="alternate" type="text/html" href="{escape(alternate_url)}"/>\n'
+        )
+        for row in db.session.execute(stmt):
+            yield _entry(row)
+        yield '</feed>\n'
+
+    resp.response = stream_with_context(generate())
+    return resp
+
+
+def _authors_token():
+    """Digest of the authors shown in the site feed, so a rename changes its ETag."""
+    recent_authors = (
+        db.select(Answer.author_id)
+        .order_by(Answer.created_at.desc(), Answer.id.desc())
+        .limit(ATOM_FEED_SIZE)
+    )
+    authors = db.session.execute(
+        db.select(User.id, User.username).where(User.id.in_(recent_authors.scalar_subquery())).order_by(User.id)
+    ).all()
+    return hashlib.sha1(repr([tuple(row) for row in authors]).encode()).hexdigest()
+
+
+@bp.route('/feed.atom')
+def site_feed():
+    """Newest answers from everyone, mirroring the HTML feed."""
+    newest = newest_answer()
+    return atom_response('Qbox: recent answers', url_for('feed', _external=True), newest, _authors_token())
+
+
+@bp.route('/user/<username>/feed.atom')
+def user_feed(username):
+    """Newest answers by one user."""
+    user = User.query.filter_by(username=username).first_or_404()
+    newest = newest_answer(Answer.author_id == user.id)
+    return atom_response(f"{user.username}'s answers on Qbox", url_for('profile', username=user.username, _external=True),
+                         newest, user_token(user), Answer.author_id == user.id)
+
+
+def init_app(app):
+    app.config.setdefault('ATOM_FEED_MAX_AGE', 300)
+    app.register_blueprint(bp)
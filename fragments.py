@@ -0,0 +1,191 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Cache of rendered answer-card bodies.
+
+The question and answer paragraphs of a card (the ``nl2br`` work) plus its
+report button are the same on every page that shows the answer, and answers
+never change once written, so the rendered HTML is kept in an LRU-bounded
+in-process store, optionally backed by a shared RESP server set with
+``FRAGMENT_CACHE_URL``. Parts that vary per request or per viewer (relative
+timestamps, admin-only IDs, the author link) stay in the page templates.
+
+Entries are keyed by a version, the layout and the answer id. The version
+hashes the ``answer_body.html`` source together with ``FRAGMENT_CACHE_VERSION``
+(bump it when code that shapes a card, such as the ``nl2br`` filter, changes),
+so a deploy never serves cards rendered by older code, even from the shared
+store. Anything that changes a stored answer's card body must call
+:func:`invalidate_answers`.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import current_app, render_template
+from markupsafe import Markup
+
+from resp import RespClient, RespError
+
+LAYOUTS = ('card', 'permalink')
+
+
+class LRUCache:
+    """Thread-safe mapping that forgets the least recently used entries."""
+
+    def __init__(self, maxsize=5000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RespStore:
+    """Shared string store on a RESP server, with a TTL on every entry."""
+
+    def __init__(self, url, ttl=86400):
+        self.client = RespClient.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        value = self.client.execute('GET', key)
+        return value.decode() if value is not None else None
+
+    def set(self, key, value):
+        self.client.execute('SET', key, value, 'EX', self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.execute('DEL', *keys)
+
+
+class FragmentCache:
+    """Two-level cache: a local :class:`LRUCache` in front of an optional shared store."""
+
+    def __init__(self, maxsize=5000, shared=None, version=''):
+        self.local = LRUCache(maxsize)
+        self.shared = shared
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except RespError as e:
+                current_app.logger.warning('Shared fragment cache unavailable: %s', e)
+            if value is not None:
+                self.local.set(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value)
+            except RespError as e:
+                current_app.logger.warning('Shared fragment cache unavailable: %s', e)
+
+    def delete(self, *keys):
+        self.local.delete(*keys)
+        if self.shared is not None:
+            try:
+                self.shared.delete(*keys)
+            except RespError as e:
+                current_app.logger.warning('Shared fragment cache unavailable: %s', e)
+
+    def clear(self):
+        """Drop local entries and counters (shared entries are left to expire)."""
+        self.local.clear()
+        self.hits = self.misses = 0
+
+
+def _key(version, layout, answer_id):
+    return f'qbox:card:{version}:{layout}:{answer_id}'
+
+
+def _template_version(app):
+    source = app.jinja_env.loader.get_source(app.jinja_env, 'answer_body.html')[0]
+    digest = hashlib.sha1(f'{app.config["FRAGMENT_CACHE_VERSION"]}|{source}'.encode()).hexdigest()
+    return digest[:12]
+
+
+def get_fragment_cache(app=None):
+    app = app or current_app
+    return app.extensions['fragment_cache']
+
+
+def answer_card_body(answer, layout='card'):
+    """Return the rendered question/answer body of ``answer``'s card."""
+    cache = get_fragment_cache()
+    key = _key(cache.version, layout, answer.id)
+    html = cache.get(key)
+    if html is None:
+        html = render_template('answer_body.html', answer=answer, layout=layout)
+        cache.set(key, html)
+    return Markup(html)
+
+
+def invalidate_answers(*answer_ids):
+    """Forget cached card bodies for ``answer_ids`` in every layout."""
+    cache = get_fragment_cache()
+    keys = [_key(cache.version, layout, answer_id) for answer_id in answer_ids for layout in LAYOUTS]
+    if keys:
+        cache.delete(*keys)
+
+
+def init_app(app):
+    app.config.setdefault('FRAGMENT_CACHE_SIZE', 5000)
+    app.config.setdefault('FRAGMENT_CACHE_URL', None)
+    app.config.setdefault('FRAGMENT_CACHE_VERSION', '1')
+    shared = None
+    if app.config['FRAGMENT_CACHE_URL']:
+        shared = RespStore(app.config['FRAGMENT_CACHE_URL'])
+    app.extensions['fragment_cache'] = FragmentCache(app.config['FRAGMENT_CACHE_SIZE'], shared,
+                                                     _template_version(app))
+    app.add_template_global(answer_card_body)
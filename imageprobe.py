@@ -0,0 +1,178 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Incremental image header parser.
+
+Reads just enough of a stream to find an image's dimensions: 24 bytes for
+PNG, 10 for GIF, about 30 for WebP, and for JPEG the marker segments up to
+the first start-of-frame. Segments that are not needed (EXIF, ICC profiles,
+thumbnails) are skipped over without being buffered, so a JPEG whose frame
+header sits behind a large EXIF block is still measured cheaply.
+
+Supported formats are PNG, GIF, JPEG (baseline, progressive, lossless) and
+WebP (lossy ``VP8``, lossless ``VP8L`` and extended ``VP8X``).
+"""
+
+import struct
+from collections import namedtuple
+
+DEFAULT_MAX_BYTES = 256 * 1024
+SKIP_CHUNK_BYTES = 16 * 1024
+
+# JPEG start-of-frame markers; C4 (DHT), C8 (JPG) and CC (DAC) are not frames.
+JPEG_SOF_MARKERS = frozenset({0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                              0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF})
+# Markers without a length field.
+JPEG_STANDALONE_MARKERS = frozenset({0x01, *range(0xD0, 0xD8)})
+
+ProbeResult = namedtuple('ProbeResult', 'format width height bytes_read')
+
+
+class ProbeError(ValueError):
+    """Raised when a stream ends, or exceeds its byte budget, before the size is known."""
+
+
+class _Reader:
+    """Pull bytes from ``stream`` on demand, never more than ``max_bytes`` in total."""
+
+    def __init__(self, stream, max_bytes):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self._buffer = b''
+
+    def _pull(self, n):
+        if self.bytes_read + n > self.max_bytes:
+            raise ProbeError('Image header exceeds the probe budget')
+        chunk = self.stream.read(n)
+        if not chunk:
+            raise ProbeError('Stream ended inside the image header')
+        self.bytes_read += len(chunk)
+        return chunk
+
+    def peek(self, n):
+        """Return up to ``n`` bytes without consuming them."""
+        try:
+            while len(self._buffer) < n:
+                self._buffer += self._pull(n - len(self._buffer))
+        except ProbeError:
+            pass
+        return self._buffer[:n]
+
+    def read(self, n):
+        while len(self._buffer) < n:
+            self._buffer += self._pull(n - len(self._buffer))
+        data, self._buffer = self._buffer[:n], self._buffer[n:]
+        return data
+
+    def skip(self, n):
+        buffered = min(n, len(self._buffer))
+        self._buffer = self._buffer[buffered:]
+        n -= buffered
+        while n:
+            n -= len(self._pull(min(n, SKIP_CHUNK_BYTES)))
+
+
+def _png(reader):
+    header = reader.read(24)
+    if header[12:16] != b'IHDR':
+        raise ProbeError('PNG does not start with IHDR')
+    return struct.unpack('>II', header[16:24])
+
+
+def _gif(reader):
+    return struct.unpack('<HH', reader.read(10)[6:10])
+
+
+def _jpeg(reader):
+    reader.read(2)
+    while True:
+        if reader.read(1) != b'\xff':
+            raise ProbeError('Corrupt JPEG marker')
+        marker = reader.read(1)[0]
+        while marker == 0xFF:  # Fill bytes before a marker.
+            marker = reader.read(1)[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):  # End of image, or start of scan before any frame.
+            raise ProbeError('JPEG has no frame header')
+        length = struct.unpack('>H', reader.read(2))[0]
+        if length < 2:
+            raise ProbeError('Corrupt JPEG segment length')
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>xHH', reader.read(5))
+            return width, height
+        reader.skip(length - 2)
+
+
+def _webp(reader):
+    reader.read(12)
+    kind, _ = struct.unpack('<4sI', reader.read(8))
+    if kind == b'VP8 ':
+        frame = reader.read(10)
+        if frame[3:6] != b'\x9d\x01\x2a':
+            raise ProbeError('Corrupt VP8 frame header')
+        width, height = struct.unpack('<HH', frame[6:10])
+        return width & 0x3FFF, height & 0x3FFF
+    if kind == b'VP8L':
+        data = reader.read(5)
+        if data[0] != 0x2F:
+            raise ProbeError('Corrupt VP8L signature')
+        bits = int.from_bytes(data[1:5], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if kind == b'VP8X':
+        data = reader.read(10)
+        return int.from_bytes(data[4:7], 'little') + 1, int.from_bytes(data[7:10], 'little') + 1
+    raise ProbeError(f'Unknown WebP chunk {kind!r}')
+
+
+PARSERS = {'png': _png, 'gif': _gif, 'jpeg': _jpeg, 'webp': _webp}
+
+
+def detect_format(head):
+    """Return the format name for the first 12 bytes of an image, or None."""
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head.startswith(b'\xff\xd8'):
+        return 'jpeg'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def probe(stream, max_bytes=DEFAULT_MAX_BYTES):
+    """Read an image header from ``stream`` and return a :class:`ProbeResult`.
+
+    Raises :class:`ProbeError` if the format is unknown or the header cannot
+    be read within ``max_bytes``.
+    """
+    reader = _Reader(stream, max_bytes)
+    fmt = detect_format(reader.peek(12))
+    if fmt is None:
+        raise ProbeError('Unrecognised image format')
+    width, height = PARSERS[fmt](reader)
+    return ProbeResult(fmt, width, height, reader.bytes_read)
+
+
+def image_size(stream, max_bytes=DEFAULT_MAX_BYTES):
+    """Return ``(width, height)`` of the image at the start of ``stream``, or None."""
+    try:
+        result = probe(stream, max_bytes)
+    except ProbeError:
+        return None
+    return result.width, result.height
@@ -0,0 +1,180 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Opt-in per-request timing: SQL statements, SQL time and template rendering.
+
+Enable with ``SQL_INSTRUMENTATION``. Each request then gets a ``Server-Timing``
+header (``db``, ``tpl`` and ``total`` durations, with the statement count in
+the ``db`` description) and feeds a rolling per-endpoint summary that admins
+can view at ``/admin/performance``.
+
+Engine and template listeners are only attached once the first instrumented
+request arrives, so with instrumentation off there is no per-statement cost
+at all and each request pays a single config lookup. Template time includes
+any lazy-loading queries the template triggers, which are also counted
+under ``db``.
+"""
+
+import threading
+import time
+from collections import deque
+
+from flask import before_render_template, current_app, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+WINDOW = 500
+
+
+class RequestTiming:
+    """Counters for one request, kept on ``flask.g``."""
+
+    __slots__ = ('started', 'queries', 'db_seconds', 'template_seconds', 'template_depth', 'template_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.template_started = 0.0
+
+
+class EndpointStats:
+    """Rolling window of the last ``WINDOW`` requests to each endpoint."""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, total, db_seconds, queries, template_seconds):
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append((total, db_seconds, queries, template_seconds))
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+    def summary(self):
+        """Return one dict per endpoint, slowest p95 first."""
+        with self._lock:
+            snapshot = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+            counts = dict(self._counts)
+        rows = []
+        for endpoint, samples in snapshot.items():
+            totals = sorted(s[0] for s in samples)
+            n = len(samples)
+            rows.append({
+                'endpoint': endpoint,
+                'requests': counts[endpoint],
+                'window': n,
+                'p50_ms': totals[(n - 1) // 2] * 1000,
+                'p95_ms': totals[min(n - 1, int(n * 0.95))] * 1000,
+                'max_ms': totals[-1] * 1000,
+                'db_ms': sum(s[1] for s in samples) / n * 1000,
+                'queries': sum(s[2] for s in samples) / n,
+                'max_queries': max(s[2] for s in samples),
+                'template_ms': sum(s[3] for s in samples) / n * 1000,
+            })
+        rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+        return rows
+
+
+def _current():
+    return g.get('_request_timing') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current() is not None:
+        conn.info.setdefault('qbox_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = _current()
+    starts = conn.info.get('qbox_query_start')
+    if timing is not None and starts:
+        timing.db_seconds += time.perf_counter() - starts.pop()
+        timing.queries += 1
+
+
+def _before_render(sender, template, context, **extra):
+    timing = _current()
+    if timing is not None:
+        if timing.template_depth == 0:
+            timing.template_started = time.perf_counter()
+        timing.template_depth += 1
+
+
+def _rendered(sender, template, context, **extra):
+    timing = _current()
+    if timing is not None and timing.template_depth:
+        timing.template_depth -= 1
+        if timing.template_depth == 0:
+            timing.template_seconds += time.perf_counter() - timing.template_started
+
+
+_listeners_lock = threading.Lock()
+_listening = []
+
+
+def _attach_listeners(app):
+    with _listeners_lock:
+        if _listening:
+            return
+        # Every engine, so engines created after start-up are covered too.
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        before_render_template.connect(_before_render, app)
+        template_rendered.connect(_rendered, app)
+        _listening.append(True)
+
+
+def get_endpoint_stats(app=None):
+    app = app or current_app
+    return app.extensions['endpoint_stats']
+
+
+def init_app(app):
+    app.config.setdefault('SQL_INSTRUMENTATION', False)
+    app.extensions['endpoint_stats'] = EndpointStats()
+
+    @app.before_request
+    def start_request_timing():
+        if app.config['SQL_INSTRUMENTATION']:
+            _attach_listeners(app)
+            g._request_timing = RequestTiming()
+
+    @app.after_request
+    def finish_request_timing(response):
+        timing = g.pop('_request_timing', None)
+        if timing is None:
+            return response
+        total = time.perf_counter() - timing.started
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={timing.db_seconds * 1000:.1f};desc="{timing.queries} queries", '
+            f'tpl;dur={timing.template_seconds * 1000:.1f}, total;dur={total * 1000:.1f}',
+        )
+        get_endpoint_stats(app).record(request.endpoint or 'unmatched', total, timing.db_seconds,
+                                       timing.queries, timing.template_seconds)
+        return response
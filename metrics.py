@@ -0,0 +1,342 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Prometheus metrics, exposed in the text format at ``/metrics``.
+
+Metrics live in a per-process :class:`Registry`. With several worker
+processes (e.g. gunicorn), set ``METRICS_MULTIPROC_DIR`` to a directory
+shared by the workers: each process then writes a snapshot of its registry
+to ``<pid>.json`` there (at most every ``METRICS_FLUSH_INTERVAL`` seconds,
+and at exit), and ``/metrics`` merges every snapshot. Counters and
+histograms are summed across all files, including those of exited workers,
+so they never go backwards; gauges only count live processes, either summed
+(``livesum``) or per process with a ``pid`` label (``all``). Clear the
+directory when the whole service restarts.
+
+If ``METRICS_TOKEN`` is set, scrapes must send it as a bearer token. Without
+a token the endpoint answers 404 unless the app runs in debug or testing
+mode, since the counters reveal per-endpoint traffic and moderation activity.
+"""
+
+import atexit
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+from flask import abort, current_app, g, request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, registry, name, documentation, labelnames=(), mode='livesum'):
+        self.mode = mode
+        super().__init__(registry, name, documentation, labelnames)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Samples are ``[count per bucket..., +Inf count, sum]``; buckets are not cumulative."""
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(registry, name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'Duplicate metric {metric.name}')
+        self._metrics[metric.name] = metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return Counter(self, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=(), mode='livesum'):
+        return Gauge(self, name, documentation, labelnames, mode)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return Histogram(self, name, documentation, labelnames, buckets)
+
+    def clear(self):
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def snapshot(self):
+        """Return a JSON-serialisable description of every metric and its samples."""
+        return {
+            metric.name: {
+                'kind': metric.kind,
+                'documentation': metric.documentation,
+                'labelnames': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', ())),
+                'mode': getattr(metric, 'mode', None),
+                'samples': metric.samples(),
+            }
+            for metric in self._metrics.values()
+        }
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'qbox_http_request_duration_seconds', 'Request latency by Flask endpoint.', ['endpoint'])
+REQUESTS = REGISTRY.counter(
+    'qbox_http_requests_total', 'Requests by Flask endpoint and response status.', ['endpoint', 'status'])
+IN_FLIGHT = REGISTRY.gauge('qbox_http_requests_in_flight', 'Requests currently being handled.')
+DB_POOL = REGISTRY.gauge(
+    'qbox_db_pool_connections', 'Database pool connections by state, per worker.', ['state'], mode='all')
+QUESTIONS_SUBMITTED = REGISTRY.counter('qbox_questions_submitted_total', 'Questions submitted.')
+RATE_LIMIT_REJECTIONS = REGISTRY.counter(
+    'qbox_rate_limit_rejections_total', 'Requests rejected by the rate limiter.', ['route'])
+BLOCK_HITS = REGISTRY.counter('qbox_block_hits_total', 'Question submissions refused by an active block.')
+REPORTS_FILED = REGISTRY.counter('qbox_answer_reports_filed_total', 'Answer reports filed.')
+AVATAR_VERIFICATIONS = REGISTRY.counter(
+    'qbox_avatar_verifications_total', 'Background avatar checks by outcome.', ['outcome'])
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MultiProcessStore:
+    """Per-process snapshot files in a directory shared by all workers."""
+
+    def __init__(self, directory, registry=REGISTRY):
+        self.directory = directory
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def flush(self):
+        os.makedirs(self.directory, exist_ok=True)
+        data = json.dumps(self.registry.snapshot())
+        with self._lock:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(tmp, os.path.join(self.directory, f'{os.getpid()}.json'))
+            self._last_flush = time.monotonic()
+
+    def maybe_flush(self, interval):
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def collect(self):
+        """Merge every process's snapshot into one."""
+        merged = {}
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith('.json'):
+                continue
+            pid = int(filename[:-len('.json')])
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(pid)
+            for name, metric in snapshot.items():
+                target = merged.setdefault(name, {**metric, 'samples': {}})
+                if metric['kind'] == 'gauge':
+                    if not alive:
+                        continue
+                    if metric['mode'] == 'all':
+                        target['labelnames'] = metric['labelnames'] + ['pid']
+                        for labels, value in metric['samples']:
+                            target['samples'][tuple(labels + [str(pid)])] = value
+                        continue
+                for labels, value in metric['samples']:
+                    key = tuple(labels)
+                    current = target['samples'].get(key)
+                    if current is None:
+                        target['samples'][key] = value
+                    elif isinstance(value, list):
+                        target['samples'][key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target['samples'][key] = current + value
+        for metric in merged.values():
+            metric['samples'] = [[list(key), value] for key, value in metric['samples'].items()]
+        return merged
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshot):
+    """Return ``snapshot`` in the Prometheus text exposition format."""
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['documentation']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric['labelnames']
+        for labels, value in sorted(metric['samples']):
+            if metric['kind'] != 'histogram':
+                lines.append(f'{name}{_labels(names, labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric['buckets']) + [math.inf], value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(names, labels, [('le', _number(bound))])} {cumulative}")
+            lines.append(f'{name}_sum{_labels(names, labels)} {_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(names, labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def _record_pool_stats():
+    from extensions import db
+    pool = db.engine.pool
+    for state, method in (('size', 'size'), ('checked_out', 'checkedout'), ('overflow', 'overflow')):
+        stat = getattr(pool, method, None)
+        if callable(stat):
+            DB_POOL.set(stat(), state=state)
+
+
+def scrape(app=None):
+    """Return the text for a ``/metrics`` scrape, merged across workers if configured."""
+    app = app or current_app
+    token = app.config['METRICS_TOKEN']
+    if not token and not (app.debug or app.testing):
+        abort(404)
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+    _record_pool_stats()
+    store = app.extensions['metrics_store']
+    if store is None:
+        return render(REGISTRY.snapshot())
+    store.flush()
+    return render(store.collect())
+
+
+def init_app(app):
+    app.config.setdefault('METRICS_MULTIPROC_DIR', None)
+    app.config.setdefault('METRICS_FLUSH_INTERVAL', 1.0)
+    app.config.setdefault('METRICS_TOKEN', None)
+    store = None
+    if app.config['METRICS_MULTIPROC_DIR']:
+        store = MultiProcessStore(app.config['METRICS_MULTIPROC_DIR'])
+        atexit.register(store.flush)
+    app.extensions['metrics_store'] = store
+
+    @app.before_request
+    def start_metrics():
+        g._metrics_started = time.perf_counter()
+        IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_metrics(response):
+        started = g.get('_metrics_started')
+        if started is not None:
+            endpoint = request.endpoint or 'unmatched'
+            REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint)
+            REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def finish_metrics(exc):
+        if g.pop('_metrics_started', None) is not None:
+            IN_FLIGHT.dec()
+        if store is not None:
+            try:
+                store.maybe_flush(app.config['METRICS_FLUSH_INTERVAL'])
+            except OSError as e:
+                app.logger.warning('Could not write metrics snapshot: %s', e)
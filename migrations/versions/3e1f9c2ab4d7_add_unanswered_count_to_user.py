@@ -0,0 +1,61 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Add denormalized unanswered_count to User
+
+Revision ID: 3e1f9c2ab4d7
+Revises: 7b1aafccdb3d
+Create Date: 2025-03-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e1f9c2ab4d7'
+down_revision = '7b1aafccdb3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unanswered_count', sa.Integer(), nullable=False, server_default='0'))
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('unanswered_count', server_default=None)
+
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('unanswered_count', sa.Integer))
+    question = sa.table(
+        'question',
+        sa.column('id', sa.Integer),
+        sa.column('receiver_id', sa.Integer),
+        sa.column('is_hidden', sa.Boolean),
+    )
+    answer = sa.table('answer', sa.column('question_id', sa.Integer))
+    unanswered = (
+        sa.select(sa.func.count(question.c.id))
+        .where(question.c.receiver_id == user.c.id)
+        .where(question.c.is_hidden.is_(False))
+        .where(~sa.exists().where(answer.c.question_id == question.c.id))
+        .scalar_subquery()
+    )
+    op.get_bind().execute(user.update().values(unanswered_count=unanswered))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('unanswered_count')
@@ -0,0 +1,67 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Add composite and partial indexes for hot query shapes
+
+Revision ID: 8c4d2e7f1a90
+Revises: 3e1f9c2ab4d7
+Create Date: 2025-03-02 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4d2e7f1a90'
+down_revision = '3e1f9c2ab4d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_user_created_at_id', 'user', ['created_at', 'id'])
+
+    op.create_index('ix_question_receiver_hidden_created', 'question', ['receiver_id', 'is_hidden', 'created_at'])
+    op.create_index('ix_question_ip_flagged', 'question', ['ip_address', 'is_flagged'])
+    op.create_index('ix_question_flagged_sender', 'question', ['sender_id'],
+                    sqlite_where=sa.text('is_flagged = 1'), postgresql_where=sa.text('is_flagged'))
+    op.create_index('ix_question_flagged_created', 'question', ['created_at'],
+                    sqlite_where=sa.text('is_flagged = 1'), postgresql_where=sa.text('is_flagged'))
+
+    op.create_index('ix_answer_created_at_id', 'answer', ['created_at', 'id'])
+    op.create_index('ix_answer_author_created_at_id', 'answer', ['author_id', 'created_at', 'id'])
+    op.create_index('ix_answer_question_id', 'answer', ['question_id'])
+
+    op.create_index('ix_answer_report_open_created', 'answer_report', ['created_at'],
+                    sqlite_where=sa.text('resolved = 0'), postgresql_where=sa.text('NOT resolved'))
+
+    op.create_index('ix_block_active_expires', 'block', ['active', 'expires_at'])
+    op.create_index('ix_block_created_at', 'block', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_block_created_at', table_name='block')
+    op.drop_index('ix_block_active_expires', table_name='block')
+    op.drop_index('ix_answer_report_open_created', table_name='answer_report')
+    op.drop_index('ix_answer_question_id', table_name='answer')
+    op.drop_index('ix_answer_author_created_at_id', table_name='answer')
+    op.drop_index('ix_answer_created_at_id', table_name='answer')
+    op.drop_index('ix_question_flagged_created', table_name='question')
+    op.drop_index('ix_question_flagged_sender', table_name='question')
+    op.drop_index('ix_question_ip_flagged', table_name='question')
+    op.drop_index('ix_question_receiver_hidden_created', table_name='question')
+    op.drop_index('ix_user_created_at_id', table_name='user')
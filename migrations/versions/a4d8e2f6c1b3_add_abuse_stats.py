@@ -0,0 +1,131 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Add abuse_stats counters
+
+Revision ID: a4d8e2f6c1b3
+Revises: f1c7d3a9b2e5
+Create Date: 2025-03-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d8e2f6c1b3'
+down_revision = 'f1c7d3a9b2e5'
+branch_labels = None
+depends_on = None
+
+
+question = sa.table(
+    'question',
+    sa.column('id', sa.Integer),
+    sa.column('sender_id', sa.Integer),
+    sa.column('ip_address', sa.String),
+    sa.column('is_flagged', sa.Boolean),
+    sa.column('is_hidden', sa.Boolean),
+    sa.column('created_at', sa.DateTime),
+)
+answer = sa.table('answer', sa.column('id', sa.Integer), sa.column('author_id', sa.Integer))
+answer_report = sa.table(
+    'answer_report',
+    sa.column('id', sa.Integer),
+    sa.column('answer_id', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+)
+abuse_stats = sa.table(
+    'abuse_stats',
+    sa.column('user_id', sa.Integer),
+    sa.column('ip_address', sa.String),
+    sa.column('submitted_count', sa.Integer),
+    sa.column('flagged_count', sa.Integer),
+    sa.column('hidden_count', sa.Integer),
+    sa.column('reported_count', sa.Integer),
+    sa.column('last_seen_at', sa.DateTime),
+)
+
+
+def upgrade():
+    op.create_table(
+        'abuse_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('submitted_count', sa.Integer(), nullable=False),
+        sa.Column('flagged_count', sa.Integer(), nullable=False),
+        sa.Column('hidden_count', sa.Integer(), nullable=False),
+        sa.Column('reported_count', sa.Integer(), nullable=False),
+        sa.Column('last_seen_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id'),
+        sa.UniqueConstraint('ip_address'),
+    )
+    op.create_index('ix_abuse_stats_flagged', 'abuse_stats', ['flagged_count'])
+
+    bind = op.get_bind()
+    flagged = sa.func.sum(sa.case((question.c.is_flagged == sa.true(), 1), else_=0))
+    hidden = sa.func.sum(sa.case((question.c.is_hidden == sa.true(), 1), else_=0))
+    for key in ('sender_id', 'ip_address'):
+        key_col = question.c[key]
+        sent = (
+            sa.select(key_col, sa.func.count(question.c.id), flagged, hidden, sa.literal(0),
+                      sa.func.max(question.c.created_at))
+            .where(key_col.isnot(None))
+            .group_by(key_col)
+        )
+        bind.execute(abuse_stats.insert().from_select(
+            ['user_id' if key == 'sender_id' else 'ip_address', 'submitted_count', 'flagged_count',
+             'hidden_count', 'reported_count', 'last_seen_at'],
+            sent,
+        ))
+
+    # Reports count against the answer's author, who may never have sent a question.
+    reports = (
+        sa.select(answer.c.author_id, sa.func.count(answer_report.c.id).label('reported'),
+                  sa.func.max(answer_report.c.created_at).label('latest'))
+        .select_from(answer_report.join(answer, answer.c.id == answer_report.c.answer_id))
+        .group_by(answer.c.author_id)
+    )
+    for author_id, reported, latest in bind.execute(reports).all():
+        updated = bind.execute(
+            abuse_stats.update()
+            .where(abuse_stats.c.user_id == author_id)
+            .values(
+                reported_count=reported,
+                last_seen_at=sa.case((abuse_stats.c.last_seen_at < latest, latest),
+                                     else_=abuse_stats.c.last_seen_at),
+            )
+        ).rowcount
+        if not updated:
+            bind.execute(abuse_stats.insert().values(
+                user_id=author_id, submitted_count=0, flagged_count=0, hidden_count=0,
+                reported_count=reported, last_seen_at=latest,
+            ))
+
+    # The counters replace these for the auto-block check and flag alerts.
+    op.drop_index('ix_question_ip_flagged', table_name='question')
+    op.drop_index('ix_question_flagged_sender', table_name='question')
+
+
+def downgrade():
+    op.create_index('ix_question_flagged_sender', 'question', ['sender_id'],
+                    sqlite_where=sa.text('is_flagged = 1'), postgresql_where=sa.text('is_flagged'))
+    op.create_index('ix_question_ip_flagged', 'question', ['ip_address', 'is_flagged'])
+    op.drop_index('ix_abuse_stats_flagged', table_name='abuse_stats')
+    op.drop_table('abuse_stats')
@@ -0,0 +1,103 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Add answered_at to Question and one answer per question
+
+Revision ID: b5e7a1c3d9f2
+Revises: 8c4d2e7f1a90
+Create Date: 2025-03-03 00:00:00.000000
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e7a1c3d9f2'
+down_revision = '8c4d2e7f1a90'
+branch_labels = None
+depends_on = None
+
+
+question = sa.table(
+    'question',
+    sa.column('id', sa.Integer),
+    sa.column('answered_at', sa.DateTime),
+)
+answer = sa.table(
+    'answer',
+    sa.column('id', sa.Integer),
+    sa.column('question_id', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # Double answers could slip in through the old check-then-insert race.
+    # Deciding which one to keep is left to an operator rather than deleting
+    # user content here, so stop before changing anything.
+    conflicts = bind.execute(
+        sa.select(answer.c.question_id)
+        .group_by(answer.c.question_id)
+        .having(sa.func.count(answer.c.id) > 1)
+        .order_by(answer.c.question_id)
+    ).scalars().all()
+    if conflicts:
+        raise RuntimeError(
+            'Cannot add the one-answer-per-question constraint; these question ids '
+            f'have more than one answer: {", ".join(map(str, conflicts))}. '
+            'Remove or reassign the extra answers (and their reports), then run the upgrade again.'
+        )
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('answered_at', sa.DateTime(), nullable=True))
+
+    first_answered = (
+        sa.select(sa.func.min(answer.c.created_at))
+        .where(answer.c.question_id == question.c.id)
+        .scalar_subquery()
+    )
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    bind.execute(
+        question.update()
+        .where(sa.exists().where(answer.c.question_id == question.c.id))
+        .values(answered_at=sa.func.coalesce(first_answered, now))
+    )
+
+    op.drop_index('ix_question_receiver_hidden_created', table_name='question')
+    op.create_index('ix_question_inbox', 'question', ['receiver_id', 'created_at'],
+                    sqlite_where=sa.text('answered_at IS NULL AND is_hidden = 0'),
+                    postgresql_where=sa.text('answered_at IS NULL AND NOT is_hidden'))
+
+    op.drop_index('ix_answer_question_id', table_name='answer')
+    with op.batch_alter_table('answer', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_answer_question_id', ['question_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('answer', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_answer_question_id', type_='unique')
+    op.create_index('ix_answer_question_id', 'answer', ['question_id'])
+
+    op.drop_index('ix_question_inbox', table_name='question')
+    op.create_index('ix_question_receiver_hidden_created', 'question', ['receiver_id', 'is_hidden', 'created_at'])
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_column('answered_at')
@@ -0,0 +1,75 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Add FTS5 answer search index
+
+Revision ID: b8e3f1a6d2c4
+Revises: a4d8e2f6c1b3
+Create Date: 2025-03-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3f1a6d2c4'
+down_revision = 'a4d8e2f6c1b3'
+branch_labels = None
+depends_on = None
+
+
+# Full-text search is SQLite-only (FTS5); other backends are left unchanged.
+CREATE_STATEMENTS = (
+    "CREATE VIRTUAL TABLE answer_search USING fts5(question_text, answer_text, tokenize='porter unicode61')",
+    """CREATE TRIGGER answer_search_insert AFTER INSERT ON answer BEGIN
+        INSERT INTO answer_search(rowid, question_text, answer_text)
+        SELECT new.id, question.question_text, new.answer_text FROM question WHERE question.id = new.question_id;
+    END""",
+    """CREATE TRIGGER answer_search_update AFTER UPDATE OF answer_text, question_id ON answer BEGIN
+        UPDATE answer_search SET answer_text = new.answer_text,
+            question_text = (SELECT question_text FROM question WHERE question.id = new.question_id)
+        WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER answer_search_delete AFTER DELETE ON answer BEGIN
+        DELETE FROM answer_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER answer_search_question_update AFTER UPDATE OF question_text ON question BEGIN
+        UPDATE answer_search SET question_text = new.question_text
+        WHERE rowid IN (SELECT id FROM answer WHERE answer.question_id = new.id);
+    END""",
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in CREATE_STATEMENTS:
+        op.execute(statement)
+    op.execute(
+        'INSERT INTO answer_search(rowid, question_text, answer_text)'
+        ' SELECT answer.id, question.question_text, answer.answer_text'
+        ' FROM answer JOIN question ON question.id = answer.question_id'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in ('answer_search_question_update', 'answer_search_delete',
+                    'answer_search_update', 'answer_search_insert'):
+        op.execute(f'DROP TRIGGER {trigger}')
+    op.execute('DROP TABLE answer_search')
@@ -0,0 +1,54 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Add avatar_status to User
+
+Revision ID: c3a8f6d2e4b1
+Revises: b5e7a1c3d9f2
+Create Date: 2025-03-10 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a8f6d2e4b1'
+down_revision = 'b5e7a1c3d9f2'
+branch_labels = None
+depends_on = None
+
+
+user = sa.table(
+    'user',
+    sa.column('avatar_url', sa.String),
+    sa.column('avatar_status', sa.String),
+)
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('avatar_status', sa.String(length=16), nullable=True))
+
+    # Existing avatars were verified synchronously when they were saved.
+    op.get_bind().execute(
+        user.update().where(user.c.avatar_url.isnot(None)).values(avatar_status='ok')
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('avatar_status')
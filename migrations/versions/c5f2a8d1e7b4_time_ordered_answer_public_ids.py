@@ -0,0 +1,84 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Time-ordered answer public IDs, keeping the old ones as aliases
+
+Revision ID: c5f2a8d1e7b4
+Revises: b8e3f1a6d2c4
+Create Date: 2025-03-25 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import secrets
+from datetime import timezone
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5f2a8d1e7b4'
+down_revision = 'b8e3f1a6d2c4'
+branch_labels = None
+depends_on = None
+
+ALPHABET = '0123456789abcdefghjkmnpqrstvwxyz'
+
+answers_table = sa.table(
+    'answer',
+    sa.column('id', sa.Integer),
+    sa.column('public_id', sa.String(length=16)),
+    sa.column('legacy_public_id', sa.String(length=16)),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def _time_ordered_id(created_at):
+    # Same layout as models.new_public_id: 48-bit epoch milliseconds, 32 random bits.
+    millis = int(created_at.replace(tzinfo=timezone.utc).timestamp() * 1000) if created_at else 0
+    value = (millis << 32) | secrets.randbits(32)
+    return ''.join(ALPHABET[(value >> shift) & 31] for shift in range(75, -1, -5))
+
+
+def upgrade():
+    # Plain ALTERs rather than batch mode: rebuilding the table on SQLite
+    # would drop the answer_search triggers.
+    op.add_column('answer', sa.Column('legacy_public_id', sa.String(length=16), nullable=True))
+
+    bind = op.get_bind()
+    new_ids = set()
+    rows = bind.execute(sa.select(answers_table.c.id, answers_table.c.created_at)).all()
+    for row in rows:
+        public_id = _time_ordered_id(row.created_at)
+        while public_id in new_ids:
+            public_id = _time_ordered_id(row.created_at)
+        new_ids.add(public_id)
+        bind.execute(
+            answers_table.update()
+            .where(answers_table.c.id == row.id)
+            .values(legacy_public_id=answers_table.c.public_id, public_id=public_id)
+        )
+
+    op.create_index('ix_answer_legacy_public_id', 'answer', ['legacy_public_id'], unique=True)
+
+
+def downgrade():
+    bind = op.get_bind()
+    bind.execute(
+        answers_table.update()
+        .where(answers_table.c.legacy_public_id.isnot(None))
+        .values(public_id=answers_table.c.legacy_public_id)
+    )
+    op.drop_index('ix_answer_legacy_public_id', table_name='answer')
+    op.drop_column('answer', 'legacy_public_id')
@@ -0,0 +1,41 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Add per-answer open report index
+
+Revision ID: f1c7d3a9b2e5
+Revises: e6b2d9a4f7c3
+Create Date: 2025-03-14 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7d3a9b2e5'
+down_revision = 'e6b2d9a4f7c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_answer_report_open_answer', 'answer_report', ['answer_id', 'created_at'],
+                    sqlite_where=sa.text('resolved = 0'), postgresql_where=sa.text('NOT resolved'))
+
+
+def downgrade():
+    op.drop_index('ix_answer_report_open_answer', table_name='answer_report')
@@ -15,14 +15,66 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import secrets
+import threading
 from datetime import datetime, timezone, timedelta
 from extensions import db  # Import db from extensions
 from flask_login import UserMixin
+from sqlalchemy.exc import IntegrityError
+
+# Lowercase Crockford base32: no i, l, o or u, and ASCII order is value order.
+PUBLIC_ID_ALPHABET = '0123456789abcdefghjkmnpqrstvwxyz'
+PUBLIC_ID_ATTEMPTS = 5
+
+_public_id_lock = threading.Lock()
+_last_public_id = (0, 0)
 
 
 def utcnow():
     return datetime.now(timezone.utc)
 
+
+def iso_utc(dt, timespec='auto'):
+    """RFC 3339 UTC timestamp (``...Z``) for a naive-UTC or aware datetime; None passes through."""
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.isoformat(timespec=timespec) + 'Z'
+
+
+def _epoch_ms(when):
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return int(when.timestamp() * 1000)
+
+
+def new_public_id(when=None):
+    """
+    Return a 16-character answer ID: a 48-bit millisecond timestamp followed by
+    32 random bits, in lowercase Crockford base32. IDs sort in creation order,
+    so they can serve as keyset cursors; IDs made in the same millisecond by
+    this process keep counting up from a random start.
+    """
+    global _last_public_id
+    millis = _epoch_ms(when or utcnow()) & ((1 << 48) - 1)
+    with _public_id_lock:
+        last_millis, last_random = _last_public_id
+        if millis == last_millis and last_random < (1 << 32) - 1:
+            rand = last_random + 1
+        else:
+            rand = secrets.randbits(32)
+        _last_public_id = (millis, rand)
+    value = (millis << 32) | rand
+    return ''.join(PUBLIC_ID_ALPHABET[(value >> shift) & 31] for shift in range(75, -1, -5))
+
+
+def public_id_time(public_id):
+    """Creation time encoded in a :func:`new_public_id` ID."""
+    value = 0
+    for char in public_id:
+        value = (value << 5) | PUBLIC_ID_ALPHABET.index(char)
+    return datetime.fromtimestamp((value >> 32) / 1000, timezone.utc)
+
 class User(db.Model, UserMixin):
     """
     User Model
@@ -32,6 +84,11 @@ class User(db.Model, UserMixin):
         email (str): Unique email address for the user, maximum length of 120 characters.
         password_hash (str): Hashed password for the user, maximum length of 128 characters.
         created_at (datetime): Timestamp when the user was created, defaults to the current UTC time.
+        avatar_status (str): Verification state of ``avatar_url``: 'pending' while the
+            background check runs, then 'ok' or 'failed'; only 'ok' avatars are shown.
+        avatar_mirror (str): File name of the locally mirrored copy of a verified avatar.
+        unanswered_count (int): Denormalized count of visible, unanswered questions received,
+            kept in step by the question/answer/moderation routes for the navbar badge.
     Methods:
         __repr__(): Returns a string representation of the user instance.
     """
@@ -41,11 +98,19 @@ class User(db.Model, UserMixin):
     password_hash = db.Column(db.String(128), nullable=False)
     bio = db.Column(db.Text)
     avatar_url = db.Column(db.String(255))
+    avatar_status = db.Column(db.String(16))
+    avatar_mirror = db.Column(db.String(64))
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
+    unanswered_count = db.Column(db.Integer, default=0, nullable=False)
     created_at = db.Column(db.DateTime, default=utcnow)
     questions = db.relationship('Question', backref='receiver', lazy=True, foreign_keys='Question.receiver_id')
     answers = db.relationship('Answer', backref='author', lazy=True)
 
+    __table_args__ = (
+        # New-users column on the feed (keyset pagination).
+        db.Index('ix_user_created_at_id', 'created_at', 'id'),
+    )
+
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -59,9 +124,24 @@ class Question(db.Model):
     question_text = db.Column(db.String(500), nullable=False)
     ip_address = db.Column(db.String(45), nullable=False)  # New field for IP address
     created_at = db.Column(db.DateTime, default=utcnow)
+    # Set in the same transaction that inserts the (single) answer.
+    answered_at = db.Column(db.DateTime, nullable=True)
     sender = db.relationship('User', foreign_keys=[sender_id], backref='sent_questions')
     answers = db.relationship('Answer', backref='question', lazy=True)
 
+    # Partial index predicates are written as ``= 1`` so they match the SQL
+    # that ``filter_by(is_flagged=True)`` renders; SQLite only uses a partial
+    # index when the query repeats its WHERE term.
+    __table_args__ = (
+        # Dashboard inbox and the unanswered-count recount.
+        db.Index('ix_question_inbox', 'receiver_id', 'created_at',
+                 sqlite_where=db.text('answered_at IS NULL AND is_hidden = 0'),
+                 postgresql_where=db.text('answered_at IS NULL AND NOT is_hidden')),
+        # Admin flagged-question list.
+        db.Index('ix_question_flagged_created', 'created_at',
+                 sqlite_where=db.text('is_flagged = 1'), postgresql_where=db.text('is_flagged')),
+    )
+
     def __repr__(self):
         return f'<Question {self.id}>'
 
@@ -71,26 +151,50 @@ class Answer(db.Model):
     author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     answer_text = db.Column(db.Text, nullable=False)
     public_id = db.Column(db.String(16), unique=True, nullable=False, index=True)
+    # Random hex ID the answer had before time-ordered IDs; old permalinks redirect.
+    legacy_public_id = db.Column(db.String(16), unique=True, nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=utcnow)
 
+    __table_args__ = (
+        # Feed and profile listings (keyset pagination on created_at, id).
+        db.Index('ix_answer_created_at_id', 'created_at', 'id'),
+        db.Index('ix_answer_author_created_at_id', 'author_id', 'created_at', 'id'),
+        # One answer per question; also serves answer-by-question lookups.
+        db.UniqueConstraint('question_id', name='uq_answer_question_id'),
+    )
+
     def __repr__(self):
         return f'<Answer {self.id}>'
 
-    @staticmethod
-    def generate_public_id():
-        """
-        Generate a unique, non-sequential public identifier for permalink use.
-        Retries on collision to keep IDs unique.
-        """
-        while True:
-            candidate = secrets.token_hex(8)
-            if not Answer.query.filter_by(public_id=candidate).first():
-                return candidate
-
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if not getattr(self, 'public_id', None):
-            self.public_id = self.generate_public_id()
+            self.public_id = new_public_id(self.created_at)
+
+    def insert(self):
+        """
+        Add and flush the answer, drawing a new public ID if the unique index
+        rejects it. Other integrity errors are raised to the caller.
+        """
+        for attempt in range(PUBLIC_ID_ATTEMPTS):
+            try:
+                with db.session.begin_nested():
+                    db.session.add(self)
+                    db.session.flush()
+                return
+            except IntegrityError as e:
+                if 'public_id' not in str(e.orig) or attempt == PUBLIC_ID_ATTEMPTS - 1:
+                    raise
+                self.public_id = new_public_id(self.created_at)
+
+def newest_answer(*criteria):
+    """``(created_at, id)`` of the newest answer matching ``criteria``, or None."""
+    return db.session.execute(
+        db.select(Answer.created_at, Answer.id)
+        .where(*criteria)
+        .order_by(Answer.created_at.desc(), Answer.id.desc())
+        .limit(1)
+    ).first()
 
 class AnswerReport(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -104,6 +208,15 @@ class AnswerReport(db.Model):
     answer = db.relationship('Answer', backref='reports')
     reporter = db.relationship('User', foreign_keys=[reporter_user_id])
 
+    __table_args__ = (
+        # Open-report queue in the admin panel.
+        db.Index('ix_answer_report_open_created', 'created_at',
+                 sqlite_where=db.text('resolved = 0'), postgresql_where=db.text('NOT resolved')),
+        # Per-answer report groups and the report-reasons lookup.
+        db.Index('ix_answer_report_open_answer', 'answer_id', 'created_at',
+                 sqlite_where=db.text('resolved = 0'), postgresql_where=db.text('NOT resolved')),
+    )
+
 class Block(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
@@ -115,9 +228,44 @@ class Block(db.Model):
 
     user = db.relationship('User', backref='blocks')
 
+    __table_args__ = (
+        # Block index load and the expiry sweep.
+        db.Index('ix_block_active_expires', 'active', 'expires_at'),
+        # Admin block list, newest first.
+        db.Index('ix_block_created_at', 'created_at'),
+    )
+
     def is_active(self):
         if not self.active:
             return False
         if self.expires_at and self.expires_at <= utcnow():
             return False
         return True
+
+class AbuseStats(db.Model):
+    """
+    Running moderation counters for one IP address or one registered user.
+    Attributes:
+        user_id (int): The user the row counts for; exclusive with ``ip_address``.
+        ip_address (str): The IP address the row counts for.
+        submitted_count (int): Questions sent.
+        flagged_count (int): Sent questions that receivers flagged.
+        hidden_count (int): Sent questions that receivers hid (flagging also hides).
+        reported_count (int): Reports filed against the user's answers (IP rows stay 0).
+        last_seen_at (datetime): Time of the latest counted event.
+    Updated by ``abuse.record`` in the same transaction as the event itself;
+    ``flask rebuild-abuse-stats`` recomputes every row from questions and reports.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, unique=True)
+    ip_address = db.Column(db.String(45), nullable=True, unique=True)
+    submitted_count = db.Column(db.Integer, default=0, nullable=False)
+    flagged_count = db.Column(db.Integer, default=0, nullable=False)
+    hidden_count = db.Column(db.Integer, default=0, nullable=False)
+    reported_count = db.Column(db.Integer, default=0, nullable=False)
+    last_seen_at = db.Column(db.DateTime, default=utcnow)
+
+    __table_args__ = (
+        # Admin flag alerts.
+        db.Index('ix_abuse_stats_flagged', 'flagged_count'),
+    )
@@ -0,0 +1,127 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Keyset (cursor) pagination over ``(created_at, id)`` ordered listings.
+
+Offset pagination has to COUNT the whole table and walk past every skipped
+row, so deep pages get slower as the site grows. Keyset pagination instead
+remembers the sort key of the last row shown and asks for rows strictly
+after it, which an index on ``(created_at, id)`` answers in constant time.
+"""
+
+import base64
+import binascii
+from datetime import datetime, timezone
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination token cannot be decoded."""
+
+
+def encode_cursor(created_at, row_id):
+    """Return an opaque, URL-safe token for the ``(created_at, id)`` key."""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    raw = f'{created_at.isoformat()}|{row_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the ``(created_at, id)`` key stored in ``token``."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        stamp, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(stamp), int(row_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError) as e:
+        raise InvalidCursor(token) from e
+
+
+class KeysetPage:
+    """One page of a keyset-paginated listing.
+
+    Attributes:
+        items (list): Rows on this page, newest first.
+        next_cursor (str): Token for the following (older) page, or None.
+        prev_cursor (str): Token for the preceding (newer) page, or None.
+        total (int): Total row count, or None when the count was skipped.
+    """
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(query, created_col, id_col, per_page, after=None, before=None, with_total=False):
+    """Return a :class:`KeysetPage` of ``query`` ordered newest first.
+
+    ``after`` continues towards older rows and ``before`` walks back towards
+    newer ones; both are tokens previously handed out by a page. Raises
+    :class:`InvalidCursor` if a token is malformed. The total is only counted
+    when ``with_total`` is set, since that is the one part of a page whose
+    cost grows with the table.
+    """
+    created_key, id_key = created_col.key, id_col.key
+
+    def cursor_for(item):
+        return encode_cursor(getattr(item, created_key), getattr(item, id_key))
+
+    total = query.order_by(None).count() if with_total else None
+    if before:
+        created_at, row_id = decode_cursor(before)
+        rows = (
+            query
+            .filter(or_(created_col > created_at, and_(created_col == created_at, id_col > row_id)))
+            .order_by(created_col.asc(), id_col.asc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after:
+            created_at, row_id = decode_cursor(after)
+            query = query.filter(or_(created_col < created_at, and_(created_col == created_at, id_col < row_id)))
+        rows = (
+            query
+            .order_by(created_col.desc(), id_col.desc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev = after is not None
+    if not items:
+        return KeysetPage(items, total=total)
+    return KeysetPage(
+        items,
+        next_cursor=cursor_for(items[-1]) if has_next else None,
+        prev_cursor=cursor_for(items[0]) if has_prev else None,
+        total=total,
+    )
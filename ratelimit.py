@@ -0,0 +1,196 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Sliding-window rate limiting with pluggable storage.
+
+Each limit keeps a counter per fixed window and estimates the sliding window
+as ``previous * (1 - elapsed_fraction) + current``, so a check costs one
+increment and one read no matter how busy the key is. Counters live in one of
+three interchangeable backends chosen by ``RATE_LIMIT_STORAGE``:
+
+* ``memory://`` keeps counters in this process (the default);
+* ``sqlite:///path/to/file.db`` shares them between processes on one host;
+* ``redis://host:port/db`` shares them through any RESP-speaking server.
+
+Limits are configured per route in ``RATE_LIMITS`` as ``"<count>/<period>"``
+strings, e.g. ``{'profile': '5/minute'}``; routes left out keep their
+:data:`DEFAULT_LIMITS` rule.
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+
+from metrics import RATE_LIMIT_REJECTIONS
+from resp import RespClient, RespError
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+DEFAULT_LIMITS = {
+    'profile': '5/minute',
+    'report_answer': '10/minute',
+    'login': '10/minute',
+    'register': '5/hour',
+}
+
+
+class RateLimit(namedtuple('RateLimit', 'limit window')):
+    """``limit`` hits allowed per ``window`` seconds."""
+
+    @classmethod
+    def parse(cls, spec):
+        count, _, period = spec.partition('/')
+        period = period.strip().rstrip('s')
+        if period not in PERIODS:
+            raise ValueError(f'Unknown rate limit period in {spec!r}')
+        return cls(int(count), PERIODS[period])
+
+
+class MemoryBackend:
+    """Per-process counters; each worker enforces its own share of the limit."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def hit(self, key, window_id, window):
+        with self._lock:
+            windows = self._counts.setdefault(key, {})
+            current = windows.get(window_id, 0) + 1
+            previous = windows.get(window_id - 1, 0)
+            # Only the current and previous windows ever matter.
+            self._counts[key] = {window_id - 1: previous, window_id: current}
+            if len(self._counts) > 10000:
+                self._prune(window_id)
+            return previous, current
+
+    def _prune(self, window_id):
+        stale = [k for k, w in self._counts.items() if max(w) < window_id - 1]
+        for k in stale:
+            del self._counts[k]
+
+
+class SQLiteBackend:
+    """Counters in a SQLite table that several processes can share."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit ('
+                ' key TEXT NOT NULL, window INTEGER NOT NULL, count INTEGER NOT NULL,'
+                ' expires REAL NOT NULL, PRIMARY KEY (key, window))'
+            )
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, window_id, window):
+        conn = self._connection()
+        now = time.time()
+        current = conn.execute(
+            'INSERT INTO rate_limit (key, window, count, expires) VALUES (?, ?, 1, ?)'
+            ' ON CONFLICT (key, window) DO UPDATE SET count = count + 1 RETURNING count',
+            (key, window_id, now + 2 * window),
+        ).fetchone()[0]
+        row = conn.execute(
+            'SELECT count FROM rate_limit WHERE key = ? AND window = ?', (key, window_id - 1)
+        ).fetchone()
+        if random.random() < 0.01:
+            conn.execute('DELETE FROM rate_limit WHERE expires < ?', (now,))
+        return (row[0] if row else 0), current
+
+
+class RedisBackend:
+    """Counters in a Redis-protocol server, expired by the server itself."""
+
+    def __init__(self, url):
+        self.client = RespClient.from_url(url)
+
+    def hit(self, key, window_id, window):
+        current_key = f'qbox:rl:{key}:{window_id}'
+        current, _, previous = self.client.pipeline(
+            ('INCR', current_key),
+            ('PEXPIRE', current_key, window * 2000),
+            ('GET', f'qbox:rl:{key}:{window_id - 1}'),
+        )
+        return int(previous or 0), current
+
+
+def backend_from_url(url):
+    if not url or url.startswith('memory://'):
+        return MemoryBackend()
+    if url.startswith('sqlite:///'):
+        return SQLiteBackend(url[len('sqlite:///'):])
+    if url.startswith('redis://'):
+        return RedisBackend(url)
+    raise ValueError(f'Unsupported RATE_LIMIT_STORAGE {url!r}')
+
+
+class RateLimiter:
+    """Check hits against per-route :class:`RateLimit` rules."""
+
+    def __init__(self, backend, limits):
+        self.backend = backend
+        self.limits = {route: RateLimit.parse(spec) for route, spec in limits.items()}
+
+    def hit(self, route, key, now=None):
+        """Record a hit for ``key`` on ``route``; return False if over the limit.
+
+        Routes without a configured limit are always allowed, and so is every
+        hit while the backend is unreachable: rate limiting is a nicety, not a
+        reason to take question submission down.
+        """
+        rule = self.limits.get(route)
+        if rule is None:
+            return True
+        now = time.time() if now is None else now
+        window_id, offset = divmod(now, rule.window)
+        try:
+            previous, current = self.backend.hit(f'{route}:{key}', int(window_id), rule.window)
+        except (RespError, sqlite3.Error) as e:
+            current_app.logger.warning('Rate limit backend unavailable: %s', e)
+            return True
+        estimated = previous * (1 - offset / rule.window) + current
+        return estimated <= rule.limit
+
+
+def get_limiter(app=None):
+    """Return the app's :class:`RateLimiter`, building it from config on first use."""
+    app = app or current_app
+    limiter = app.extensions.get('rate_limiter')
+    if limiter is None:
+        backend = backend_from_url(app.config.get('RATE_LIMIT_STORAGE'))
+        limiter = RateLimiter(backend, {**DEFAULT_LIMITS, **app.config.get('RATE_LIMITS', {})})
+        app.extensions['rate_limiter'] = limiter
+    return limiter
+
+
+def rate_limited(route, key):
+    """Record a hit and return True if ``key`` has exceeded ``route``'s limit."""
+    if get_limiter().hit(route, key):
+        return False
+    RATE_LIMIT_REJECTIONS.inc(route=route)
+    return True
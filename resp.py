@@ -0,0 +1,139 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Minimal client for the Redis serialization protocol (RESP).
+
+Only the handful of commands the shared caches and rate limiter need are
+used, so a small socket client avoids adding a hard dependency; anything
+that speaks RESP (Redis, Valkey, KeyDB, a test stand-in) works as a server.
+"""
+
+import socket
+import threading
+from urllib.parse import unquote, urlparse
+
+
+class RespError(Exception):
+    """Raised for error replies and connection failures."""
+
+
+class RespConnectionError(RespError):
+    """Raised when the server cannot be reached or hangs up."""
+
+
+class RespClient:
+    """Blocking RESP client holding one connection per thread."""
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=1.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Build a client from ``redis://[:password@]host[:port][/db]``."""
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip('/') or 0)
+        password = unquote(parsed.password) if parsed.password else None
+        return cls(parsed.hostname or 'localhost', parsed.port or 6379, db, password, **kwargs)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            conn = (sock, sock.makefile('rb'))
+            try:
+                if self.password:
+                    self._call_on(conn, [('AUTH', self.password)])
+                if self.db:
+                    self._call_on(conn, [('SELECT', self.db)])
+            except RespError:
+                conn[1].close()
+                sock.close()
+                raise
+            self._local.conn = conn
+        return conn
+
+    def _disconnect(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    @staticmethod
+    def _encode(args):
+        out = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(out)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise RespConnectionError('Connection closed by server')
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode()
+        if kind == b'-':
+            raise RespError(body.decode())
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(body)
+            if length < 0:
+                return None
+            return [self._read_reply(reader) for _ in range(length)]
+        raise RespConnectionError(f'Unexpected reply type {kind!r}')
+
+    def _call_on(self, conn, commands):
+        sock, reader = conn
+        sock.sendall(b''.join(self._encode(args) for args in commands))
+        replies, error = [], None
+        for _ in commands:
+            try:
+                replies.append(self._read_reply(reader))
+            except RespConnectionError:
+                raise
+            except RespError as e:
+                # Keep reading so the connection stays in sync.
+                error = error or e
+                replies.append(None)
+        if error:
+            raise error
+        return replies
+
+    def pipeline(self, *commands):
+        """Send several commands in one round trip and return their replies."""
+        try:
+            return self._call_on(self._connection(), commands)
+        except (OSError, RespConnectionError) as e:
+            self._disconnect()
+            raise RespConnectionError(str(e)) from e
+
+    def execute(self, *args):
+        return self.pipeline(args)[0]
@@ -0,0 +1,185 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Whole-response caching and conditional GETs for logged-out visitors.
+
+A view wrapped with :func:`cache_anonymous_get` supplies a cheap *validator*
+that returns ``(last_modified, token)`` from a few indexed lookups. The
+ETag is derived from that token, the request path and a cache generation, so
+a matching ``If-None-Match`` is answered with 304 before anything renders,
+and other hits are served from a TTL'd LRU of rendered bodies.
+
+Writes that change what visitors see call :func:`invalidate_responses`. That
+only reaches this process, so the ETag also rolls over every
+``RESPONSE_CACHE_TTL`` seconds to bound staleness from other workers.
+
+Pages carry the visitor's CSRF token in their forms; bodies are rendered
+with a placeholder in its place and each response gets the real token of the
+session it is sent to.
+"""
+
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+
+from fragments import LRUCache
+from models import utcnow
+
+CSRF_PLACEHOLDER = '__qbox_csrf_token__'
+
+
+class ResponseCache:
+    """LRU of rendered ``(body, mimetype)`` pairs keyed by ETag, plus the invalidation generation."""
+
+    def __init__(self, maxsize=500, ttl=60):
+        self.store = LRUCache(maxsize)
+        self.ttl = ttl
+        self.generation = 0
+        self.generation_time = utcnow()
+
+    def invalidate(self):
+        self.generation += 1
+        self.generation_time = utcnow()
+        self.store.clear()
+
+    def get(self, etag):
+        entry = self.store.get(etag)
+        if entry is None:
+            return None
+        expires, body = entry
+        if expires < time.monotonic():
+            self.store.delete(etag)
+            return None
+        return body
+
+    def set(self, etag, body):
+        self.store.set(etag, (time.monotonic() + self.ttl, body))
+
+
+def get_response_cache(app=None):
+    app = app or current_app
+    return app.extensions['response_cache']
+
+
+def invalidate_responses():
+    """Forget cached pages after a write that changes what visitors see."""
+    get_response_cache().invalidate()
+
+
+def user_token(user):
+    """Validator token covering everything pages show about ``user`` besides answers."""
+    return f'{user.id}:{user.username}:{user.bio}:{user.avatar_url}:{user.avatar_status}:{user.avatar_mirror}'
+
+
+def _aware(dt):
+    if dt is not None and dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _cacheable(per_visitor):
+    if request.method != 'GET' or not current_app.config['RESPONSE_CACHE_ENABLED']:
+        return False
+    return not per_visitor or (not current_user.is_authenticated and '_flashes' not in session)
+
+
+def _with_validators(resp, etag, last_modified, per_visitor):
+    resp.set_etag(etag)
+    resp.last_modified = last_modified
+    if per_visitor:
+        # Bodies hold a per-session CSRF token, so only the visitor's browser
+        # may keep them, and it must revalidate each time.
+        resp.cache_control.private = True
+        resp.vary.add('Cookie')
+    else:
+        resp.cache_control.public = True
+    resp.cache_control.no_cache = True
+    return resp
+
+
+def cache_anonymous_get(validator, per_visitor=True):
+    """Serve logged-out GETs of the wrapped view from the response cache.
+
+    ``validator`` receives the view's arguments and returns
+    ``(last_modified, token)``, or None to bypass the cache (e.g. for a 404).
+    Views whose output is the same for every visitor, such as the JSON API,
+    pass ``per_visitor=False`` to be cached for logged-in users too and to be
+    marked public for shared caches.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _cacheable(per_visitor):
+                return view(*args, **kwargs)
+            validated = validator(*args, **kwargs)
+            if validated is None:
+                return view(*args, **kwargs)
+            cache = get_response_cache()
+            newest, token = validated
+            bucket = int(time.time() // cache.ttl)
+            bucket_start = datetime.fromtimestamp(bucket * cache.ttl, timezone.utc)
+            last_modified = max(d for d in (_aware(newest), cache.generation_time, bucket_start) if d)
+            last_modified = last_modified.replace(microsecond=0)
+            etag = hashlib.sha1(
+                f'{cache.generation}|{bucket}|{request.full_path}|{token}'.encode()
+            ).hexdigest()
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and last_modified <= since
+            if not_modified:
+                return _with_validators(make_response('', 304), etag, last_modified, per_visitor)
+
+            cached = cache.get(etag)
+            if cached is None:
+                field = current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token')
+                setattr(g, field, CSRF_PLACEHOLDER)
+                try:
+                    resp = make_response(view(*args, **kwargs))
+                finally:
+                    g.pop(field, None)
+                if resp.status_code != 200 or resp.direct_passthrough:
+                    return resp
+                body = resp.get_data(as_text=True)
+                cache.set(etag, (body, resp.mimetype))
+            else:
+                body, mimetype = cached
+                resp = make_response(body)
+                resp.mimetype = mimetype
+            if CSRF_PLACEHOLDER in body:
+                resp.set_data(body.replace(CSRF_PLACEHOLDER, generate_csrf()))
+            return _with_validators(resp, etag, last_modified, per_visitor)
+        return wrapper
+    return decorator
+
+
+def init_app(app):
+    app.config.setdefault('RESPONSE_CACHE_ENABLED', True)
+    app.config.setdefault('RESPONSE_CACHE_TTL', 60)
+    app.config.setdefault('RESPONSE_CACHE_SIZE', 500)
+    if app.config['RESPONSE_CACHE_TTL'] < 0:
+        raise ValueError('RESPONSE_CACHE_TTL must be 0 (caching off) or a positive number of seconds.')
+    if app.config['RESPONSE_CACHE_TTL'] == 0:
+        app.config['RESPONSE_CACHE_ENABLED'] = False
+    app.extensions['response_cache'] = ResponseCache(app.config['RESPONSE_CACHE_SIZE'],
+                                                     app.config['RESPONSE_CACHE_TTL'])
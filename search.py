@@ -0,0 +1,175 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Full-text search over answered questions, backed by SQLite FTS5.
+
+``answer_search`` is an FTS5 table with one row per answer (rowid = answer
+id) holding the question and answer text. Triggers on ``answer`` and
+``question`` keep it in step with every insert, edit and delete, so the
+write paths need no search-specific code. Results are ordered by bm25 and
+paged with an opaque ``(rank, id)`` cursor; answers to hidden questions are
+left out.
+
+The table and triggers are created by the migrations and, for
+``db.create_all()``, by the DDL hooks below. Other database backends get no
+index and :func:`search_answers` reports search as unavailable.
+``flask rebuild-search-index`` refills the index from scratch.
+"""
+
+import base64
+import binascii
+import re
+
+from sqlalchemy import DDL, event
+
+from extensions import db
+from models import Answer
+from pagination import InvalidCursor, KeysetPage
+
+MAX_QUERY_TERMS = 8
+
+SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS answer_search"
+    " USING fts5(question_text, answer_text, tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS answer_search_insert AFTER INSERT ON answer BEGIN"
+    " INSERT INTO answer_search(rowid, question_text, answer_text)"
+    " SELECT new.id, question.question_text, new.answer_text FROM question WHERE question.id = new.question_id;"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS answer_search_update AFTER UPDATE OF answer_text, question_id ON answer BEGIN"
+    " UPDATE answer_search SET answer_text = new.answer_text,"
+    " question_text = (SELECT question_text FROM question WHERE question.id = new.question_id)"
+    " WHERE rowid = new.id;"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS answer_search_delete AFTER DELETE ON answer BEGIN"
+    " DELETE FROM answer_search WHERE rowid = old.id;"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS answer_search_question_update AFTER UPDATE OF question_text ON question BEGIN"
+    " UPDATE answer_search SET question_text = new.question_text"
+    " WHERE rowid IN (SELECT id FROM answer WHERE answer.question_id = new.id);"
+    " END",
+)
+
+for _statement in SEARCH_DDL:
+    event.listen(db.metadata, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(db.metadata, 'before_drop', DDL('DROP TABLE IF EXISTS answer_search').execute_if(dialect='sqlite'))
+
+
+class SearchUnavailable(RuntimeError):
+    """Raised when the database has no full-text index."""
+
+
+def search_available():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last as a prefix.
+
+    Terms are quoted so that FTS5 operators and punctuation typed by users
+    are matched literally rather than parsed. Returns None if ``text`` has no
+    searchable words.
+    """
+    terms = re.findall(r'\w+', text or '')[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def encode_search_cursor(rank, answer_id):
+    raw = f'{rank!r}|{answer_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_search_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        rank, answer_id = base64.urlsafe_b64decode(padded.encode()).decode().rsplit('|', 1)
+        return float(rank), int(answer_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError) as e:
+        raise InvalidCursor(token) from e
+
+
+def search_answers(text, per_page, after=None, author_id=None, options=()):
+    """Return a :class:`~pagination.KeysetPage` of answers matching ``text``, best first.
+
+    ``after`` is a cursor from a previous page; ``author_id`` limits results
+    to one user's answers. Raises :class:`SearchUnavailable` off SQLite and
+    :class:`~pagination.InvalidCursor` for a malformed cursor.
+    """
+    if not search_available():
+        raise SearchUnavailable()
+    match = fts_query(text)
+    if match is None:
+        return KeysetPage([])
+    clauses = ['answer_search MATCH :match', 'question.is_hidden = 0']
+    params = {'match': match, 'limit': per_page + 1}
+    if author_id is not None:
+        clauses.append('answer.author_id = :author_id')
+        params['author_id'] = author_id
+    if after:
+        params['rank'], params['after_id'] = decode_search_cursor(after)
+        clauses.append('(answer_search.rank > :rank OR (answer_search.rank = :rank AND answer_search.rowid > :after_id))')
+    rows = db.session.execute(db.text(
+        'SELECT answer.id, answer_search.rank FROM answer_search'
+        ' JOIN answer ON answer.id = answer_search.rowid'
+        ' JOIN question ON question.id = answer.question_id'
+        f' WHERE {" AND ".join(clauses)}'
+        ' ORDER BY answer_search.rank, answer_search.rowid LIMIT :limit'
+    ), params).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    if not rows:
+        return KeysetPage([])
+    answers = {
+        answer.id: answer for answer in
+        Answer.query.options(*options).filter(Answer.id.in_([row.id for row in rows]))
+    }
+    items = [answers[row.id] for row in rows if row.id in answers]
+    last = rows[-1]
+    return KeysetPage(items, next_cursor=encode_search_cursor(last.rank, last.id) if has_next else None)
+
+
+def rebuild_search_index():
+    """Refill ``answer_search`` from the answer and question tables; returns the row count."""
+    if not search_available():
+        raise SearchUnavailable()
+    for statement in SEARCH_DDL:
+        db.session.execute(db.text(statement))
+    db.session.execute(db.text('DELETE FROM answer_search'))
+    db.session.execute(db.text(
+        'INSERT INTO answer_search(rowid, question_text, answer_text)'
+        ' SELECT answer.id, question.question_text, answer.answer_text'
+        ' FROM answer JOIN question ON question.id = answer.question_id'
+    ))
+    db.session.execute(db.text("INSERT INTO answer_search(answer_search) VALUES ('optimize')"))
+    db.session.commit()
+    return db.session.execute(db.text('SELECT count(*) FROM answer_search')).scalar()
+
+
+def init_app(app):
+    app.config.setdefault('SEARCH_PAGE_SIZE', 20)
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Rebuild the full-text search index over answers."""
+        try:
+            count = rebuild_search_index()
+        except SearchUnavailable:
+            print('Full-text search needs SQLite with FTS5.')
+            return
+        print(f'Search index rebuilt with {count} answers.')
@@ -6,22 +6,35 @@
   const closeBtn = backdrop.querySelector('[data-report-detail-close]');
   const list = backdrop.querySelector('[data-report-detail-list]');
 
-  function openModal(reportsJson) {
+  function showMessage(text) {
     list.innerHTML = '';
-    try {
-      const reports = JSON.parse(reportsJson);
-      reports.forEach((item) => {
-        const li = document.createElement('li');
-        const detail = `${item.reason || 'No reason provided.'} — ${item.reporter || 'Unknown reporter'} at ${item.created_human || 'unknown time'}`;
-        li.textContent = detail;
-        list.appendChild(li);
-      });
-    } catch (e) {
-      const li = document.createElement('li');
-      li.textContent = 'Unable to load report reasons.';
-      list.appendChild(li);
-    }
+    const li = document.createElement('li');
+    li.textContent = text;
+    list.appendChild(li);
+  }
+
+  function openModal(url) {
+    showMessage('Loading…');
     backdrop.classList.add('modal-open');
+    fetch(url, { headers: { Accept: 'application/json' }, credentials: 'same-origin' })
+      .then((resp) => {
+        if (!resp.ok) throw new Error(resp.statusText);
+        return resp.json();
+      })
+      .then((data) => {
+        list.innerHTML = '';
+        if (!data.reports.length) {
+          showMessage('No open reports.');
+          return;
+        }
+        data.reports.forEach((item) => {
+          const li = document.createElement('li');
+          const detail = `${item.reason || 'No reason provided.'} — ${item.reporter || 'Unknown reporter'} at ${item.created_human || 'unknown time'}`;
+          li.textContent = detail;
+          list.appendChild(li);
+        });
+      })
+      .catch(() => showMessage('Unable to load report reasons.'));
   }
 
   function closeModal() {
@@ -29,12 +42,12 @@
     list.innerHTML = '';
   }
 
-  document.querySelectorAll('[data-report-detail]').forEach((btn) => {
+  document.querySelectorAll('[data-report-detail-url]').forEach((btn) => {
     btn.addEventListener('click', (e) => {
       e.preventDefault();
-      const payload = btn.getAttribute('data-report-detail');
-      if (payload) {
-        openModal(payload);
+      const url = btn.getAttribute('data-report-detail-url');
+      if (url) {
+        openModal(url);
       }
     });
   });
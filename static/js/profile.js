@@ -0,0 +1,33 @@
+// Qbox profile "load more answers" handling
+(function () {
+  const list = document.querySelector('[data-answer-list]');
+  const more = document.querySelector('[data-load-more]');
+  if (!list || !more) return;
+
+  more.addEventListener('click', (e) => {
+    const url = more.getAttribute('data-url');
+    if (!url) return;
+    e.preventDefault();
+    more.setAttribute('aria-busy', 'true');
+    fetch(url, { headers: { Accept: 'application/json' } })
+      .then((resp) => {
+        if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+        return resp.json();
+      })
+      .then((data) => {
+        list.insertAdjacentHTML('beforeend', data.html);
+        if (data.next) {
+          const next = encodeURIComponent(data.next);
+          more.setAttribute('data-url', url.replace(/after=[^&]*/, `after=${next}`));
+          more.setAttribute('href', more.getAttribute('href').replace(/after=[^&]*/, `after=${next}`));
+          more.removeAttribute('aria-busy');
+        } else {
+          more.remove();
+        }
+      })
+      .catch(() => {
+        // Fall back to following the plain link to the next page.
+        window.location.href = more.getAttribute('href');
+      });
+  });
+})();
@@ -20,14 +20,15 @@
     form.reset();
   }
 
-  document.querySelectorAll('[data-report-answer]').forEach((btn) => {
-    btn.addEventListener('click', (e) => {
-      e.preventDefault();
-      const answerId = btn.getAttribute('data-report-answer');
-      const actionUrl = btn.getAttribute('data-action');
-      if (!answerId) return;
-      openModal(answerId, actionUrl);
-    });
+  // Delegate so cards appended later (profile "load more") work too.
+  document.addEventListener('click', (e) => {
+    const btn = e.target.closest('[data-report-answer]');
+    if (!btn) return;
+    e.preventDefault();
+    const answerId = btn.getAttribute('data-report-answer');
+    const actionUrl = btn.getAttribute('data-action');
+    if (!answerId) return;
+    openModal(answerId, actionUrl);
   });
 
   backdrop.addEventListener('click', (e) => {
@@ -15,9 +15,15 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import pytest
+from werkzeug.security import generate_password_hash
 
 from app import app as flask_app
+from avatars import avatar_checks
+from blocks import block_index
 from extensions import db
+from metrics import REGISTRY
+from models import User
+from tests.helpers import create_answer
 
 @pytest.fixture
 def client():
@@ -27,6 +33,7 @@ def client():
         WTF_CSRF_ENABLED=False,
         SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        AVATAR_MIRROR_ENABLED=False,
     )
     with flask_app.app_context():
         # Reset any cached engine/session that might point at a developer DB.
@@ -36,8 +43,42 @@ def client():
             engines[None].dispose()
         engines[None] = db.create_engine(flask_app.config['SQLALCHEMY_DATABASE_URI'])
         db.create_all()
+    block_index.invalidate()
+    avatar_checks.clear()
+    flask_app.extensions.pop('rate_limiter', None)
+    flask_app.extensions.pop('avatar_mirror', None)
+    flask_app.extensions['fragment_cache'].clear()
+    flask_app.extensions['response_cache'].invalidate()
+    flask_app.extensions['endpoint_stats'].clear()
+    REGISTRY.clear()
     with flask_app.test_client() as client:
         yield client
     with flask_app.app_context():
         db.drop_all()
         db.session.remove()
+
+
+@pytest.fixture
+def seed_answers(client):
+    """Factory for answered questions, numbered ``Q<i>?``/``A<i>``; returns their public ids.
+
+    ``author`` is created on first use (password ``password``); pass None to
+    give every answer its own new author. ``created_at(i)`` sets timestamps.
+    """
+    def seed(count=5, author="alice", created_at=None):
+        public_ids = []
+        with flask_app.app_context():
+            start = User.query.count()
+            for i in range(count):
+                username = author or f"user{start + i}"
+                user = User.query.filter_by(username=username).first()
+                if user is None:
+                    user = User(username=username, email=f"{username}@example.com",
+                                password_hash=generate_password_hash("password"))
+                    db.session.add(user)
+                    db.session.flush()
+                answer = create_answer(user.id, f"Q{i}?", f"A{i}", created_at(i) if created_at else None)
+                public_ids.append(answer.public_id)
+            db.session.commit()
+        return public_ids
+    return seed
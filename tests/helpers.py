@@ -0,0 +1,87 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Shared helpers for the test suite: form-driven sign-up and login, SQL
+statement capture, and factories for answered questions.
+"""
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import app as flask_app
+from extensions import db
+from models import Answer, Question, utcnow
+
+
+def register(client, username, email, password="password"):
+    return client.post(
+        "/register",
+        data={
+            "username": username,
+            "email": email,
+            "password": password,
+            "confirm_password": password,
+        },
+        follow_redirects=True,
+    )
+
+
+def login(client, email, password="password"):
+    return client.post(
+        "/login",
+        data={"email": email, "password": password},
+        follow_redirects=True,
+    )
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with flask_app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def answer_question(question, answer_text="A", created_at=None):
+    """Answer ``question`` as the answer route does, setting ``answered_at`` with it.
+
+    Needs an app context; the caller commits.
+    """
+    answered_at = created_at or utcnow()
+    question.answered_at = answered_at
+    answer = Answer(question_id=question.id, author_id=question.receiver_id, answer_text=answer_text,
+                    created_at=answered_at)
+    db.session.add(answer)
+    db.session.flush()
+    return answer
+
+
+def create_answer(author_id, question_text="Q?", answer_text="A", created_at=None, **question_fields):
+    """Ask ``author_id`` a question and answer it; returns the flushed :class:`Answer`."""
+    question_fields.setdefault("ip_address", "10.0.0.1")
+    question = Question(receiver_id=author_id, question_text=question_text, created_at=created_at, **question_fields)
+    db.session.add(question)
+    db.session.flush()
+    return answer_question(question, answer_text, created_at)
@@ -0,0 +1,98 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Synthetic images covering every header layout the avatar prober supports.
+
+Each entry is padded with filler after its header so that a prober which
+reads more than it needs shows up in the byte counts.
+"""
+
+import struct
+import zlib
+from pathlib import Path
+
+BODY_PADDING = 48 * 1024
+DEFAULT_AVATAR = Path(__file__).resolve().parent.parent / "static" / "images" / "default-avatar.png"
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def png(width, height):
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", ihdr) + _png_chunk(b"IDAT", b"\0" * BODY_PADDING)
+
+
+def gif(width, height):
+    return b"GIF89a" + struct.pack("<HHBBB", width, height, 0, 0, 0) + b"\0" * BODY_PADDING
+
+
+def _jpeg_segment(marker, payload):
+    return b"\xff" + bytes([marker]) + struct.pack(">H", len(payload) + 2) + payload
+
+
+def jpeg(width, height, sof=0xC0, exif_bytes=0, icc_bytes=0):
+    """A JPEG whose frame header follows optional EXIF (APP1) and ICC (APP2) blocks."""
+    segments = [_jpeg_segment(0xE0, b"JFIF\0\x01\x01\0\0\x01\0\x01\0\0")]
+    # Segments hold at most 65533 payload bytes, so big blocks span several.
+    for marker, total, tag in ((0xE1, exif_bytes, b"Exif\0\0"), (0xE2, icc_bytes, b"ICC_PROFILE\0")):
+        while total > 0:
+            part = min(total, 65533 - len(tag))
+            segments.append(_jpeg_segment(marker, tag + b"\0" * part))
+            total -= part
+    segments.append(_jpeg_segment(0xDB, b"\0" * 65))
+    segments.append(_jpeg_segment(sof, struct.pack(">BHHB", 8, height, width, 3) + b"\x01\x22\0\x02\x11\x01\x03\x11\x01"))
+    segments.append(_jpeg_segment(0xDA, b"\x03\x01\0\x02\x11\x03\x11\0\x3f\0"))
+    return b"\xff\xd8" + b"".join(segments) + b"\0" * BODY_PADDING + b"\xff\xd9"
+
+
+def _riff(chunk_kind, chunk):
+    body = b"WEBP" + chunk_kind + struct.pack("<I", len(chunk)) + chunk
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def webp_vp8(width, height):
+    frame = b"\x10\x02\0" + b"\x9d\x01\x2a" + struct.pack("<HH", width, height)
+    return _riff(b"VP8 ", frame + b"\0" * BODY_PADDING)
+
+
+def webp_vp8l(width, height):
+    bits = (width - 1) | ((height - 1) << 14) | (1 << 28)
+    return _riff(b"VP8L", b"\x2f" + struct.pack("<I", bits) + b"\0" * BODY_PADDING)
+
+
+def webp_vp8x(width, height):
+    header = b"\x10\0\0\0" + (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little")
+    return _riff(b"VP8X", header + b"\0" * BODY_PADDING)
+
+
+def corpus():
+    """Return ``{name: (data, (width, height))}``."""
+    images = {
+        "png": (png(120, 80), (120, 80)),
+        "gif": (gif(64, 48), (64, 48)),
+        "jpeg-baseline": (jpeg(300, 200), (300, 200)),
+        "jpeg-progressive": (jpeg(200, 300, sof=0xC2), (200, 300)),
+        "jpeg-exif-100k": (jpeg(250, 250, exif_bytes=100 * 1024, icc_bytes=3 * 1024), (250, 250)),
+        "webp-vp8": (webp_vp8(100, 90), (100, 90)),
+        "webp-vp8l": (webp_vp8l(5000, 16384), (5000, 16384)),
+        "webp-vp8x": (webp_vp8x(300, 300), (300, 300)),
+    }
+    if DEFAULT_AVATAR.exists():
+        data = DEFAULT_AVATAR.read_bytes()
+        images["default-avatar.png"] = (data, struct.unpack(">II", data[16:24]))
+    return images
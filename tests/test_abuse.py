@@ -0,0 +1,85 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from abuse import flag_alerts, rebuild_abuse_stats
+from app import app as flask_app
+from extensions import db
+from models import AbuseStats, Block, Question, User
+from tests.helpers import login, register
+
+
+def stats(**key):
+    with flask_app.app_context():
+        row = AbuseStats.query.filter_by(**key).first()
+        return row and (row.submitted_count, row.flagged_count, row.hidden_count, row.reported_count)
+
+
+def snapshot():
+    with flask_app.app_context():
+        return sorted(
+            (r.user_id or 0, r.ip_address or '', r.submitted_count, r.flagged_count, r.hidden_count, r.reported_count)
+            for r in AbuseStats.query.all()
+        )
+
+
+def moderate(client, question_id, action):
+    client.post(f"/questions/{question_id}/moderate", data={"question_id": question_id, "action": action})
+
+
+def test_counters_follow_submissions_flags_and_reports(client):
+    register(client, "alice", "alice@example.com")
+    register(client, "bob", "bob@example.com")
+    login(client, "bob@example.com")
+    client.post("/user/alice", data={"question_text": "From bob?"})
+    client.get("/logout")
+    client.post("/user/alice", data={"question_text": "Anonymous?"})
+    assert stats(ip_address="127.0.0.1") == (2, 0, 0, 0)
+
+    with flask_app.app_context():
+        bob = User.query.filter_by(username="bob").first().id
+        ids = [q.id for q in Question.query.order_by(Question.id)]
+    assert stats(user_id=bob) == (1, 0, 0, 0)
+
+    login(client, "alice@example.com")
+    moderate(client, ids[0], "hide")
+    moderate(client, ids[0], "flag")
+    moderate(client, ids[0], "flag")
+    assert stats(user_id=bob) == (1, 1, 1, 0)
+    assert stats(ip_address="127.0.0.1") == (2, 1, 1, 0)
+
+    before = snapshot()
+    with flask_app.app_context():
+        AbuseStats.query.delete()
+        db.session.commit()
+        rebuild_abuse_stats()
+    assert snapshot() == before
+
+
+def test_auto_block_and_alerts_read_ip_counter(client):
+    register(client, "alice", "alice@example.com")
+    for i in range(5):
+        client.post("/user/alice", data={"question_text": f"Spam {i}?"})
+    with flask_app.app_context():
+        ids = [q.id for q in Question.query.order_by(Question.id)]
+    login(client, "alice@example.com")
+    for question_id in ids[:4]:
+        moderate(client, question_id, "flag")
+    with flask_app.app_context():
+        assert Block.query.count() == 0
+    moderate(client, ids[4], "flag")
+    with flask_app.app_context():
+        assert Block.query.filter_by(ip_address="127.0.0.1").count() == 1
+        assert [(r.ip_address, r.flagged_count) for r in flag_alerts(5)] == [("127.0.0.1", 5)]
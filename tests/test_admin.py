@@ -0,0 +1,76 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import app as app_module
+from app import app as flask_app
+from extensions import db
+from models import AnswerReport, User
+from tests.helpers import create_answer, login, register
+
+
+def seed_reports(client, answers=3, reports_each=2):
+    register(client, "admin", "admin@example.com")
+    register(client, "alice", "alice@example.com")
+    with flask_app.app_context():
+        User.query.filter_by(username="admin").update({"is_admin": True})
+        alice = User.query.filter_by(username="alice").first()
+        ids = []
+        for i in range(answers):
+            answer = create_answer(alice.id, f"Q{i}?", f"A{i}")
+            for j in range(reports_each):
+                db.session.add(AnswerReport(answer_id=answer.id, reporter_ip="10.0.0.2", reason=f"reason {i}-{j}"))
+            ids.append(answer.id)
+        db.session.commit()
+    return ids
+
+
+def test_report_groups_are_counted_and_paginated(client, monkeypatch):
+    monkeypatch.setattr(app_module, "ADMIN_PAGE_SIZE", 2)
+    ids = seed_reports(client)
+    login(client, "admin@example.com")
+    page = client.get("/admin/moderation").get_data(as_text=True)
+    assert page.count("2 report(s)") == 2
+    assert "reason 0-0" not in page
+    assert f"/admin/reports/answers/{ids[0]}" not in page
+    assert "reports_after=" in page
+
+    next_url = page.split('href="/admin/moderation?reports_after=')[1].split('"')[0]
+    older = client.get("/admin/moderation?reports_after=" + next_url.replace("&amp;", "&"))
+    assert f"/admin/reports/answers/{ids[0]}" in older.get_data(as_text=True)
+
+
+def test_report_details_and_resolve_all(client):
+    ids = seed_reports(client, answers=1, reports_each=3)
+    login(client, "admin@example.com")
+    details = client.get(f"/admin/reports/answers/{ids[0]}").get_json()
+    assert sorted(r["reason"] for r in details["reports"]) == ["reason 0-0", "reason 0-1", "reason 0-2"]
+
+    client.post(f"/admin/reports/answers/{ids[0]}/resolve")
+    with flask_app.app_context():
+        assert AnswerReport.query.filter_by(resolved=False).count() == 0
+    assert client.get(f"/admin/reports/answers/{ids[0]}").get_json() == {"reports": []}
+
+
+def test_report_details_require_admin(client):
+    ids = seed_reports(client, answers=1)
+    login(client, "alice@example.com")
+    assert client.get(f"/admin/reports/answers/{ids[0]}").status_code == 403
+
+
+def test_bad_cursor_is_rejected(client):
+    seed_reports(client, answers=1)
+    login(client, "admin@example.com")
+    assert client.get("/admin/moderation?blocks_after=garbage").status_code == 400
@@ -0,0 +1,68 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from tests.helpers import count_queries
+
+
+def test_feed_pages_with_cursor_and_sparse_fields(client, seed_answers):
+    public_ids = seed_answers()
+    first = client.get("/api/v1/feed?limit=2&fields=id,answer").get_json()
+    assert first["answers"] == [{"id": public_ids[4], "answer": "A4"}, {"id": public_ids[3], "answer": "A3"}]
+    seen = [a["id"] for a in first["answers"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = client.get(f"/api/v1/feed?limit=2&fields=id&after={cursor}").get_json()
+        seen += [a["id"] for a in page["answers"]]
+        cursor = page["next_cursor"]
+    assert seen == public_ids[::-1]
+
+
+def test_full_answer_and_user_endpoints(client, seed_answers):
+    public_ids = seed_answers(count=1)
+    answer = client.get(f"/api/v1/answers/{public_ids[0]}").get_json()
+    assert answer["question"] == "Q0?"
+    assert answer["author"] == "alice"
+    assert answer["answered_at"].endswith("Z")
+    assert answer["url"].endswith(f"/user/alice/a/{public_ids[0]}")
+    user = client.get("/api/v1/users/alice").get_json()
+    assert user["answer_count"] == 1
+    answers = client.get("/api/v1/users/alice/answers").get_json()["answers"]
+    assert [a["id"] for a in answers] == public_ids
+
+
+def test_errors_are_json(client, seed_answers):
+    seed_answers(count=1)
+    missing = client.get("/api/v1/answers/nope")
+    assert missing.status_code == 404 and "error" in missing.get_json()
+    assert client.get("/api/v1/users/nobody/answers").status_code == 404
+    assert client.get("/api/v1/feed?fields=id,password_hash").status_code == 400
+    assert client.get("/api/v1/feed?limit=1000").status_code == 400
+    assert client.get("/api/v1/feed?after=garbage").status_code == 400
+
+
+def test_list_query_count_is_flat_and_etag_revalidates(client, seed_answers):
+    seed_answers(count=30)
+    with count_queries() as statements:
+        resp = client.get("/api/v1/feed?limit=25")
+    assert len(resp.get_json()["answers"]) == 25
+    assert len(statements) == 2  # validator + one joined page query
+    assert resp.cache_control.public
+
+    with count_queries() as statements:
+        again = client.get("/api/v1/feed?limit=25", headers={"If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+    assert len(statements) == 1
+    assert client.get("/api/v1/feed?limit=24", headers={"If-None-Match": resp.headers["ETag"]}).status_code == 200
@@ -0,0 +1,205 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import os
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import avatars
+from app import app as flask_app
+from avatars import AvatarCheck, AvatarCheckCache, AvatarMirror, avatar_checks, probe_avatar
+from extensions import db
+from models import User
+from tests.helpers import login, register
+
+
+def png_header(width, height):
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    chunk = b"IHDR" + ihdr
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+
+
+def tiny_png(width, height):
+    """A complete, decodable PNG of the given size."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    raw = b"".join(b"\0" + b"\0\0\0" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+class AvatarHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.command, self.path))
+        if self.path == "/moved.png":
+            self.send_response(302)
+            self.send_header("Location", "/small.png")
+            self.end_headers()
+            return
+        if self.path == "/elsewhere.png":
+            self.send_response(302)
+            self.send_header("Location", "http://example.invalid/small.png")
+            self.end_headers()
+            return
+        size = (100, 100) if self.path == "/small.png" else (1000, 1000)
+        body = png_header(*size) + b"\0" * 200000
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def avatar_server(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), AvatarHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(avatars, "ALLOWED_AVATAR_HOSTS", ["127.0.0.1"])
+    AvatarHandler.requests = []
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_probe_uses_one_get(avatar_server):
+    check = probe_avatar(f"{avatar_server}/small.png")
+    assert check.ok and (check.width, check.height) == (100, 100)
+    assert AvatarHandler.requests == [("GET", "/small.png")]
+
+    check = probe_avatar(f"{avatar_server}/large.png")
+    assert not check.ok and check.width == 1000
+
+
+def test_probe_follows_one_redirect_on_allowed_hosts(avatar_server):
+    assert probe_avatar(f"{avatar_server}/moved.png").ok
+    assert not probe_avatar(f"{avatar_server}/elsewhere.png").ok
+
+
+def test_check_cache_skips_the_network(avatar_server):
+    cache = AvatarCheckCache()
+    url = f"{avatar_server}/small.png"
+    assert cache.check(url).ok
+    assert cache.check(url).ok
+    assert len(AvatarHandler.requests) == 1
+
+
+def test_failures_expire_sooner():
+    cache = AvatarCheckCache(ttl=100, negative_ttl=10)
+    cache._results.set("good", AvatarCheck(True, 1, 1, 1000.0))
+    cache._results.set("bad", AvatarCheck(False, None, None, 1000.0))
+    assert cache.get("good", now=1050.0) and cache.get("bad", now=1005.0)
+    assert cache.get("bad", now=1050.0) is None
+    assert cache.get("good", now=1101.0) is None
+
+
+def test_mirror_evicts_oldest_files(tmp_path):
+    mirror = AvatarMirror(str(tmp_path), max_bytes=250)
+    first, _ = mirror.store(b"a" * 100, "png")
+    os.utime(mirror.path(first), (1, 1))
+    second, _ = mirror.store(b"b" * 100, "png")
+    os.utime(mirror.path(second), (2, 2))
+    third, evicted = mirror.store(b"c" * 100, "png")
+    assert evicted == [first]
+    assert not mirror.exists(first) and mirror.exists(second) and mirror.exists(third)
+    # Content-addressed: storing the same bytes again reuses the name.
+    assert mirror.store(b"c" * 100, "png")[0] == third
+
+
+def test_verified_avatar_is_mirrored_and_served(client, monkeypatch, tmp_path):
+    monkeypatch.setitem(flask_app.config, "AVATAR_MIRROR_ENABLED", True)
+    monkeypatch.setitem(flask_app.config, "AVATAR_MIRROR_DIR", str(tmp_path))
+    monkeypatch.setattr("avatars.probe_avatar", lambda url: AvatarCheck(True, 100, 100, time.time()))
+    fetched = []
+    monkeypatch.setattr("avatars.fetch_avatar", lambda url: fetched.append(url) or tiny_png(100, 100))
+
+    avatar = "https://avatars.githubusercontent.com/u/5.png"
+    register(client, "mia", "mia@example.com")
+    login(client, "mia@example.com")
+    client.post(
+        "/settings",
+        data={"username": "mia", "email": "mia@example.com", "avatar_url": avatar, "submit": "Update"},
+    )
+    with flask_app.app_context():
+        name = User.query.filter_by(username="mia").first().avatar_mirror
+    assert name and fetched == [avatar]
+
+    page = client.get("/user/mia").get_data(as_text=True)
+    assert f"/avatars/{name}" in page
+    assert avatar not in page
+
+    resp = client.get(f"/avatars/{name}")
+    assert resp.status_code == 200
+    assert resp.cache_control.max_age == 365 * 24 * 3600
+    assert resp.cache_control.immutable
+    assert resp.headers["X-Content-Type-Options"] == "nosniff"
+    assert resp.mimetype == "image/png"
+    resp.close()
+
+    assert client.get("/avatars/missing.png").status_code == 302
+
+
+def test_resaving_a_failed_avatar_checks_it_again(client, monkeypatch):
+    avatar = "https://avatars.githubusercontent.com/u/6.png"
+    register(client, "ned", "ned@example.com")
+    login(client, "ned@example.com")
+    form = {"username": "ned", "email": "ned@example.com", "avatar_url": avatar, "submit": "Update"}
+    monkeypatch.setattr("avatars.probe_avatar", lambda url: AvatarCheck(False, None, None, time.time()))
+    client.post("/settings", data=form)
+    monkeypatch.setattr("avatars.probe_avatar", lambda url: AvatarCheck(True, 100, 100, time.time()))
+    client.post("/settings", data=form)
+    with flask_app.app_context():
+        assert User.query.filter_by(username="ned").first().avatar_status == "ok"
+
+
+def test_recheck_avatars_command_settles_pending_and_failed(client, monkeypatch):
+    for name in ("ona", "pim"):
+        register(client, name, f"{name}@example.com")
+    with flask_app.app_context():
+        User.query.filter_by(username="ona").update({"avatar_url": "https://i.imgur.com/a.png", "avatar_status": "pending"})
+        User.query.filter_by(username="pim").update({"avatar_url": "https://i.imgur.com/b.png", "avatar_status": "failed"})
+        db.session.commit()
+    monkeypatch.setattr("avatars.probe_avatar", lambda url: AvatarCheck(False, None, None, time.time()))
+    avatar_checks.check("https://i.imgur.com/b.png")  # a cached failure must not be reused
+    monkeypatch.setattr("avatars.probe_avatar", lambda url: AvatarCheck(True, 100, 100, time.time()))
+    result = flask_app.test_cli_runner().invoke(args=["recheck-avatars"])
+    assert result.exit_code == 0
+    assert "Verified 2 avatar(s); 0 failed." in result.output
+    with flask_app.app_context():
+        assert {u.avatar_status for u in User.query.all()} == {"ok"}
+
+
+def test_avatars_are_not_mirrored_without_pillow(monkeypatch):
+    pil = pytest.importorskip("PIL.Image")
+    data, ext = avatars.normalize_avatar(tiny_png(300, 300))
+    assert ext == "png" and pil.open(io.BytesIO(data)).size == (100, 100)
+    monkeypatch.setattr(avatars, "Image", None)
+    assert avatars.normalize_avatar(tiny_png(300, 300)) is None
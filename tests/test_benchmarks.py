@@ -0,0 +1,52 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from app import app as flask_app
+from benchmarks.routes import summarize
+from benchmarks.seed import DatasetSpec, seed_dataset
+from models import Answer, Question, User
+
+
+def test_seeded_dataset_matches_spec(client):
+    with flask_app.app_context():
+        counts = seed_dataset(DatasetSpec(users=20, questions_per_user=5, answer_ratio=0.5))
+        assert counts["users"] == User.query.count() == 20
+        assert counts["questions"] == Question.query.count() == 100
+        assert counts["answers"] == Answer.query.count()
+        assert 0 < counts["answers"] < 100
+        answered = Question.query.filter(Question.answered_at.isnot(None)).count()
+        assert answered == counts["answers"]
+        username = User.query.first().username
+    assert client.get("/feed").status_code == 200
+    assert client.get(f"/user/{username}").status_code == 200
+
+
+def test_summarize_reports_percentiles():
+    summary = summarize([i / 1000 for i in range(1, 101)], [3] * 100)
+    assert summary["p50_ms"] == 50
+    assert summary["p99_ms"] == 99
+    assert summary["queries_max"] == 3
+
+
+def test_search_benchmark_times_every_query(client):
+    from benchmarks.search import QUERIES, time_search
+
+    with flask_app.app_context():
+        seed_dataset(DatasetSpec(users=20, questions_per_user=5))
+    results = time_search(requests=2, warmup=0, per_page=5)
+    assert set(results) == set(QUERIES)
+    assert results["common_word"]["matches"] > 0
+    assert results["common_word"]["route"]["requests"] == 2
@@ -0,0 +1,69 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from datetime import timedelta
+
+from app import app as flask_app
+from blocks import block_index, sweep_expired_blocks
+from extensions import db
+from models import Block, Question, User, utcnow
+from tests.helpers import login, register
+
+
+def add_block(**kwargs):
+    with flask_app.app_context():
+        db.session.add(Block(active=True, **kwargs))
+        db.session.commit()
+    block_index.invalidate()
+
+
+def ask(client, text):
+    client.post("/user/alice", data={"question_text": text}, follow_redirects=True)
+    with flask_app.app_context():
+        return Question.query.filter_by(question_text=text).count()
+
+
+def test_blocked_ip_cannot_ask(client):
+    register(client, "alice", "alice@example.com")
+    add_block(ip_address="127.0.0.1", reason="spam")
+    assert ask(client, "Blocked?") == 0
+
+
+def test_expired_block_stops_matching_without_a_write(client):
+    register(client, "alice", "alice@example.com")
+    add_block(ip_address="127.0.0.1", expires_at=utcnow() - timedelta(minutes=1))
+    assert ask(client, "Allowed?") == 1
+    with flask_app.app_context():
+        # The request path leaves the row alone; the sweep tidies it up.
+        assert Block.query.first().active
+        assert sweep_expired_blocks() == 1
+        assert not Block.query.first().active
+
+
+def test_deactivating_block_invalidates_index(client):
+    register(client, "admin", "admin@example.com")
+    register(client, "alice", "alice@example.com")
+    with flask_app.app_context():
+        User.query.filter_by(username="admin").update({"is_admin": True})
+        db.session.commit()
+    login(client, "admin@example.com")
+    client.post("/admin/blocks", data={"ip_address": "127.0.0.1", "reason": "spam"})
+    assert ask(client, "First?") == 0
+
+    with flask_app.app_context():
+        block_id = Block.query.first().id
+    client.post(f"/admin/blocks/{block_id}/deactivate")
+    assert ask(client, "Second?") == 1
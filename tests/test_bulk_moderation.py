@@ -0,0 +1,108 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from sqlalchemy import event
+
+from app import app as flask_app
+from extensions import db
+from models import AbuseStats, AnswerReport, Block, Question, User
+from tests.helpers import answer_question, login, register
+
+
+def spam_wave(client, count=5):
+    register(client, "alice", "alice@example.com")
+    for i in range(count):
+        client.post("/user/alice", data={"question_text": f"Spam {i}?"})
+    with flask_app.app_context():
+        alice = User.query.filter_by(username="alice").first()
+        alice_id = alice.id
+        db.session.add(Question(receiver_id=alice_id, question_text="Elsewhere?", ip_address="10.9.9.9"))
+        alice.unanswered_count += 1
+        db.session.commit()
+        return [q.id for q in Question.query.filter_by(ip_address="127.0.0.1").order_by(Question.id)]
+
+
+def unanswered_count():
+    with flask_app.app_context():
+        return User.query.filter_by(username="alice").first().unanswered_count
+
+
+def test_hide_selected_questions(client):
+    ids = spam_wave(client)
+    login(client, "alice@example.com")
+    client.post("/dashboard/moderate", data={"action": "hide", "question_ids": ids[:3]})
+    with flask_app.app_context():
+        assert Question.query.filter_by(is_hidden=True).count() == 3
+        assert Question.query.filter_by(is_flagged=True).count() == 0
+    assert unanswered_count() == 3
+
+
+def test_flag_all_from_ip_is_one_update_and_one_block(client):
+    ids = spam_wave(client)
+    login(client, "alice@example.com")
+    updates = []
+
+    def count_updates(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE question"):
+            updates.append(statement)
+
+    with flask_app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", count_updates)
+    try:
+        client.post("/dashboard/moderate", data={"action": "flag", "same_ip_as": ids[0]})
+    finally:
+        event.remove(engine, "before_cursor_execute", count_updates)
+
+    assert len(updates) == 1
+    with flask_app.app_context():
+        assert Question.query.filter_by(is_flagged=True).count() == len(ids)
+        assert Question.query.filter_by(ip_address="10.9.9.9", is_hidden=False).count() == 1
+        assert Block.query.filter_by(ip_address="127.0.0.1").count() == 1
+        assert AbuseStats.query.filter_by(ip_address="127.0.0.1").first().flagged_count == len(ids)
+    assert unanswered_count() == 1
+
+
+def test_cannot_bulk_moderate_someone_elses_questions(client):
+    ids = spam_wave(client)
+    register(client, "bob", "bob@example.com")
+    login(client, "bob@example.com")
+    assert client.post("/dashboard/moderate", data={"action": "flag", "same_ip_as": ids[0]}).status_code == 403
+    client.post("/dashboard/moderate", data={"action": "hide", "question_ids": ids})
+    with flask_app.app_context():
+        assert Question.query.filter_by(is_hidden=True).count() == 0
+
+
+def test_admin_bulk_resolve_and_deactivate(client):
+    register(client, "admin", "admin@example.com")
+    ids = spam_wave(client, count=2)
+    with flask_app.app_context():
+        User.query.filter_by(username="admin").update({"is_admin": True})
+        answer_ids = []
+        for question_id in ids:
+            answer = answer_question(db.session.get(Question, question_id))
+            db.session.add(AnswerReport(answer_id=answer.id, reporter_ip="10.0.0.2"))
+            answer_ids.append(answer.id)
+        blocks = [Block(ip_address=f"10.0.0.{i}", active=True) for i in range(3)]
+        db.session.add_all(blocks)
+        db.session.commit()
+        block_ids = [b.id for b in blocks]
+    login(client, "admin@example.com")
+    client.post("/admin/reports/resolve", data={"answer_ids": answer_ids})
+    client.post("/admin/blocks/deactivate", data={"block_ids": block_ids[:2]})
+    with flask_app.app_context():
+        assert AnswerReport.query.filter_by(resolved=False).count() == 0
+        assert [b.active for b in Block.query.order_by(Block.id)] == [False, False, True]
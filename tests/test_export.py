@@ -0,0 +1,100 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import csv
+import io
+import json
+
+from app import app as flask_app
+from extensions import db
+from models import Question, User
+from tests.helpers import login, register
+
+
+def seed_account(client, seed_answers):
+    public_ids = seed_answers(count=2)
+    register(client, "bob", "bob@example.com")
+    with flask_app.app_context():
+        alice = User.query.filter_by(username="alice").first()
+        bob = User.query.filter_by(username="bob").first()
+        db.session.add_all([
+            Question(receiver_id=alice.id, sender_id=bob.id, question_text="Signed?", ip_address="10.0.0.2"),
+            Question(receiver_id=alice.id, sender_id=bob.id, is_anonymous=True,
+                     question_text="Secret?", ip_address="10.0.0.2"),
+        ])
+        db.session.commit()
+    return public_ids
+
+
+def test_ndjson_export_streams_profile_questions_and_answers(client, seed_answers):
+    public_ids = seed_account(client, seed_answers)
+    login(client, "alice@example.com")
+    resp = client.get("/user/alice/export")
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert resp.mimetype == "application/x-ndjson"
+    assert 'filename="qbox-alice.ndjson"' in resp.headers["Content-Disposition"]
+    records = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+
+    assert records[0]["type"] == "profile" and records[0]["id"] == "alice"
+    questions = {r["text"]: r for r in records if r["type"] == "question"}
+    assert set(questions) == {"Q0?", "Q1?", "Signed?", "Secret?"}
+    assert questions["Signed?"]["from"] == "bob"
+    assert questions["Secret?"]["from"] is None
+    assert questions["Q0?"]["answered_at"] is not None and questions["Signed?"]["answered_at"] is None
+    assert "10.0.0.2" not in resp.get_data(as_text=True)
+    answers = [r for r in records if r["type"] == "answer"]
+    assert [a["id"] for a in answers] == public_ids
+    assert answers[0]["question_id"] == questions["Q0?"]["id"]
+    assert answers[0]["url"].endswith(f"/user/alice/a/{public_ids[0]}")
+
+
+def test_csv_export_and_access_rules(client, seed_answers):
+    seed_account(client, seed_answers)
+    login(client, "bob@example.com")
+    assert client.get("/user/alice/export").status_code == 403
+    assert client.get("/user/bob/export?format=xml").status_code == 400
+    with flask_app.app_context():
+        User.query.filter_by(username="bob").update({"is_admin": True})
+        db.session.commit()
+    resp = client.get("/user/alice/export?format=csv")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+    assert [row["type"] for row in rows] == ["profile"] + ["question"] * 4 + ["answer"] * 2
+    assert {row["from"] for row in rows if row["type"] == "question"} == {"", "bob"}
+
+
+def test_export_requires_login(client, seed_answers):
+    seed_answers(count=1)
+    resp = client.get("/user/alice/export")
+    assert resp.status_code == 302
+    assert "/login" in resp.headers["Location"]
+
+
+def test_export_user_command(client, seed_answers, tmp_path):
+    public_ids = seed_account(client, seed_answers)
+    runner = flask_app.test_cli_runner()
+    result = runner.invoke(args=["export-user", "alice"])
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert [r["id"] for r in records if r["type"] == "answer"] == public_ids
+
+    target = tmp_path / "alice.csv"
+    result = runner.invoke(args=["export-user", "alice", "--format", "csv", "--output", str(target)])
+    assert result.exit_code == 0
+    assert target.read_text().splitlines()[0] == "type,id,created_at,text,from,question_id,answered_at,hidden,url"
+    assert runner.invoke(args=["export-user", "nobody"]).exit_code != 0
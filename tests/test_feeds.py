@@ -0,0 +1,89 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import xml.etree.ElementTree as ET
+
+from app import app as flask_app
+from extensions import db
+from models import User
+from tests.helpers import count_queries, create_answer
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+def test_user_feed_lists_newest_answers(client, seed_answers):
+    public_ids = seed_answers(count=3)
+    resp = client.get("/user/alice/feed.atom")
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/atom+xml"
+    feed = ET.fromstring(resp.get_data())
+    entries = feed.findall(f"{ATOM}entry")
+    assert [e.find(f"{ATOM}link").get("href").rsplit("/", 1)[1] for e in entries] == public_ids[::-1]
+    assert entries[0].find(f"{ATOM}title").text == "Q2?"
+    assert "A2" in entries[0].find(f"{ATOM}content").text
+    assert client.get("/user/nobody/feed.atom").status_code == 404
+
+
+def test_site_feed_handles_no_answers(client):
+    resp = client.get("/feed.atom")
+    assert resp.status_code == 200
+    assert ET.fromstring(resp.get_data()).findall(f"{ATOM}entry") == []
+
+
+def test_polls_get_304_without_reading_answers(client, seed_answers):
+    seed_answers(count=2)
+    first = client.get("/feed.atom")
+    first.get_data()  # finish the stream
+    with count_queries() as statements:
+        by_etag = client.get("/feed.atom", headers={"If-None-Match": first.headers["ETag"]})
+        by_date = client.get("/feed.atom", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert by_etag.status_code == by_date.status_code == 304
+    assert by_etag.get_data() == b""
+    assert len(statements) == 4  # newest answer + feed authors, per poll
+    assert all("answer_text" not in statement for statement in statements)
+
+    with flask_app.app_context():
+        alice = User.query.filter_by(username="alice").first()
+        create_answer(alice.id, "New?", "New.")
+        db.session.commit()
+    changed = client.get("/feed.atom", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert len(ET.fromstring(changed.get_data()).findall(f"{ATOM}entry")) == 3
+
+
+def test_multi_line_answers_keep_their_line_breaks(client, seed_answers):
+    seed_answers(count=1)
+    with flask_app.app_context():
+        alice = User.query.filter_by(username="alice").first()
+        create_answer(alice.id, "Two\nlines?", "First <b>\nsecond")
+        db.session.commit()
+    entry = ET.fromstring(client.get("/user/alice/feed.atom").get_data()).find(f"{ATOM}entry")
+    content = entry.find(f"{ATOM}content").text
+    assert "Two<br>\nlines?" in content
+    assert "First &lt;b&gt;<br>\nsecond" in content
+    assert "&lt;br&gt;" not in content
+
+
+def test_site_feed_etag_changes_when_an_author_renames(client, seed_answers):
+    seed_answers(count=2)
+    first = client.get("/feed.atom")
+    first.get_data()
+    with flask_app.app_context():
+        User.query.filter_by(username="alice").update({"username": "alicia"})
+        db.session.commit()
+    renamed = client.get("/feed.atom", headers={"If-None-Match": first.headers["ETag"]})
+    assert renamed.status_code == 200
+    assert b"/user/alicia" in renamed.get_data()
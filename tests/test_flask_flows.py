@@ -14,28 +14,13 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from models import User, Question, Answer
-
+import time
 
-def register(client, username, email, password="password"):
-    return client.post(
-        "/register",
-        data={
-            "username": username,
-            "email": email,
-            "password": password,
-            "confirm_password": password,
-        },
-        follow_redirects=True,
-    )
-
-
-def login(client, email, password="password"):
-    return client.post(
-        "/login",
-        data={"email": email, "password": password},
-        follow_redirects=True,
-    )
+from app import app as flask_app
+from avatars import AVATAR_PENDING, AvatarCheck, verify_avatar
+from extensions import db
+from models import User, Question, Answer
+from tests.helpers import login, register
 
 
 def test_registration_and_login(client):
@@ -126,9 +111,8 @@ def test_update_account_info(client, monkeypatch):
     register(client, "alice", "alice@example.com")
     login(client, "alice@example.com")
 
-    # Ensure avatar URL check passes during this test
-    monkeypatch.setattr("forms._url_is_accessible", lambda url: True)
-    monkeypatch.setattr("forms._fetch_image_size", lambda url: (100, 100))
+    # Ensure the background avatar check passes during this test
+    monkeypatch.setattr("avatars.probe_avatar", lambda url: AvatarCheck(True, 100, 100, time.time()))
 
     bio_text = "Hello there"
     avatar = "https://avatars.githubusercontent.com/u/1.png"
@@ -147,6 +131,7 @@ def test_update_account_info(client, monkeypatch):
     user = User.query.filter_by(username="alice").first()
     assert user.bio == bio_text
     assert user.avatar_url == avatar
+    assert user.avatar_status == "ok"
 
     resp = client.get("/user/alice", follow_redirects=True)
     assert bio_text.encode() in resp.data
@@ -180,7 +165,7 @@ def test_avatar_url_must_be_accessible(client, monkeypatch):
     avatar = "https://avatars.githubusercontent.com/u/2.png"
 
     # Simulate inaccessible avatar URL
-    monkeypatch.setattr("forms._url_is_accessible", lambda url: False)
+    monkeypatch.setattr("avatars.probe_avatar", lambda url: AvatarCheck(False, None, None, time.time()))
 
     client.post(
         "/settings",
@@ -194,7 +179,25 @@ def test_avatar_url_must_be_accessible(client, monkeypatch):
     )
 
     user = User.query.filter_by(username="tom").first()
-    assert user.avatar_url is None
+    assert user.avatar_status == "failed"
+    resp = client.get("/user/tom")
+    assert avatar.encode() not in resp.data
+    assert b"default-avatar.png" in resp.data
+    assert b"could not be verified" in client.get("/settings").data
+
+
+def test_stale_avatar_check_is_ignored(client, monkeypatch):
+    register(client, "sam", "sam@example.com")
+    monkeypatch.setattr("avatars.probe_avatar", lambda url: AvatarCheck(True, 100, 100, time.time()))
+    user = User.query.filter_by(username="sam").first()
+    user.avatar_url = "https://avatars.githubusercontent.com/u/4.png"
+    user.avatar_status = AVATAR_PENDING
+    db.session.commit()
+
+    # A check for a URL the user has since replaced must not mark the new one.
+    verify_avatar(user.id, "https://avatars.githubusercontent.com/u/3.png")
+    db.session.refresh(user)
+    assert user.avatar_status == AVATAR_PENDING
 
 
 def test_feed_order_and_content(client):
@@ -249,3 +252,53 @@ def test_custom_404(client):
     resp = client.get('/nonexistent')
     assert resp.status_code == 404
     assert b"Oops! Page Not Found" in resp.data
+
+
+def test_unanswered_count_tracks_hide_and_recount(client):
+    register(client, "alice", "alice@example.com")
+    register(client, "bob", "bob@example.com")
+    login(client, "bob@example.com")
+    for text in ("One?", "Two?"):
+        client.post("/user/alice", data={"question_text": text}, follow_redirects=True)
+    client.get("/logout", follow_redirects=True)
+
+    alice = User.query.filter_by(username="alice").first()
+    assert alice.unanswered_count == 2
+
+    login(client, "alice@example.com")
+    question = Question.query.filter_by(receiver_id=alice.id).first()
+    client.post(
+        f"/questions/{question.id}/moderate",
+        data={"question_id": question.id, "action": "hide"},
+        follow_redirects=True,
+    )
+    resp = client.get("/faq")
+    assert b"Dashboard - 1" in resp.data
+
+    alice = User.query.filter_by(username="alice").first()
+    alice.unanswered_count = 40
+    db.session.commit()
+    result = flask_app.test_cli_runner().invoke(args=["recount-unanswered"])
+    assert result.exit_code == 0
+    assert User.query.filter_by(username="alice").first().unanswered_count == 1
+
+
+def test_question_can_only_be_answered_once(client):
+    register(client, "alice", "alice@example.com")
+    register(client, "bob", "bob@example.com")
+    login(client, "alice@example.com")
+    client.post("/user/bob", data={"question_text": "Once?"}, follow_redirects=True)
+    client.get("/logout", follow_redirects=True)
+
+    login(client, "bob@example.com")
+    question = Question.query.first()
+    for text in ("First answer", "Second answer"):
+        client.post(
+            "/user/bob",
+            data={"question_id": question.id, "answer_text": text},
+            follow_redirects=True,
+        )
+
+    assert [a.answer_text for a in Answer.query.all()] == ["First answer"]
+    assert Question.query.first().answered_at is not None
+    assert User.query.filter_by(username="bob").first().unanswered_count == 0
@@ -0,0 +1,68 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from app import app as flask_app
+from fragments import LRUCache, _key, _template_version, get_fragment_cache, invalidate_answers
+from models import Answer
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_card_bodies_are_shared_between_pages(client, monkeypatch, seed_answers):
+    # Whole pages would otherwise be served from the response cache.
+    monkeypatch.setitem(flask_app.config, "RESPONSE_CACHE_ENABLED", False)
+    seed_answers(3, author=None)
+    with flask_app.app_context():
+        answer = Answer.query.first()
+        author = answer.author.username
+        answer_id = answer.id
+    cache = get_fragment_cache(flask_app)
+
+    client.get("/feed")
+    assert cache.misses == 3
+    client.get("/feed")
+    client.get(f"/user/{author}")
+    assert cache.misses == 3
+    assert cache.hits == 4
+
+    html = client.get(f"/user/{author}").get_data(as_text=True)
+    assert "<strong>Answer:</strong> A0" in html
+
+    with flask_app.app_context():
+        invalidate_answers(answer_id)
+    client.get(f"/user/{author}")
+    assert cache.misses == 4
+
+
+def test_card_keys_change_with_the_template_and_version(monkeypatch):
+    base = _template_version(flask_app)
+    assert base == get_fragment_cache(flask_app).version
+    assert _key(base, "card", 1) == f"qbox:card:{base}:card:1"
+    monkeypatch.setitem(flask_app.config, "FRAGMENT_CACHE_VERSION", "2")
+    assert _template_version(flask_app) != base
+    monkeypatch.setitem(flask_app.config, "FRAGMENT_CACHE_VERSION", "1")
+    loader = flask_app.jinja_env.loader
+    original = loader.get_source
+    monkeypatch.setattr(loader, "get_source", lambda env, name: (original(env, name)[0] + "<hr>",) + original(env, name)[1:])
+    assert _template_version(flask_app) != base
@@ -0,0 +1,52 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from io import BytesIO
+
+import pytest
+
+from imageprobe import ProbeError, image_size, probe
+from tests.image_corpus import corpus, jpeg
+
+CORPUS = corpus()
+
+
+@pytest.mark.parametrize("name", sorted(CORPUS))
+def test_probe_reads_only_the_header(name):
+    data, expected = CORPUS[name]
+    result = probe(BytesIO(data))
+    assert (result.width, result.height) == expected
+    if name != "jpeg-exif-100k":
+        assert result.bytes_read <= 1024
+
+
+def test_jpeg_frame_behind_large_exif_is_found():
+    data, _ = CORPUS["jpeg-exif-100k"]
+    # The frame header lies beyond the old 64KB probe buffer...
+    assert data.index(b"\xff\xc0") > 65536
+    result = probe(BytesIO(data))
+    assert result.format == "jpeg" and result.width == 250
+    # ...and the bytes in between are consumed, not parsed.
+    assert result.bytes_read < data.index(b"\xff\xc0") + 64
+
+
+def test_truncated_and_oversized_headers_fail_cleanly():
+    data = jpeg(10, 10, exif_bytes=100 * 1024)
+    assert image_size(BytesIO(data[:2000])) is None
+    assert image_size(BytesIO(data), max_bytes=65536) is None
+    assert image_size(BytesIO(b"not an image")) is None
+    with pytest.raises(ProbeError):
+        probe(BytesIO(b""))
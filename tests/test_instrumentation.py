@@ -0,0 +1,59 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import re
+
+from app import app as flask_app
+from extensions import db
+from instrumentation import get_endpoint_stats
+from models import User
+from tests.helpers import count_queries, login, register
+
+
+def test_no_header_when_disabled(client):
+    assert "Server-Timing" not in client.get("/faq").headers
+
+
+def test_server_timing_counts_statements(client, monkeypatch, seed_answers):
+    monkeypatch.setitem(flask_app.config, "SQL_INSTRUMENTATION", True)
+    monkeypatch.setitem(flask_app.config, "RESPONSE_CACHE_ENABLED", False)
+    seed_answers(3, author=None)
+    with count_queries() as statements:
+        resp = client.get("/feed")
+    header = resp.headers["Server-Timing"]
+    match = re.search(r'db;dur=([\d.]+);desc="(\d+) queries", tpl;dur=([\d.]+), total;dur=([\d.]+)', header)
+    assert match
+    assert int(match.group(2)) == len(statements)
+    assert float(match.group(3)) > 0
+    assert float(match.group(4)) >= float(match.group(1))
+
+
+def test_admin_can_view_endpoint_summary(client, monkeypatch):
+    monkeypatch.setitem(flask_app.config, "SQL_INSTRUMENTATION", True)
+    register(client, "root", "root@example.com")
+    with flask_app.app_context():
+        User.query.filter_by(username="root").update({"is_admin": True})
+        db.session.commit()
+    login(client, "root@example.com")
+    client.get("/faq")
+    client.get("/faq")
+    rows = {row["endpoint"]: row for row in get_endpoint_stats(flask_app).summary()}
+    assert rows["faq"]["requests"] == 2
+    page = client.get("/admin/performance").get_data(as_text=True)
+    assert "faq" in page and "2 request(s)" in page
+
+    client.get("/logout")
+    assert client.get("/admin/performance").status_code == 403
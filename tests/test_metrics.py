@@ -0,0 +1,91 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import os
+
+from app import app as flask_app
+from metrics import MultiProcessStore, Registry, render
+from tests.helpers import register
+
+
+def metric_value(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_histogram_exposition():
+    registry = Registry()
+    latency = registry.histogram("demo_seconds", "Demo.", ["endpoint"], buckets=(0.1, 1.0))
+    latency.observe(0.05, endpoint="feed")
+    latency.observe(0.5, endpoint="feed")
+    latency.observe(5, endpoint="feed")
+    text = render(registry.snapshot())
+    assert "# TYPE demo_seconds histogram" in text
+    assert metric_value(text, 'demo_seconds_bucket{endpoint="feed",le="0.1"}') == 1
+    assert metric_value(text, 'demo_seconds_bucket{endpoint="feed",le="1.0"}') == 2
+    assert metric_value(text, 'demo_seconds_bucket{endpoint="feed",le="+Inf"}') == 3
+    assert metric_value(text, 'demo_seconds_count{endpoint="feed"}') == 3
+    assert metric_value(text, 'demo_seconds_sum{endpoint="feed"}') == 5.55
+
+
+def test_metrics_endpoint_reports_requests_and_domain_counters(client):
+    client.get("/feed")
+    register(client, "bob", "bob@example.com")
+    client.post("/user/bob", data={"question_text": "Hi?"})
+    text = client.get("/metrics").get_data(as_text=True)
+    assert metric_value(text, 'qbox_http_requests_total{endpoint="feed",status="200"}') == 1
+    assert metric_value(text, 'qbox_http_request_duration_seconds_count{endpoint="feed"}') == 1
+    assert metric_value(text, "qbox_questions_submitted_total") == 1
+    # The scrape itself is the only request in flight.
+    assert metric_value(text, "qbox_http_requests_in_flight") == 1
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setitem(flask_app.config, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def test_metrics_hidden_without_token_in_production(client, monkeypatch):
+    monkeypatch.setitem(flask_app.config, "TESTING", False)
+    assert client.get("/metrics").status_code == 404
+    monkeypatch.setitem(flask_app.config, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def test_multiprocess_snapshots_are_merged(tmp_path):
+    registry = Registry()
+    requests = registry.counter("demo_total", "Demo.", ["endpoint"])
+    in_flight = registry.gauge("demo_in_flight", "Demo.")
+    requests.inc(2, endpoint="feed")
+    in_flight.set(1)
+    store = MultiProcessStore(str(tmp_path), registry)
+    store.flush()
+    assert os.path.exists(tmp_path / f"{os.getpid()}.json")
+
+    # A worker that has since exited: its counters stay, its gauges do not.
+    dead = registry.snapshot()
+    dead["demo_total"]["samples"] = [[["feed"], 3], [["profile"], 1]]
+    dead["demo_in_flight"]["samples"] = [[[], 5]]
+    (tmp_path / "999999999.json").write_text(json.dumps(dead))
+
+    text = render(store.collect())
+    assert metric_value(text, 'demo_total{endpoint="feed"}') == 5
+    assert metric_value(text, 'demo_total{endpoint="profile"}') == 1
+    assert metric_value(text, "demo_in_flight") == 1
@@ -0,0 +1,89 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import app as flask_app
+from models import Answer
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_paginate
+
+
+def tied_times(i, same_time_every=3):
+    """Timestamps where every few answers share one, to exercise the id tie-break."""
+    return datetime(2025, 1, 1) + timedelta(minutes=i // same_time_every)
+
+
+def test_cursor_round_trip():
+    stamp = datetime(2025, 3, 4, 5, 6, 7, 890)
+    assert decode_cursor(encode_cursor(stamp, 42)) == (stamp, 42)
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_walks_forward_and_back(client, seed_answers):
+    seed_answers(45, author="bob", created_at=tied_times)
+    with flask_app.app_context():
+        expected = [a.id for a in Answer.query.order_by(Answer.created_at.desc(), Answer.id.desc())]
+
+        pages = []
+        page = keyset_paginate(Answer.query, Answer.created_at, Answer.id, per_page=20)
+        assert page.total is None
+        assert not page.has_prev
+        pages.append(page)
+        while page.has_next:
+            page = keyset_paginate(Answer.query, Answer.created_at, Answer.id, per_page=20, after=page.next_cursor)
+            pages.append(page)
+        assert [len(p.items) for p in pages] == [20, 20, 5]
+        assert [a.id for p in pages for a in p.items] == expected
+
+        back = keyset_paginate(Answer.query, Answer.created_at, Answer.id, per_page=20, before=pages[2].prev_cursor)
+        assert [a.id for a in back.items] == [a.id for a in pages[1].items]
+        back = keyset_paginate(Answer.query, Answer.created_at, Answer.id, per_page=20, before=back.prev_cursor)
+        assert [a.id for a in back.items] == [a.id for a in pages[0].items]
+        assert not back.has_prev
+
+        counted = keyset_paginate(Answer.query, Answer.created_at, Answer.id, per_page=20, with_total=True)
+        assert counted.total == 45
+
+
+def test_feed_uses_cursor_links(client, seed_answers):
+    seed_answers(25, author="bob", created_at=tied_times)
+    html = client.get("/feed").get_data(as_text=True)
+    assert "A24" in html and "A4" not in html
+    next_link = re.search(r'href="(/feed\?after=[^"]+)"', html).group(1)
+    html = client.get(next_link.replace("&amp;", "&")).get_data(as_text=True)
+    assert "A4" in html and "A24" not in html
+    assert "before=" in html
+
+
+def test_feed_rejects_bad_cursor(client):
+    assert client.get("/feed?after=garbage").status_code == 400
+
+
+def test_profile_caps_first_page_and_loads_more(client, seed_answers):
+    seed_answers(25, author="bob", created_at=tied_times)
+    html = client.get("/user/bob").get_data(as_text=True)
+    assert "A24" in html and "A4" not in html
+    more_url = re.search(r'data-url="([^"]+)"', html).group(1).replace("&amp;", "&")
+    assert more_url.startswith("/user/bob/answers?after=")
+
+    data = client.get(more_url).get_json()
+    assert data["next"] is None
+    assert "A4" in data["html"] and "A0" in data["html"]
+    assert "A24" not in data["html"]
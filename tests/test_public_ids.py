@@ -0,0 +1,75 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from datetime import datetime, timedelta, timezone
+
+from app import app as flask_app
+from extensions import db
+from models import PUBLIC_ID_ALPHABET, Answer, Question, User, new_public_id, public_id_time, utcnow
+from tests.helpers import count_queries
+
+
+def test_public_ids_sort_by_creation_time():
+    start = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+    times = [start + timedelta(milliseconds=ms) for ms in (0, 0, 0, 1, 999, 60000)]
+    ids = [new_public_id(when) for when in times]
+    assert all(len(i) == 16 and set(i) <= set(PUBLIC_ID_ALPHABET) for i in ids)
+    assert len(set(ids)) == len(ids)
+    assert sorted(ids) == ids
+    assert [public_id_time(i) for i in ids] == times
+
+
+def test_new_answer_does_not_query_for_its_id(client, seed_answers):
+    seed_answers(count=1)
+    with flask_app.app_context():
+        with count_queries() as statements:
+            answer = Answer(question_id=1, author_id=1, answer_text="A")
+        assert statements == []
+        assert public_id_time(answer.public_id) <= datetime.now(timezone.utc)
+
+
+def test_insert_retries_on_public_id_collision(client, seed_answers):
+    taken = seed_answers(count=1)[0]
+    with flask_app.app_context():
+        alice = User.query.filter_by(username="alice").first()
+        question = Question(receiver_id=alice.id, question_text="Again?", ip_address="10.0.0.1", answered_at=utcnow())
+        db.session.add(question)
+        db.session.flush()
+        answer = Answer(question_id=question.id, author_id=alice.id, answer_text="B", public_id=taken)
+        answer.insert()
+        db.session.commit()
+        assert answer.public_id != taken
+        assert Answer.query.count() == 2
+
+
+def test_legacy_ids_redirect_to_current_ones(client, seed_answers):
+    public_id = seed_answers(count=1)[0]
+    with flask_app.app_context():
+        Answer.query.update({"legacy_public_id": "0123456789abcdef"})
+        db.session.commit()
+    resp = client.get("/user/alice/a/0123456789abcdef")
+    assert resp.status_code == 301
+    assert resp.headers["Location"].endswith(f"/user/alice/a/{public_id}")
+    assert client.get("/profile/alice/a/0123456789abcdef", follow_redirects=True).status_code == 200
+    assert client.get("/user/nobody/a/0123456789abcdef").status_code == 404
+
+    api = client.get("/api/v1/answers/0123456789abcdef?fields=id")
+    assert api.status_code == 301
+    assert api.headers["Location"].endswith(f"/api/v1/answers/{public_id}?fields=id")
+
+    api = client.get("/api/v1/answers/0123456789abcdef?public_id=x&fields=id&fields=answer")
+    assert api.status_code == 301
+    assert api.headers["Location"].endswith(f"/api/v1/answers/{public_id}?public_id=x&fields=id&fields=answer")
@@ -0,0 +1,70 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from app import app as flask_app
+from extensions import db
+from models import User, Answer
+from tests.helpers import count_queries, create_answer
+
+
+def queries_for(client, url):
+    with count_queries() as statements:
+        resp = client.get(url)
+    assert resp.status_code == 200
+    return len(statements)
+
+
+def test_feed_query_count_is_constant(client, seed_answers):
+    seed_answers(2, author=None)
+    small = queries_for(client, "/feed")
+    seed_answers(15, author=None)
+    assert queries_for(client, "/feed") == small
+
+
+def test_profile_query_count_is_constant(client, seed_answers):
+    seed_answers(1, author=None)
+    with flask_app.app_context():
+        author = User.query.first()
+        author_id = author.id
+        url = f"/user/{author.username}"
+    small = queries_for(client, url)
+    with flask_app.app_context():
+        for i in range(10):
+            create_answer(author_id, f"More {i}?", f"More {i}")
+        db.session.commit()
+    assert queries_for(client, url) == small
+
+
+def test_permalink_loads_question_with_answer(client, seed_answers):
+    seed_answers(1, author=None)
+    with flask_app.app_context():
+        answer = Answer.query.first()
+        url = f"/user/{answer.author.username}/a/{answer.public_id}"
+    # Two for the response-cache validator, then one for the user and one
+    # for the answer and its question.
+    assert queries_for(client, url) == 4
+    # A repeat visit is served from the response cache after the validator.
+    assert queries_for(client, url) == 2
+
+
+def test_navbar_badge_costs_no_query(client):
+    client.post(
+        "/register",
+        data={"username": "alice", "email": "alice@example.com", "password": "pw", "confirm_password": "pw"},
+    )
+    client.post("/login", data={"email": "alice@example.com", "password": "pw"})
+    # Only the user loader touches the database.
+    assert queries_for(client, "/faq") == 1
@@ -0,0 +1,106 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import re
+
+from sqlalchemy import event
+
+from app import app as flask_app
+from extensions import db
+from models import User, Question, AnswerReport, Block
+from tests.helpers import answer_question, login, register
+
+# Scans of anon_N subqueries walk rows that were already aggregated through an index.
+FULL_SCAN = re.compile(r"\bSCAN (?!anon_\d+$)(\w+)$")
+
+
+def seed(client):
+    register(client, "admin", "admin@example.com")
+    register(client, "alice", "alice@example.com")
+    with flask_app.app_context():
+        admin = User.query.filter_by(username="admin").first()
+        admin.is_admin = True
+        alice = User.query.filter_by(username="alice").first()
+        for i in range(3):
+            question = Question(receiver_id=alice.id, sender_id=admin.id, question_text=f"Q{i}?",
+                                ip_address="10.0.0.1", is_flagged=i == 0)
+            db.session.add(question)
+            db.session.flush()
+            if i:
+                answer = answer_question(question, f"A{i}")
+                db.session.add(AnswerReport(answer_id=answer.id, reporter_ip="10.0.0.2", reason="spam"))
+        db.session.add(Block(ip_address="10.0.0.9", active=True))
+        db.session.add(Question(receiver_id=alice.id, question_text="Unanswered?", ip_address="10.0.0.3"))
+        db.session.commit()
+
+
+def capture_statements(action):
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            captured.append((statement, parameters))
+
+    with flask_app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        action()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+
+def full_scans(statements):
+    scans = []
+    with flask_app.app_context():
+        with db.engine.connect() as conn:
+            for statement, parameters in statements:
+                plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+                for row in plan:
+                    match = FULL_SCAN.search(row[-1])
+                    if match:
+                        scans.append((match.group(1), statement))
+    return scans
+
+
+def test_hot_queries_use_indexes(client):
+    seed(client)
+
+    def browse():
+        client.get("/feed")
+        client.get("/user/alice")
+        client.post("/user/alice", data={"question_text": "Another?"})
+
+    with flask_app.app_context():
+        question = Question.query.filter_by(question_text="Unanswered?").first()
+
+    def moderate():
+        login(client, "alice@example.com")
+        client.get("/dashboard")
+        client.post(
+            f"/questions/{question.id}/moderate",
+            data={"question_id": question.id, "action": "flag"},
+        )
+        client.get("/logout")
+
+    def administer():
+        login(client, "admin@example.com")
+        client.get("/admin/moderation")
+
+    statements = capture_statements(browse) + capture_statements(moderate) + capture_statements(administer)
+    assert statements
+    assert full_scans(statements) == []
@@ -0,0 +1,113 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import socketserver
+import threading
+
+import pytest
+
+from app import app as flask_app
+from models import Question
+from ratelimit import DEFAULT_LIMITS, MemoryBackend, RateLimit, RateLimiter, RedisBackend, SQLiteBackend, get_limiter
+from tests.helpers import register
+
+
+class FakeRespHandler(socketserver.StreamRequestHandler):
+    """Just enough of a Redis server for INCR/PEXPIRE/GET."""
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            header = self.rfile.readline()
+            if not header:
+                return
+            args = []
+            for _ in range(int(header[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2].decode())
+            command = args[0].upper()
+            if command == "INCR":
+                store[args[1]] = int(store.get(args[1], 0)) + 1
+                self.wfile.write(b":%d\r\n" % store[args[1]])
+            elif command == "PEXPIRE":
+                self.wfile.write(b":1\r\n")
+            elif command == "GET":
+                value = store.get(args[1])
+                if value is None:
+                    self.wfile.write(b"$-1\r\n")
+                else:
+                    value = str(value).encode()
+                    self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def resp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeRespHandler)
+    server.daemon_threads = True
+    server.store = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_limit_spec():
+    assert RateLimit.parse("5/minute") == RateLimit(5, 60)
+    assert RateLimit.parse("100/hours") == RateLimit(100, 3600)
+    with pytest.raises(ValueError):
+        RateLimit.parse("5/fortnight")
+
+
+@pytest.mark.parametrize("backend_name", ["memory", "sqlite", "redis"])
+def test_sliding_window_across_backends(backend_name, tmp_path, request):
+    if backend_name == "memory":
+        backend = MemoryBackend()
+    elif backend_name == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "limits.db"))
+    else:
+        server = request.getfixturevalue("resp_server")
+        backend = RedisBackend("redis://%s:%d/0" % server.server_address)
+    limiter = RateLimiter(backend, {"profile": "5/minute"})
+    start = 600.0  # the start of a window
+
+    with flask_app.app_context():
+        assert all(limiter.hit("profile", "1:ip", now=start + i) for i in range(5))
+        assert not limiter.hit("profile", "1:ip", now=start + 5)
+        # Other keys and routes are independent.
+        assert limiter.hit("profile", "2:ip", now=start + 5)
+        assert limiter.hit("unlimited", "1:ip", now=start + 5)
+        # Late in the next window the previous one carries little weight.
+        assert limiter.hit("profile", "1:ip", now=start + 60 + 55)
+
+
+def test_profile_questions_are_rate_limited(client):
+    register(client, "alice", "alice@example.com")
+    for i in range(7):
+        client.post("/user/alice", data={"question_text": f"Q{i}?"}, follow_redirects=True)
+    with flask_app.app_context():
+        assert Question.query.count() == 5
+
+
+def test_overriding_one_route_keeps_the_other_defaults(client, monkeypatch):
+    monkeypatch.setitem(flask_app.config, "RATE_LIMITS", {"profile": "2/minute"})
+    with flask_app.app_context():
+        limits = get_limiter().limits
+    assert limits["profile"] == RateLimit(2, 60)
+    assert set(limits) == set(DEFAULT_LIMITS)
+    assert limits["login"] == RateLimit.parse(DEFAULT_LIMITS["login"])
@@ -0,0 +1,87 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+from flask import Flask
+
+import response_cache
+from app import app as flask_app
+from models import Answer
+from response_cache import CSRF_PLACEHOLDER
+from tests.helpers import count_queries
+
+
+def test_matching_etag_gets_304_without_rendering(client, seed_answers):
+    seed_answers(2, author=None)
+    first = client.get("/feed")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Last-Modified"]
+    assert "private" in first.headers["Cache-Control"]
+
+    with count_queries() as statements:
+        second = client.get("/feed", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.get_data() == b""
+    assert len(statements) == 1
+
+    since = client.get("/feed", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert since.status_code == 304
+
+
+def test_new_answer_changes_etag(client, seed_answers):
+    seed_answers(1, author=None)
+    with flask_app.app_context():
+        author = Answer.query.first().author.username
+    first = client.get(f"/user/{author}")
+    seed_answers(1, author=None)
+    assert client.get("/feed", headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
+    again = client.get(f"/user/{author}", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_logged_in_views_are_not_cached(client):
+    client.post(
+        "/register",
+        data={"username": "alice", "email": "alice@example.com", "password": "pw", "confirm_password": "pw"},
+    )
+    client.post("/login", data={"email": "alice@example.com", "password": "pw"})
+    resp = client.get("/user/alice")
+    assert resp.status_code == 200
+    assert "ETag" not in resp.headers
+
+
+def test_cached_pages_get_a_fresh_csrf_token(client, monkeypatch, seed_answers):
+    monkeypatch.setitem(flask_app.config, "WTF_CSRF_ENABLED", True)
+    seed_answers(1, author=None)
+    with flask_app.app_context():
+        author = Answer.query.first().author.username
+    first = client.get(f"/user/{author}").get_data(as_text=True)
+    second = client.get(f"/user/{author}").get_data(as_text=True)
+    assert CSRF_PLACEHOLDER not in first and CSRF_PLACEHOLDER not in second
+    assert 'name="csrf_token"' in second
+
+
+def test_zero_ttl_turns_caching_off_and_negative_is_rejected():
+    app = Flask(__name__)
+    app.config["RESPONSE_CACHE_TTL"] = 0
+    response_cache.init_app(app)
+    assert app.config["RESPONSE_CACHE_ENABLED"] is False
+
+    app = Flask(__name__)
+    app.config["RESPONSE_CACHE_TTL"] = -5
+    with pytest.raises(ValueError):
+        response_cache.init_app(app)
@@ -0,0 +1,85 @@
+# Qbox, a Q&A website
+# Copyright (C) 2025  Rhys Baker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from app import app as flask_app
+from extensions import db
+from models import User
+from search import fts_query, rebuild_search_index, search_answers
+from tests.helpers import create_answer, register
+
+
+def add_answer(username, question_text, answer_text, hidden=False):
+    with flask_app.app_context():
+        user = User.query.filter_by(username=username).first()
+        answer = create_answer(user.id, question_text, answer_text, is_hidden=hidden)
+        db.session.commit()
+        return answer.id
+
+
+def result_ids(text, **kwargs):
+    with flask_app.app_context():
+        return [a.id for a in search_answers(text, 20, **kwargs).items]
+
+
+def test_fts_query_quotes_terms():
+    assert fts_query('cats OR "dogs" -birds') == '"cats" "OR" "dogs" "birds"*'
+    assert fts_query('  !! ') is None
+
+
+def test_search_ranks_and_filters(client):
+    register(client, "alice", "alice@example.com")
+    register(client, "bob", "bob@example.com")
+    both = add_answer("alice", "Do you like pizza?", "Pizza is my favourite, pizza every day.")
+    once = add_answer("alice", "Dinner plans?", "Maybe pizza.")
+    bobs = add_answer("bob", "Pizza toppings?", "Mushrooms.")
+    add_answer("alice", "Pizza secret?", "Hidden pizza.", hidden=True)
+    add_answer("alice", "Weather?", "Sunny.")
+
+    assert result_ids("pizza") == [both, bobs, once]
+    assert result_ids("piz") == result_ids("pizza")
+    with flask_app.app_context():
+        alice = User.query.filter_by(username="alice").first().id
+    assert result_ids("pizza", author_id=alice) == [both, once]
+    assert result_ids("sushi") == []
+
+
+def test_search_pages_with_cursor(client):
+    register(client, "alice", "alice@example.com")
+    ids = {add_answer("alice", f"Question {i} about tea?", f"Answer {i}: tea.") for i in range(5)}
+    with flask_app.app_context():
+        first = search_answers("tea", 2)
+        second = search_answers("tea", 2, after=first.next_cursor)
+        third = search_answers("tea", 2, after=second.next_cursor)
+        seen = [a.id for page in (first, second, third) for a in page.items]
+    assert sorted(seen) == sorted(ids)
+    assert third.next_cursor is None
+
+
+def test_search_routes_and_rebuild(client):
+    register(client, "alice", "alice@example.com")
+    add_answer("alice", "Favourite colour?", "Teal, definitely.")
+    assert "Teal, definitely." in client.get("/search?q=teal").get_data(as_text=True)
+    assert "Teal, definitely." in client.get("/user/alice/search?q=teal").get_data(as_text=True)
+    assert client.get("/search?q=teal&after=garbage").status_code == 400
+    assert client.get("/search?q=%22unbalanced").status_code == 200
+
+    with flask_app.app_context():
+        db.session.execute(db.text("DELETE FROM answer_search"))
+        db.session.commit()
+    assert result_ids("teal") == []
+    with flask_app.app_context():
+        assert rebuild_search_index() == 1
+    assert len(result_ids("teal")) == 1